@@ -0,0 +1,243 @@
+"""JSON API заметок для скриптов.
+
+Чтение идёт прямо из values_list(): без экземпляров модели и шаблонов,
+и только по тем полям, которые клиент запросил параметром ?fields=.
+Изменение с полем version в теле проходит, только если заметка с тех
+пор не менялась; иначе - ответ 409 с текущей версией.
+
+История заметки: список ревизий, текст ревизии и восстановление
+ревизии - новой правкой заметки с её заголовком и текстом.
+
+Клиент входит так же, как браузер, и API узнаёт его по cookie сессии.
+Поэтому изменяющие запросы (POST, PUT, PATCH, DELETE) проходят
+проверку CSRF: без токена ответ - 403. Токен выдаёт любой GET-запрос к
+API (например, GET /api/notes/) в cookie csrftoken; её значение клиент
+отправляет вместе с cookie в заголовке X-CSRFToken.
+"""
+import json
+from http import HTTPStatus
+
+from django.core.exceptions import ValidationError
+from django.forms.models import model_to_dict
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import generic
+from django.views.decorators.csrf import ensure_csrf_cookie
+
+from .forms import NoteForm
+from .models import NoteConflict, NoteRevision
+from .pagination import CURSOR_PARAM, KEYSET_ORDERING, parse_cursor
+from .views import NoteBase
+
+API_FIELDS = (
+    'id', 'title', 'text', 'slug', 'created', 'updated', 'version',
+    'revision',
+)
+LIST_FIELDS = ('id', 'slug', 'title')
+REVISION_FIELDS = ('number', 'title', 'size', 'created')
+FIELDS_PARAM = 'fields'
+
+
+def error_response(message, status=HTTPStatus.BAD_REQUEST, **extra):
+    return JsonResponse({'error': message, **extra}, status=status)
+
+
+class ApiError(Exception):
+    """Ошибка запроса, которую нужно вернуть клиенту в JSON."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST, **extra):
+        super().__init__(message)
+        self.status = status
+        self.extra = extra
+
+
+@method_decorator(ensure_csrf_cookie, name='dispatch')
+class ApiBase(NoteBase, generic.View):
+    """Общая часть API: JSON вместо редиректов и HTML-ошибок."""
+    default_fields = API_FIELDS
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return error_response(str(error), error.status, **error.extra)
+
+    def handle_no_permission(self):
+        """Анонимный клиент получает 401, а не редирект на вход."""
+        return error_response(
+            'Требуется авторизация.', HTTPStatus.UNAUTHORIZED
+        )
+
+    def get_note(self):
+        try:
+            return self.get_queryset().get(slug=self.kwargs['slug'])
+        except self.model.DoesNotExist:
+            raise ApiError('Заметка не найдена.', HTTPStatus.NOT_FOUND)
+
+    def get_revision(self, note):
+        """Ревизия из адреса с собранным текстом."""
+        try:
+            return note.revisions.reconstruct(self.kwargs['number'])
+        except NoteRevision.DoesNotExist:
+            raise ApiError('Ревизия не найдена.', HTTPStatus.NOT_FOUND)
+
+    def get_fields(self):
+        """Поля из ?fields=title,slug; неизвестные поля - ошибка 400."""
+        value = self.request.GET.get(FIELDS_PARAM)
+        if not value:
+            return self.default_fields
+        fields = tuple(dict.fromkeys(value.split(',')))
+        unknown = set(fields) - set(API_FIELDS)
+        if unknown:
+            raise ApiError(
+                'Неизвестные поля: ' + ', '.join(sorted(unknown)),
+                allowed=API_FIELDS,
+            )
+        return fields
+
+    def get_payload(self):
+        try:
+            payload = json.loads(self.request.body or b'{}')
+        except ValueError:
+            raise ApiError('Тело запроса - некорректный JSON.')
+        if not isinstance(payload, dict):
+            raise ApiError('Тело запроса должно быть объектом JSON.')
+        return payload
+
+    def save_form(self, data, instance=None, status=HTTPStatus.OK):
+        form = NoteForm(data=data, instance=instance)
+        if not form.is_valid():
+            raise ApiError(
+                'Некорректные данные.', errors=form.errors.get_json_data()
+            )
+        if instance is None:
+            form.instance.author = self.request.user
+        try:
+            note = form.save()
+        except ValidationError:
+            raise ApiError(
+                'Некорректные данные.', errors=form.errors.get_json_data()
+            )
+        except NoteConflict as conflict:
+            raise ApiError(
+                'Заметку уже изменили, перечитайте её.',
+                HTTPStatus.CONFLICT, version=conflict.current_version,
+            )
+        return JsonResponse(
+            {field: getattr(note, field) for field in self.get_fields()},
+            status=status,
+        )
+
+
+class ApiNotesList(ApiBase):
+    """GET - список заметок с курсором, POST - создание заметки."""
+    default_fields = LIST_FIELDS
+    paginate_by = 100
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        try:
+            after = parse_cursor(request.GET.get(CURSOR_PARAM))
+        except ValueError:
+            raise ApiError('Некорректный курсор страницы.')
+        queryset = self.get_queryset().order_by(*KEYSET_ORDERING)
+        if after is not None:
+            queryset = queryset.filter(id__gt=after)
+        # id нужен для курсора, лишняя строка - для признака продолжения.
+        rows = list(
+            queryset.text_values('id', *fields)[:self.paginate_by + 1]
+        )
+        next_cursor = None
+        if len(rows) > self.paginate_by:
+            rows = rows[:self.paginate_by]
+            next_cursor = rows[-1][0]
+        return JsonResponse({
+            'results': [dict(zip(fields, row[1:])) for row in rows],
+            'next': next_cursor,
+        })
+
+    def post(self, request, *args, **kwargs):
+        return self.save_form(self.get_payload(), status=HTTPStatus.CREATED)
+
+
+class ApiNoteDetail(ApiBase):
+    """Чтение, изменение (PUT/PATCH) и удаление одной заметки."""
+    with_text = True
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        row = self.get_queryset().filter(
+            slug=kwargs['slug']
+        ).text_values(*fields)[:1]
+        row = next(iter(row), None)
+        if row is None:
+            raise ApiError('Заметка не найдена.', HTTPStatus.NOT_FOUND)
+        return JsonResponse(dict(zip(fields, row)))
+
+    def put(self, request, *args, **kwargs):
+        return self.save_form(self.get_payload(), self.get_note())
+
+    def patch(self, request, *args, **kwargs):
+        note = self.get_note()
+        data = model_to_dict(note, NoteForm.Meta.fields)
+        data.update(self.get_payload())
+        return self.save_form(data, note)
+
+    def delete(self, request, *args, **kwargs):
+        self.get_note().delete()
+        return HttpResponse(status=HTTPStatus.NO_CONTENT)
+
+
+class ApiRevisionsList(ApiBase):
+    """Ревизии заметки от новых к старым, с курсором по номеру."""
+    paginate_by = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            before = parse_cursor(request.GET.get(CURSOR_PARAM))
+        except ValueError:
+            raise ApiError('Некорректный курсор страницы.')
+        revisions = self.get_note().revisions.order_by('-number')
+        if before is not None:
+            revisions = revisions.filter(number__lt=before)
+        rows = list(
+            revisions.values_list(*REVISION_FIELDS)[:self.paginate_by + 1]
+        )
+        next_cursor = None
+        if len(rows) > self.paginate_by:
+            rows = rows[:self.paginate_by]
+            next_cursor = rows[-1][0]
+        return JsonResponse({
+            'results': [dict(zip(REVISION_FIELDS, row)) for row in rows],
+            'next': next_cursor,
+        })
+
+
+class ApiRevisionDetail(ApiBase):
+    """Заголовок и текст одной ревизии."""
+
+    def get(self, request, *args, **kwargs):
+        revision = self.get_revision(self.get_note())
+        return JsonResponse({
+            **{field: getattr(revision, field) for field in REVISION_FIELDS},
+            'text': revision.text,
+        })
+
+
+class ApiRevisionRestore(ApiBase):
+    """POST - вернуть заметке заголовок и текст ревизии.
+
+    Восстановление - обычная правка: она добавляет новую ревизию и с
+    полем version в теле проходит, только если заметка не менялась.
+    """
+    with_text = True
+
+    def post(self, request, *args, **kwargs):
+        note = self.get_note()
+        revision = self.get_revision(note)
+        payload = self.get_payload()
+        data = model_to_dict(note, NoteForm.Meta.fields)
+        data.update(title=revision.title, text=revision.text)
+        if 'version' in payload:
+            data['version'] = payload['version']
+        return self.save_form(data, note)
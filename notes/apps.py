@@ -1,6 +1,37 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.core import checks
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class NotesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notes'
+
+    def ready(self):
+        from .auth import invalidate_user
+        from .checks import check_shared_caches
+        from .db import configure_sqlite
+        from .metrics import install_query_counter
+        from .models import create_author_stats
+        checks.register(check_shared_caches, checks.Tags.caches)
+        connection_created.connect(
+            configure_sqlite, dispatch_uid='notes.configure_sqlite'
+        )
+        connection_created.connect(
+            install_query_counter, dispatch_uid='notes.install_query_counter'
+        )
+        user_model = get_user_model()
+        post_save.connect(
+            invalidate_user, sender=user_model,
+            dispatch_uid='notes.invalidate_user_on_save',
+        )
+        post_delete.connect(
+            invalidate_user, sender=user_model,
+            dispatch_uid='notes.invalidate_user_on_delete',
+        )
+        post_save.connect(
+            create_author_stats, sender=user_model,
+            dispatch_uid='notes.create_author_stats',
+        )
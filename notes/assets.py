@@ -0,0 +1,79 @@
+"""Статические файлы для производственного режима.
+
+collectstatic с CompressedManifestStaticFilesStorage дописывает к
+именам хэш содержимого и кладёт рядом сжатые копии .gz текстовых
+файлов. Имя с хэшем меняется вместе с файлом, поэтому serve() отдаёт
+такие файлы с кэшированием на год; сжатая копия выбирается по
+Accept-Encoding.
+"""
+import gzip
+import posixpath
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage, staticfiles_storage
+)
+from django.core.files.base import ContentFile
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import static
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map')
+# Сжатие, которое экономит меньше, не стоит отдельного файла.
+MIN_SAVING = 0.05
+FAR_FUTURE = 60 * 60 * 24 * 365
+SHORT_MAX_AGE = 60
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хэшированные имена плюс сжатые gzip копии текстовых файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as file:
+            content = file.read()
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(compressed) <= len(content) * (1 - MIN_SAVING):
+            if self.exists(name + '.gz'):
+                self.delete(name + '.gz')
+            self._save(name + '.gz', ContentFile(compressed))
+
+
+@lru_cache(maxsize=None)
+def immutable_names():
+    """Имена файлов с хэшем из манифеста collectstatic."""
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return frozenset(hashed_files.values()) - frozenset(hashed_files)
+
+
+def serve(request, path):
+    """Отдаёт собранную статику из STATIC_ROOT.
+
+    Нужна, когда перед приложением нет веб-сервера для статики
+    (NOTES_SERVE_STATIC).
+    """
+    path = posixpath.normpath(path).lstrip('/')
+    response_path = path
+    accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if accepts_gzip and staticfiles_storage.exists(path + '.gz'):
+        # Content-Encoding: gzip выставит static.serve по расширению.
+        response_path = path + '.gz'
+    response = static.serve(
+        request, response_path, document_root=settings.STATIC_ROOT
+    )
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if path in immutable_names():
+        patch_cache_control(
+            response, public=True, max_age=FAR_FUTURE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, max_age=SHORT_MAX_AGE)
+    return response
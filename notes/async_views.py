@@ -0,0 +1,188 @@
+"""Асинхронные версии представлений заметок для запуска под ASGI.
+
+Django 3.2 не умеет асинхронные CBV и асинхронный ORM, поэтому
+представления - корутины, а запросы к базе выполняются через
+sync_to_async. Проверка входа и выборка заметок только автора - те же,
+что в NoteBase.
+"""
+from http import HTTPStatus
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponseNotAllowed
+from django.shortcuts import get_object_or_404, redirect, render
+
+from . import writebehind
+from .forms import NoteForm
+from .models import NoteConflict
+from .pagination import CURSOR_PARAM, paginate_keyset, parse_cursor
+from .views import NoteBase, NotesList
+
+
+class AsyncNoteView(NoteBase):
+    """Асинхронное представление с семантикой LoginRequiredMixin."""
+    http_method_names = ('get', 'post')
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            self.request = request
+            self.args = args
+            self.kwargs = kwargs
+            return await self.dispatch(request, *args, **kwargs)
+        view.view_class = cls
+        view.view_initkwargs = initkwargs
+        view.__doc__ = cls.__doc__
+        return view
+
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    async def dispatch(self, request, *args, **kwargs):
+        # Пользователь загружается из сессии запросом к базе.
+        is_authenticated = await sync_to_async(
+            lambda: request.user.is_authenticated
+        )()
+        if not is_authenticated:
+            return self.handle_no_permission()
+        if self.flush_pending and writebehind.enabled():
+            notices = await sync_to_async(writebehind.flush)(request.user.pk)
+            for notice in notices:
+                messages.warning(request, notice, fail_silently=True)
+        method = request.method.lower()
+        if method not in self.http_method_names:
+            return HttpResponseNotAllowed(
+                [name.upper() for name in self.http_method_names]
+            )
+        return await getattr(self, method)(request, *args, **kwargs)
+
+    async def get_note(self):
+        return await sync_to_async(get_object_or_404)(
+            self.get_queryset(), slug=self.kwargs['slug']
+        )
+
+
+class AsyncNotesList(AsyncNoteView):
+    """Список заметок пользователя с курсорной пагинацией."""
+    http_method_names = ('get',)
+    template_name = 'notes/list.html'
+    read_only = True
+    paginate_by = NotesList.paginate_by
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            after = parse_cursor(request.GET.get(CURSOR_PARAM))
+        except ValueError:
+            raise Http404('Некорректный курсор страницы.')
+        page = await sync_to_async(paginate_keyset)(
+            self.get_queryset().summaries(), after, self.paginate_by
+        )
+        stats = await sync_to_async(NotesList.get_stats)(self)
+        return render(request, self.template_name, {
+            'view': self,
+            'stats': stats,
+            'object_list': page.object_list,
+            NotesList.context_object_name: page.object_list,
+            'page_obj': page,
+            'is_paginated': page.has_next(),
+        })
+
+
+class AsyncNoteDetail(AsyncNoteView):
+    """Заметка подробно."""
+    http_method_names = ('get',)
+    template_name = 'notes/detail.html'
+    read_only = True
+    with_text = True
+    with_html = True
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.get_note()
+        return render(request, self.template_name, {
+            'view': self, 'note': note, 'object': note,
+        })
+
+
+class AsyncNoteForm(AsyncNoteView):
+    """Общая часть создания и редактирования заметки."""
+    template_name = 'notes/form.html'
+
+    async def get_instance(self):
+        return None
+
+    def save_form(self, form):
+        """Проверка формы (с запросом slug) и сохранение - в одном потоке.
+
+        Возвращает статус ответа с формой или None, если заметка
+        сохранена.
+        """
+        if not form.is_valid():
+            return HTTPStatus.OK
+        if form.instance.author_id is None:
+            form.instance.author = self.request.user
+        try:
+            if not writebehind.enabled():
+                form.save()
+            elif form.instance.pk is None:
+                writebehind.add(form.instance, self.request.user)
+            else:
+                writebehind.edit(form.instance, form.get_update_fields())
+        except ValidationError:
+            return HTTPStatus.OK
+        except NoteConflict as conflict:
+            form.mark_conflict(conflict)
+            return HTTPStatus.CONFLICT
+        return None
+
+    async def get(self, request, *args, **kwargs):
+        form = NoteForm(instance=await self.get_instance())
+        return render(request, self.template_name, {
+            'view': self, 'form': form,
+        })
+
+    async def post(self, request, *args, **kwargs):
+        form = NoteForm(request.POST, instance=await self.get_instance())
+        status = await sync_to_async(self.save_form)(form)
+        if status is None:
+            return redirect(self.success_url)
+        return render(request, self.template_name, {
+            'view': self, 'form': form,
+        }, status=status)
+
+
+class AsyncNoteCreate(AsyncNoteForm):
+    """Добавление заметки."""
+    # Добавление ничего не читает: серия добавлений копится в журнале.
+    flush_pending = False
+
+
+class AsyncNoteUpdate(AsyncNoteForm):
+    """Редактирование заметки."""
+    with_text = True
+
+    async def get_instance(self):
+        return await self.get_note()
+
+
+class AsyncNoteDelete(AsyncNoteView):
+    """Удаление заметки."""
+    template_name = 'notes/delete.html'
+    # Страница подтверждения показывает текст заметки.
+    with_text = True
+
+    async def get(self, request, *args, **kwargs):
+        note = await self.get_note()
+        return render(request, self.template_name, {
+            'view': self, 'note': note, 'object': note,
+        })
+
+    async def post(self, request, *args, **kwargs):
+        note = await self.get_note()
+        if writebehind.enabled():
+            await sync_to_async(writebehind.delete)(note)
+        else:
+            await sync_to_async(note.delete)()
+        return redirect(self.success_url)
@@ -0,0 +1,45 @@
+"""Бэкенд аутентификации с кэшированным пользователем.
+
+AuthenticationMiddleware на каждом запросе загружает пользователя по id
+из сессии. CachedModelBackend.get_user() берёт его из кэша сессий
+(SESSION_CACHE_ALIAS), а запись сбрасывается при сохранении и удалении
+пользователя - в том числе при смене пароля. Изменения через
+QuerySet.update() сигналов не отправляют и видны после истечения
+NOTES_USER_CACHE_TIMEOUT.
+
+Кэш должен быть общим для всех процессов (проверка notes.W001):
+иначе после смены пароля другие воркеры продолжают отдавать старого
+пользователя, и хэш сессии сверяется с прежним паролем.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+USER_CACHE_PREFIX = 'notes:user'
+
+
+def get_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def user_key(user_id):
+    return f'{USER_CACHE_PREFIX}:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который читает пользователя сессии из кэша."""
+
+    def get_user(self, user_id):
+        cache = get_cache()
+        key = user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.NOTES_USER_CACHE_TIMEOUT)
+        return user
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """Обработчик post_save и post_delete модели пользователя."""
+    get_cache().delete(user_key(instance.pk))
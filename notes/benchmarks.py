@@ -0,0 +1,168 @@
+"""Вспомогательные функции для замеров производительности."""
+import itertools
+import math
+import random
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows.
+    resource = None
+
+from django.contrib.auth import get_user_model
+
+from .models import Note
+from .transfer import IMPORT_BATCH_SIZE, save_batch
+
+BENCH_PREFIX = 'bench'
+# Словарь для текстов заметок: часть слов встречается часто, часть редко.
+VOCABULARY = tuple(f'слово{index}' for index in range(2000))
+# Материал для заголовков: кириллица, латиница и типографские знаки.
+TITLE_ALPHABETS = (
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ',
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+)
+TITLE_MARKS = ('—', '–', '«', '»', '&', '№', '!', '?', ',', ':', '…', '"')
+
+
+def make_text(rng, size):
+    """Текст примерно из size символов со словами из VOCABULARY."""
+    words = []
+    length = 0
+    while length < size:
+        # Квадрат равномерной величины даёт частые слова в начале словаря.
+        word = VOCABULARY[int(rng.random() ** 2 * len(VOCABULARY))]
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def make_title(rng, ascii_share=0.3):
+    """Заголовок из 1-8 слов; доля ascii_share - только латиница."""
+    alphabets = TITLE_ALPHABETS[1:] if rng.random() < ascii_share else (
+        TITLE_ALPHABETS
+    )
+    words = []
+    for _ in range(rng.randint(1, 8)):
+        alphabet = rng.choice(alphabets)
+        word = ''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 10)))
+        if rng.random() < 0.2 and alphabets is TITLE_ALPHABETS:
+            word += rng.choice(TITLE_MARKS)
+        words.append(word)
+    return ' '.join(words)
+
+
+def percentile(samples, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(func, repeat):
+    """Вызывает func repeat раз и возвращает длительности в секундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def memory_peak(func, repeat):
+    """Пик памяти Python (КиБ) за repeat вызовов func по tracemalloc."""
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        for _ in range(repeat):
+            func()
+        return (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def max_rss_kib():
+    """Пиковый размер процесса в КиБ или None, если он недоступен."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS отдаёт байты, Linux - килобайты.
+    return rss / 1024 if sys.platform == 'darwin' else rss
+
+
+def parse_sizes(value):
+    """Распределение размеров текста из строки "200:70,2000:25,20000:5".
+
+    Ключ - размер текста в символах, значение - вес. Одиночное число
+    без веса - все заметки одного размера.
+    """
+    sizes = {}
+    for item in value.split(','):
+        size, _, weight = item.partition(':')
+        sizes[int(size)] = int(weight or 1)
+    if not sizes or min(sizes) < 0 or min(sizes.values()) <= 0:
+        raise ValueError('Размеры и веса должны быть положительными.')
+    return sizes
+
+
+def summarize(samples):
+    """Сводка по замерам в миллисекундах."""
+    return {
+        'count': len(samples),
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'max_ms': max(samples, default=0.0) * 1000,
+    }
+
+
+def seed_notes(users, notes_per_user, text_size=200, seed=0):
+    """Создаёт users пользователей по notes_per_user заметок у каждого.
+
+    text_size - размер текста или распределение {размер: вес} из
+    parse_sizes(). Заметки сохраняются пачками через save_batch(), как
+    при импорте: поисковый индекс, счётчики авторов, вынесенные тексты,
+    HTML и первые ревизии заполняются так же, как у заметок из формы.
+    """
+    rng = random.Random(seed)
+    if isinstance(text_size, dict):
+        sizes, weights = zip(*text_size.items())
+
+        def pick_size():
+            return rng.choices(sizes, weights)[0]
+    else:
+        def pick_size():
+            return text_size
+    User = get_user_model()
+    authors = User.objects.bulk_create(
+        User(username=f'{BENCH_PREFIX}-user-{index}')
+        for index in range(users)
+    )
+    if not authors or authors[0].pk is None:
+        # Не все бэкенды возвращают pk из bulk_create.
+        authors = list(User.objects.filter(
+            username__startswith=f'{BENCH_PREFIX}-user-'
+        ).order_by('id'))
+    notes = iter(
+        Note(
+            title=f'Заметка {index}',
+            text=make_text(rng, pick_size()),
+            slug=f'{BENCH_PREFIX}-{author.pk}-{index}',
+            author=author,
+        )
+        for author in authors
+        for index in range(notes_per_user)
+    )
+    batch = list(itertools.islice(notes, IMPORT_BATCH_SIZE))
+    while batch:
+        save_batch(batch)
+        batch = list(itertools.islice(notes, IMPORT_BATCH_SIZE))
+    return authors
@@ -0,0 +1,116 @@
+"""Кэш готовых страниц заметок с версионными ключами.
+
+Ключ страницы включает версию: для страницы заметки - версию пары
+(автор, slug), для списка - версию всех заметок автора. Сохранение и
+удаление заметки увеличивает версии, и старые записи кэша просто
+перестают читаться, пока не истечёт их срок. Рядом с версией хранится
+метка времени последнего изменения - из пары версия/метка строятся
+ETag и Last-Modified без обращения к таблице заметок.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+PAGE_CACHE_PREFIX = 'notes:page'
+VERSION_PREFIX = 'notes:version'
+STATS_PREFIX = 'notes:cache-stats'
+STATS_EVENTS = ('hit', 'miss')
+
+
+def get_cache():
+    return caches[settings.NOTES_PAGE_CACHE_ALIAS]
+
+
+def note_version_key(author_id, slug):
+    return f'{VERSION_PREFIX}:note:{author_id}:{slug}'
+
+
+def author_version_key(author_id):
+    return f'{VERSION_PREFIX}:author:{author_id}'
+
+
+def changed_key(version_key):
+    return f'{version_key}:changed'
+
+
+def get_version(key):
+    """Текущая версия и время последнего изменения (timestamp).
+
+    Отсутствующие значения заводятся заново: версия - из часов, чтобы
+    после вытеснения ключа не совпасть с уже использованной, а время
+    изменения - текущее, то есть заведомо не раньше настоящего.
+    """
+    cache = get_cache()
+    values = cache.get_many((key, changed_key(key)))
+    version = values.get(key)
+    changed = values.get(changed_key(key))
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    if changed is None:
+        changed = time.time()
+        if not cache.add(changed_key(key), changed, timeout=None):
+            changed = cache.get(changed_key(key), changed)
+    return version, changed
+
+
+def bump_versions(*keys):
+    cache = get_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+    now = time.time()
+    cache.set_many({changed_key(key): now for key in keys}, timeout=None)
+
+
+def invalidate_note(author_id, *slugs):
+    """Сбрасывает кэш страниц заметки и списка заметок автора.
+
+    Версии увеличиваются сразу и ещё раз после коммита: страница,
+    закэшированная из данных до коммита, тоже станет недоступна.
+    """
+    keys = [author_version_key(author_id)]
+    keys.extend(note_version_key(author_id, slug) for slug in set(slugs))
+    bump_versions(*keys)
+    transaction.on_commit(
+        lambda: bump_versions(*keys), using=settings.NOTES_WRITE_DATABASE
+    )
+
+
+def page_key(page, user_id, version, variant=''):
+    digest = hashlib.md5(variant.encode()).hexdigest()
+    return f'{PAGE_CACHE_PREFIX}:{page}:{user_id}:{version}:{digest}'
+
+
+def stats_key(page, event):
+    return f'{STATS_PREFIX}:{page}:{event}'
+
+
+def count(page, event):
+    """Увеличивает счётчик попаданий или промахов кэша страницы."""
+    cache = get_cache()
+    key = stats_key(page, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_stats(pages):
+    """Счётчики в виде {(page, event): value}."""
+    keys = {
+        stats_key(page, event): (page, event)
+        for page in pages
+        for event in STATS_EVENTS
+    }
+    values = get_cache().get_many(keys)
+    return {
+        label: values.get(key, 0) for key, label in keys.items()
+    }
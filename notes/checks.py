@@ -0,0 +1,35 @@
+"""Системные проверки настроек приложения notes (manage.py check).
+
+В производственном режиме работает несколько процессов, и кэш, через
+который они согласуют состояние, должен быть у них общим.
+LocMemCache у каждого процесса свой: правка в одном воркере не
+сбрасывает страницы, закэшированные другими, а пользователь с
+изменённым паролем остаётся в кэше других воркеров, а лимит частоты
+запросов умножается на число воркеров.
+"""
+from django.conf import settings
+from django.core import checks
+
+LOCMEM_BACKEND = 'django.core.cache.backends.locmem.LocMemCache'
+# Настройки с псевдонимами кэшей, которые должны быть общими.
+SHARED_CACHE_SETTINGS = (
+    'NOTES_PAGE_CACHE_ALIAS',
+    'SESSION_CACHE_ALIAS',
+    'NOTES_RATE_LIMIT_CACHE_ALIAS',
+)
+
+
+def check_shared_caches(app_configs, **kwargs):
+    if not settings.NOTES_PRODUCTION:
+        return []
+    return [
+        checks.Warning(
+            f'{name} = {alias!r}: кэш LocMemCache виден только своему '
+            f'процессу.',
+            hint='Задайте NOTES_MEMCACHED или укажите общий кэш.',
+            id='notes.W001',
+        )
+        for name in SHARED_CACHE_SETTINGS
+        for alias in (getattr(settings, name),)
+        if settings.CACHES[alias]['BACKEND'] == LOCMEM_BACKEND
+    ]
@@ -0,0 +1,31 @@
+"""Контекст-процессоры шаблонов."""
+from django.urls import get_script_prefix, reverse
+
+# Ключ в header_urls -> имя маршрута ссылки в шапке.
+HEADER_URLS = {
+    'home': 'notes:home',
+    'list': 'notes:list',
+    'add': 'notes:add',
+    'search': 'notes:search',
+    'import': 'notes:import',
+    'logout': 'users:logout',
+    'login': 'users:login',
+    'signup': 'users:signup',
+}
+
+_header_urls = {}
+
+
+def header_urls(request):
+    """Адреса ссылок шапки, вычисленные один раз на процесс.
+
+    Адреса зависят только от префикса сайта, поэтому шапке не нужно
+    вызывать reverse() на каждой странице.
+    """
+    prefix = get_script_prefix()
+    urls = _header_urls.get(prefix)
+    if urls is None:
+        urls = _header_urls[prefix] = {
+            key: reverse(name) for key, name in HEADER_URLS.items()
+        }
+    return {'header_urls': urls}
@@ -0,0 +1,32 @@
+"""Настройка соединений SQLite.
+
+Прагмы из settings.SQLITE_PRAGMAS применяются к каждому новому
+соединению через сигнал connection_created: WAL позволяет читать во
+время записи, busy_timeout - ждать блокировку вместо ошибки
+"database is locked". Соединение для чтения (NOTES_READ_DATABASE)
+дополнительно переводится в режим query_only.
+"""
+from django.conf import settings
+
+READ_ONLY_PRAGMAS = {'query_only': 'ON'}
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def get_pragmas(alias):
+    pragmas = dict(settings.SQLITE_PRAGMAS)
+    read, write = settings.NOTES_READ_DATABASE, settings.NOTES_WRITE_DATABASE
+    if alias == read != write:
+        pragmas.update(READ_ONLY_PRAGMAS)
+    return pragmas
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_pragmas(connection.alias))
@@ -1,11 +1,15 @@
-from pytils.translit import slugify
-
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError
 
+from . import routers, writebehind
 from .models import Note
 
 WARNING = ' - такой slug уже существует, придумайте уникальное значение!'
+CONFLICT_WARNING = (
+    'Заметку уже изменили в другом окне. Проверьте текст: повторное '
+    'сохранение заменит чужие изменения вашими.'
+)
 
 
 class NoteForm(forms.ModelForm):
@@ -13,17 +17,91 @@ class NoteForm(forms.ModelForm):
 
     class Meta:
         model = Note
-        fields = ('title', 'text', 'slug')
+        fields = ('title', 'text', 'slug', 'version')
+        widgets = {'version': forms.HiddenInput}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Клиент без поля версии правит ту версию, что прочитана из базы.
+        self.fields['version'].required = False
+
+    def clean_version(self):
+        """Версия, с которой пользователь начал правку."""
+        version = self.cleaned_data.get('version')
+        return self.instance.version if version is None else version
+
+    def get_update_fields(self):
+        """Изменённые в форме поля - только они попадут в UPDATE."""
+        return [
+            name for name in self.changed_data
+            if name in self.Meta.fields and name != 'version'
+        ]
 
     def clean_slug(self):
-        """Обрабатывает случай, если slug не уникален."""
-        cleaned_data = super().clean()
-        slug = cleaned_data.get('slug')
+        """Обрабатывает случай, если slug не уникален.
+
+        Пустой slug не проверяется: свободный адрес по заголовку
+        выдаст Note.save(). Проверка идёт по основной базе: в реплике
+        может ещё не быть только что занятого адреса. Адрес из журнала
+        отложенной записи тоже считается занятым.
+        """
+        slug = self.cleaned_data.get('slug')
         if not slug:
-            title = cleaned_data.get('title')
-            slug = slugify(title)[:100]
-        if Note.objects.filter(
-                slug=slug
-        ).exclude(id=self.instance.pk).exists():
+            return slug
+        if self.slug_taken(slug) or writebehind.is_slug_pending(slug):
             raise ValidationError(slug + WARNING)
         return slug
+
+    def slug_taken(self, slug):
+        return Note.objects.using(routers.primary_database()).filter(
+            slug=slug
+        ).exclude(id=self.instance.pk).exists()
+
+    def save(self, commit=True):
+        """Существующая заметка сохраняется только по изменённым полям.
+
+        Заданный в форме slug мог занять параллельный запрос уже после
+        clean_slug. Тогда ошибка добавляется к полю slug и
+        выбрасывается ValidationError: представление показывает форму
+        с ошибкой, а не ответ 500.
+        """
+        note = super().save(commit=False)
+        if commit:
+            try:
+                note.save(update_fields=None if note._state.adding
+                          else self.get_update_fields())
+            except IntegrityError:
+                slug = self.cleaned_data.get('slug')
+                if not slug or not self.slug_taken(slug):
+                    raise
+                error = ValidationError(slug + WARNING)
+                self.add_error('slug', error)
+                raise error
+        return note
+
+    def mark_conflict(self, conflict):
+        """Показывает конфликт версий в форме.
+
+        Версия в форме заменяется текущей: повторная отправка формы -
+        осознанная перезапись.
+        """
+        self.data = self.data.copy()
+        self.data[self.add_prefix('version')] = conflict.current_version
+        self.add_error(None, CONFLICT_WARNING)
+
+    def validate_unique(self):
+        """Уникальность уже проверена в clean_slug.
+
+        Других уникальных полей у модели нет, так что повторный запрос
+        к базе не нужен.
+        """
+
+
+class NoteImportForm(forms.Form):
+    """Форма загрузки заметок из файла JSON Lines."""
+
+    file = forms.FileField(
+        label='Файл',
+        help_text=('По одной заметке в строке: '
+                   '{"title": "...", "text": "...", "slug": "..."}')
+    )
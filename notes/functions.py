@@ -0,0 +1,20 @@
+"""Функции базы данных для выражений ORM."""
+from django.db import models
+
+
+class OctetLength(models.Func):
+    """Длина текста в байтах UTF-8, а не в символах, как у Length."""
+    function = 'OCTET_LENGTH'
+    output_field = models.PositiveBigIntegerField()
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template='LENGTH(CAST(%(expressions)s AS BLOB))',
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection, function='LENGTH', **extra_context
+        )
@@ -0,0 +1,139 @@
+"""Нагрузочный прогон WSGI- и ASGI-приложения в одном процессе.
+
+Приложения вызываются напрямую, без сетевого сервера. Медленный клиент
+моделируется задержкой перед получением тела запроса: WSGI-сервер на
+это время занимает поток из пула, ASGI-сервер ждёт в цикле событий.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+def wsgi_environ(path, cookie):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': BytesIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, cookie):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'cookie', cookie.encode()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': ('testserver', 80),
+    }
+
+
+def run_wsgi(application, paths, cookie, clients, requests_per_client,
+             threads, client_delay):
+    """Клиенты шлют запросы по очереди, сервер - пул из threads потоков.
+
+    Возвращает (длительности запросов, статусы, общее время).
+    """
+    latencies = []
+    statuses = []
+    lock = threading.Lock()
+
+    def serve(path):
+        time.sleep(client_delay)
+        status = []
+        body = application(
+            wsgi_environ(path, cookie),
+            lambda code, headers, exc_info=None: status.append(code),
+        )
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return int(status[0].split()[0])
+
+    def client(pool, number):
+        for index in range(requests_per_client):
+            path = paths[(number + index) % len(paths)]
+            started = time.perf_counter()
+            code = pool.submit(serve, path).result()
+            with lock:
+                latencies.append(time.perf_counter() - started)
+                statuses.append(code)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        client_threads = [
+            threading.Thread(target=client, args=(pool, number))
+            for number in range(clients)
+        ]
+        for thread in client_threads:
+            thread.start()
+        for thread in client_threads:
+            thread.join()
+    return latencies, statuses, time.perf_counter() - started
+
+
+def run_asgi(application, paths, cookie, clients, requests_per_client,
+             client_delay):
+    """Клиенты - задачи asyncio, сервер - один цикл событий.
+
+    Возвращает (длительности запросов, статусы, общее время).
+    """
+    latencies = []
+    statuses = []
+
+    async def request(path):
+        async def receive():
+            await asyncio.sleep(client_delay)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        await application(asgi_scope(path, cookie), receive, send)
+        return status[0]
+
+    async def client(number):
+        for index in range(requests_per_client):
+            path = paths[(number + index) % len(paths)]
+            started = time.perf_counter()
+            code = await request(path)
+            latencies.append(time.perf_counter() - started)
+            statuses.append(code)
+
+    async def main():
+        await asyncio.gather(*(client(number) for number in range(clients)))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return latencies, statuses, time.perf_counter() - started
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from notes.benchmarks import seed_notes, summarize
+from notes.loadtest import run_asgi, run_wsgi
+from notes.models import Note
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и задержки WSGI и ASGI при '
+        'большом числе медленных клиентов. Данные для прогона '
+        'создаются в базе и удаляются после него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=5,
+                            help='Запросов от каждого клиента.')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Размер пула потоков WSGI-сервера.')
+        parser.add_argument('--client-delay', type=float, default=0.05,
+                            help='Задержка медленного клиента, секунды.')
+        parser.add_argument('--notes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        author, = seed_notes(1, options['notes'])
+        try:
+            self.run(author, options)
+        finally:
+            author.delete()
+
+    def run(self, author, options):
+        client = Client()
+        client.force_login(author)
+        cookie = (f'{settings.SESSION_COOKIE_NAME}='
+                  f'{client.cookies[settings.SESSION_COOKIE_NAME].value}')
+        slug = Note.objects.filter(author=author).values_list(
+            'slug', flat=True
+        ).first()
+        sync_paths = [reverse('notes:list'),
+                      reverse('notes:detail', args=(slug,))]
+        async_paths = [reverse('notes:async-list'),
+                       reverse('notes:async-detail', args=(slug,))]
+        load = (cookie, options['clients'], options['requests'])
+        runs = (
+            ('WSGI, синхронные', lambda: run_wsgi(
+                WSGIHandler(), sync_paths, *load,
+                options['threads'], options['client_delay'],
+            )),
+            ('ASGI, синхронные', lambda: run_asgi(
+                ASGIHandler(), sync_paths, *load, options['client_delay'],
+            )),
+            ('ASGI, асинхронные', lambda: run_asgi(
+                ASGIHandler(), async_paths, *load, options['client_delay'],
+            )),
+        )
+        for name, run in runs:
+            latencies, statuses, elapsed = run()
+            stats = summarize(latencies)
+            errors = sum(status != 200 for status in statuses)
+            self.stdout.write(
+                f'{name:>18}: {len(latencies) / elapsed:8.1f} запр/с, '
+                f'p50 {stats["p50_ms"]:.1f} ms, '
+                f'p99 {stats["p99_ms"]:.1f} ms, ошибок {errors}'
+            )
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.benchmarks import measure, seed_notes, summarize
+from notes.models import Note
+from notes.pagination import KEYSET_ORDERING
+from notes.views import NotesList
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу пользователями и заметками и выводит планы '
+        'запросов и задержки (p50/p99) для запросов каждого представления. '
+        'Все созданные данные откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--notes', type=int, default=500,
+                            help='Заметок у каждого пользователя.')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            authors = seed_notes(options['users'], options['notes'])
+            # Берём автора из середины, чтобы его заметки не были
+            # первыми строками таблицы.
+            author = authors[len(authors) // 2]
+            slug = Note.objects.filter(author=author).values_list(
+                'slug', flat=True
+            ).last()
+            for name, query in self.view_queries(author, slug).items():
+                self.report(name, query, options['repeat'])
+            transaction.set_rollback(True)
+
+    def view_queries(self, author, slug):
+        """Запросы, которые выполняют представления notes."""
+        notes = Note.objects.filter(author=author)
+        return {
+            # Как paginate_keyset(): страница и лишняя строка за ней.
+            'notes:list': lambda: notes.summaries().order_by(
+                *KEYSET_ORDERING
+            )[:NotesList.paginate_by + 1],
+            'notes:detail / notes:edit / notes:delete':
+                lambda: notes.filter(slug=slug),
+            'notes:add (NoteForm.clean_slug)':
+                lambda: Note.objects.filter(slug=slug).exclude(id=None),
+        }
+
+    def report(self, name, query, repeat):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        queryset = query()
+        self.stdout.write(queryset.explain())
+        stats = summarize(measure(lambda: list(query()), repeat))
+        self.stdout.write(
+            'p50 {p50_ms:.3f} ms, p99 {p99_ms:.3f} ms, '
+            'max {max_ms:.3f} ms ({count} запусков)'.format(**stats)
+        )
@@ -0,0 +1,89 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import Length
+from django.test import override_settings
+
+from notes import routers
+from notes.benchmarks import VOCABULARY, measure, seed_notes, summarize
+from notes.models import Note, NoteRevision
+
+
+def edit_text(rng, text):
+    """Правка в несколько слов: замена, вставка или удаление."""
+    words = text.split(' ')
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(words))
+        action = rng.random()
+        if action < 0.6:
+            words[position] = rng.choice(VOCABULARY)
+        elif action < 0.8 or len(words) < 2:
+            words.insert(position, rng.choice(VOCABULARY))
+        else:
+            del words[position]
+    return ' '.join(words)
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает историю заметки из сотен правок при разной частоте '
+        'снимков NOTES_REVISION_SNAPSHOT_EVERY и сравнивает её размер с '
+        'полными копиями текста, время записи ревизии и время сборки '
+        'случайной ревизии. Все созданные данные откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revisions', type=int, nargs='+',
+                            default=[100, 500],
+                            help='Правок заметки на каждом шаге.')
+        parser.add_argument('--snapshot-every', type=int, nargs='+',
+                            default=[1, 10, 20, 50],
+                            help='Частоты снимков; 1 - каждая ревизия '
+                                 'хранит текст целиком.')
+        parser.add_argument('--size', type=int, default=4000,
+                            help='Символов в тексте заметки.')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        for revisions in options['revisions']:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{revisions} правок текста из {options["size"]} символов'
+            ))
+            for every in options['snapshot_every']:
+                with override_settings(NOTES_REVISION_SNAPSHOT_EVERY=every):
+                    self.report(
+                        revisions, every, options['size'], options['repeat']
+                    )
+
+    def report(self, revisions, every, size, repeat):
+        rng = random.Random(0)
+        using = routers.primary_database()
+        with transaction.atomic(using=using):
+            author, = seed_notes(1, 1, text_size=size)
+            note = Note.objects.using(using).get(author=author)
+            history = NoteRevision.objects.using(using).filter(note=note)
+
+            def record():
+                previous = note.text
+                note.text = edit_text(rng, previous)
+                note.revision += 1
+                history.record(note, note.text, previous)
+
+            saves = summarize(measure(record, revisions))
+            stored = history.aggregate(
+                data=Sum(Length('data')), text=Sum('size')
+            )
+            reconstruct = summarize(measure(
+                lambda: history.reconstruct(rng.randint(1, note.revision)),
+                repeat,
+            ))
+            transaction.set_rollback(True)
+        self.stdout.write(
+            f'снимок раз в {every:>3}: история {stored["data"] / 1024:.1f} '
+            f'КиБ (полные копии {stored["text"] / 1024:.1f} КиБ), '
+            f'запись ревизии p50 {saves["p50_ms"]:.3f} ms, '
+            f'сборка p50 {reconstruct["p50_ms"]:.3f} ms, '
+            f'p99 {reconstruct["p99_ms"]:.3f} ms'
+        )
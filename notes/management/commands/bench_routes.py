@@ -0,0 +1,314 @@
+import itertools
+import json
+import platform
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from notes import cache as page_cache
+from notes import metrics, urls
+from notes.benchmarks import (
+    BENCH_PREFIX, VOCABULARY, max_rss_kib, memory_peak, parse_sizes,
+    seed_notes, summarize
+)
+from notes.models import Note
+from yanote.urls import auth_urls
+
+PASSWORD = 'Pa55-word-Xq7!'
+
+
+def url_names():
+    """Имена всех маршрутов notes.urls и auth_urls."""
+    app_urls, app_name = auth_urls
+    return {
+        f'{urls.app_name}:{pattern.name}' for pattern in urls.urlpatterns
+    } | {f'{app_name}:{pattern.name}' for pattern in app_urls}
+
+
+def json_request(payload):
+    return {'data': json.dumps(payload), 'content_type': 'application/json'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все маршруты notes.urls и auth_urls через тестовый '
+        'клиент на заполненной базе и сохраняет пропускную способность, '
+        'p50/p95/p99, число запросов к базе и пик памяти в JSON. Данные '
+        'для прогона создаются в базе и удаляются после него.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--notes', type=int, default=200,
+                            help='Заметок у каждого пользователя.')
+        parser.add_argument(
+            '--sizes', type=parse_sizes, default='200:70,2000:25,20000:5',
+            help='Распределение размеров текста: "размер:вес,...".',
+        )
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Запросов к каждому маршруту.')
+        parser.add_argument('--memory-repeat', type=int, default=3,
+                            help='Запросов для замера пика памяти.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cold-cache', action='store_true',
+                            help='Очищать кэш страниц перед запросом.')
+        parser.add_argument('--output', default='bench_routes.json')
+        parser.add_argument('--baseline',
+                            help='JSON прошлого прогона для сравнения.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Допустимый рост p95, доля.')
+
+    def handle(self, *args, **options):
+        self.options = options
+        authors = seed_notes(
+            options['users'], options['notes'], options['sizes'],
+            options['seed'],
+        )
+        try:
+            # Прогон повторяет запросы чаще лимитов NOTES_RATE_LIMITS.
+            with override_settings(NOTES_RATE_LIMITS={}):
+                results = self.run(authors[len(authors) // 2])
+        finally:
+            get_user_model().objects.filter(
+                username__startswith=f'{BENCH_PREFIX}-'
+            ).delete()
+        report = {
+            'settings': {
+                'users': options['users'],
+                'notes': options['notes'],
+                'sizes': options['sizes'],
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+                'cold_cache': options['cold_cache'],
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+            },
+            'max_rss_kib': max_rss_kib(),
+            'routes': results,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def run(self, author):
+        author.set_password(PASSWORD)
+        author.save(update_fields=('password',))
+        clients = {'author': Client(), 'guest': Client()}
+        clients['author'].force_login(author)
+        routes = self.routes(author)
+        missing = url_names() - {name.split()[1] for name, *_ in routes}
+        if missing:
+            self.stderr.write('Без замеров: ' + ', '.join(sorted(missing)))
+        results = {}
+        for name, client, method, make_request in routes:
+            results[name] = self.measure(
+                clients[client], method, make_request
+            )
+            self.stdout.write(
+                '{name:<32} {throughput_rps:8.1f} запр/с, '
+                'p50 {p50_ms:7.2f} ms, p99 {p99_ms:7.2f} ms, '
+                'запросов к базе {queries:.1f}, '
+                'память {memory_peak_kib:.0f} КиБ'.format(
+                    name=name, **results[name]
+                )
+            )
+        return results
+
+    def routes(self, author):
+        """(маршрут, клиент, метод, функция номер -> (путь, аргументы))."""
+        slugs = list(Note.objects.filter(author=author).values_list(
+            'slug', flat=True
+        ))
+        edited = slugs[0]
+
+        def path(name, *args):
+            return lambda index: (reverse(name, args=args), {})
+
+        def detail(name):
+            return lambda index: (
+                reverse(name, args=(slugs[index % len(slugs)],)), {}
+            )
+
+        def fresh_note(name, method='post', **kwargs):
+            def make_request(index):
+                note = Note.objects.create(
+                    title=f'Удаляемая {index}', text='Текст',
+                    slug=f'{BENCH_PREFIX}-{name.replace(":", "-")}-{index}',
+                    author=author,
+                )
+                return reverse(name, args=(note.slug,)), kwargs
+            return make_request
+
+        def note_form(index):
+            return {'data': {'title': f'Новая заметка {index}',
+                             'text': ' '.join(VOCABULARY[:50])}}
+
+        def edit_form(index):
+            return {'data': {'title': f'Правка {index}', 'text': 'Текст',
+                             'slug': edited}}
+
+        def import_file(index):
+            lines = ''.join(
+                json.dumps({'title': f'Импорт {index}-{line}',
+                            'text': 'Текст'}, ensure_ascii=False) + '\n'
+                for line in range(10)
+            )
+            return {'data': {'file': SimpleUploadedFile(
+                'notes.jsonl', lines.encode()
+            )}}
+
+        def signup(index):
+            return {'data': {'username': f'{BENCH_PREFIX}-signup-{index}',
+                             'password1': PASSWORD,
+                             'password2': PASSWORD}}
+
+        def with_data(name, make_data, *args):
+            return lambda index: (reverse(name, args=args), make_data(index))
+
+        return [
+            ('GET notes:home', 'author', 'get', path('notes:home')),
+            ('GET notes:list', 'author', 'get', path('notes:list')),
+            ('GET notes:list?stream=1', 'author', 'get', lambda index: (
+                reverse('notes:list'), {'data': {'stream': 1}}
+            )),
+            ('GET notes:detail', 'author', 'get', detail('notes:detail')),
+            ('GET notes:add', 'author', 'get', path('notes:add')),
+            ('POST notes:add', 'author', 'post',
+             with_data('notes:add', note_form)),
+            ('GET notes:edit', 'author', 'get', path('notes:edit', edited)),
+            ('POST notes:edit', 'author', 'post',
+             with_data('notes:edit', edit_form, edited)),
+            ('GET notes:delete', 'author', 'get', detail('notes:delete')),
+            ('POST notes:delete', 'author', 'post',
+             fresh_note('notes:delete')),
+            ('GET notes:success', 'author', 'get', path('notes:success')),
+            ('GET notes:search', 'author', 'get', lambda index: (
+                reverse('notes:search'), {'data': {'q': VOCABULARY[index]}}
+            )),
+            ('GET notes:import', 'author', 'get', path('notes:import')),
+            ('POST notes:import', 'author', 'post',
+             with_data('notes:import', import_file)),
+            ('GET notes:export', 'author', 'get', path('notes:export')),
+            ('GET notes:api-list', 'author', 'get', path('notes:api-list')),
+            ('POST notes:api-list', 'author', 'post', with_data(
+                'notes:api-list',
+                lambda index: json_request(note_form(index)['data']),
+            )),
+            ('GET notes:api-detail', 'author', 'get',
+             detail('notes:api-detail')),
+            ('PATCH notes:api-detail', 'author', 'patch', with_data(
+                'notes:api-detail',
+                lambda index: json_request({'title': f'Правка {index}'}),
+                edited,
+            )),
+            ('DELETE notes:api-detail', 'author', 'delete',
+             fresh_note('notes:api-detail')),
+            # Правки выше уже создали историю заметки edited.
+            ('GET notes:api-revisions', 'author', 'get',
+             path('notes:api-revisions', edited)),
+            ('GET notes:api-revision', 'author', 'get',
+             path('notes:api-revision', edited, 1)),
+            ('POST notes:api-revision-restore', 'author', 'post', with_data(
+                'notes:api-revision-restore', lambda index: json_request({}),
+                edited, 1,
+            )),
+            ('GET notes:async-list', 'author', 'get',
+             path('notes:async-list')),
+            ('GET notes:async-detail', 'author', 'get',
+             detail('notes:async-detail')),
+            ('GET notes:async-add', 'author', 'get', path('notes:async-add')),
+            ('POST notes:async-add', 'author', 'post',
+             with_data('notes:async-add', note_form)),
+            ('GET notes:async-edit', 'author', 'get',
+             path('notes:async-edit', edited)),
+            ('POST notes:async-edit', 'author', 'post',
+             with_data('notes:async-edit', edit_form, edited)),
+            ('GET notes:async-delete', 'author', 'get',
+             detail('notes:async-delete')),
+            ('POST notes:async-delete', 'author', 'post',
+             fresh_note('notes:async-delete')),
+            ('GET notes:metrics', 'guest', 'get', path('notes:metrics')),
+            ('GET notes:cache-stats', 'guest', 'get',
+             path('notes:cache-stats')),
+            ('GET users:login', 'guest', 'get', path('users:login')),
+            ('POST users:login', 'guest', 'post', with_data(
+                'users:login',
+                lambda index: {'data': {'username': author.username,
+                                        'password': PASSWORD}},
+            )),
+            ('POST users:logout', 'guest', 'post', path('users:logout')),
+            ('GET users:signup', 'guest', 'get', path('users:signup')),
+            ('POST users:signup', 'guest', 'post',
+             with_data('users:signup', signup)),
+        ]
+
+    def measure(self, client, method, make_request):
+        """Задержки, ошибки и запросы к базе; затем пик памяти."""
+        repeat = self.options['repeat']
+        numbers = itertools.count()
+        samples = []
+        errors = 0
+
+        def request():
+            nonlocal errors
+            if self.options['cold_cache']:
+                page_cache.get_cache().clear()
+            path, kwargs = make_request(next(numbers))
+            started = time.perf_counter()
+            response = getattr(client, method)(path, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            samples.append(time.perf_counter() - started)
+            errors += response.status_code >= 400
+
+        metrics.reset()
+        for _ in range(repeat):
+            request()
+        queries = sum(
+            stats.queries for stats in metrics.get_stats().values()
+        )
+        result = summarize(samples)
+        result.update(
+            errors=errors,
+            throughput_rps=repeat / sum(samples),
+            queries=queries / repeat,
+        )
+        # Отдельным проходом: tracemalloc замедляет запросы.
+        result['memory_peak_kib'] = memory_peak(
+            request, self.options['memory_repeat']
+        )
+        return result
+
+    def compare(self, results, baseline_path, tolerance):
+        """Маршруты, где p95 или число запросов выросли против прошлого."""
+        with open(baseline_path, encoding='utf-8') as file:
+            baseline = json.load(file)['routes']
+        regressions = []
+        for name, result in results.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            if result['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+                regressions.append(
+                    f'{name}: p95 {old["p95_ms"]:.2f} -> '
+                    f'{result["p95_ms"]:.2f} ms'
+                )
+            if result['queries'] > old['queries']:
+                regressions.append(
+                    f'{name}: запросов {old["queries"]:.1f} -> '
+                    f'{result["queries"]:.1f}'
+                )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write('Регрессий относительно базового прогона нет.')
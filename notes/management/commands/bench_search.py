@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from notes.benchmarks import VOCABULARY, measure, seed_notes, summarize
+from notes.models import Note, NoteTerm
+from notes.search import query_terms
+from notes.views import NoteSearch
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по индексу NoteTerm с перебором через icontains '
+        'для нескольких размеров базы. Все созданные данные откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, nargs='+',
+                            default=[100, 1000, 5000],
+                            help='Заметок у автора на каждом шаге.')
+        parser.add_argument('--repeat', type=int, default=50)
+        # Редкие слова и частое слово: индекс выигрывает на первых,
+        # а ранжирование частого слова требует прочитать все вхождения.
+        parser.add_argument(
+            '--query', nargs='+',
+            default=[f'{VOCABULARY[-1]} {VOCABULARY[-300]}', VOCABULARY[3]],
+        )
+
+    def handle(self, *args, **options):
+        for notes in options['notes']:
+            with transaction.atomic():
+                author, = seed_notes(1, notes, text_size=400)
+                for query in options['query']:
+                    self.report(author, notes, query, options['repeat'])
+                transaction.set_rollback(True)
+
+    def report(self, author, notes, query, repeat):
+        per_page = NoteSearch.paginate_by
+
+        def indexed():
+            return list(NoteTerm.objects.search(author, query, None, per_page))
+
+        def naive():
+            condition = Q()
+            for term in query_terms(query):
+                condition &= Q(title__icontains=term) | Q(
+                    text__icontains=term
+                )
+            return list(Note.objects.filter(author=author).filter(
+                condition
+            ).summaries()[:per_page])
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'{notes} заметок, запрос "{query}"'
+        ))
+        for name, func in (('индекс', indexed), ('icontains', naive)):
+            stats = summarize(measure(func, repeat))
+            self.stdout.write(
+                f'{name:>10}: p50 {stats["p50_ms"]:.3f} ms, '
+                f'p99 {stats["p99_ms"]:.3f} ms'
+            )
@@ -0,0 +1,70 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pytils.translit import slugify as pytils_slugify
+
+from notes import translit
+from notes.benchmarks import make_title
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает notes.translit.slugify() с pytils.translit.slugify() '
+        'на наборе заголовков: совпадение результатов и время на заголовок '
+        'для pytils, для таблицы без кэша и для повторных заголовков из '
+        'LRU-кэша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--titles', type=int, default=20000)
+        parser.add_argument('--ascii-share', type=float, default=0.3,
+                            help='Доля заголовков только из латиницы.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        titles = [
+            make_title(rng, options['ascii_share'])
+            for _ in range(options['titles'])
+        ]
+        expected = [pytils_slugify(title) for title in titles]
+        translit.slugify.cache_clear()
+        uncached = translit.slugify.__wrapped__
+        mismatches = [
+            title for title, slug in zip(titles, expected)
+            if uncached(title) != slug or translit.slugify(title) != slug
+        ]
+        if mismatches:
+            raise CommandError(
+                'Результат отличается от pytils: ' + repr(mismatches[:5])
+            )
+        corpora = (
+            ('все', titles),
+            ('ASCII', [title for title in titles if title.isascii()]),
+            # Повторные заголовки целиком помещаются в LRU-кэш.
+            ('повторы', titles[:translit.SLUG_CACHE_SIZE // 2]),
+        )
+        for name, corpus in corpora:
+            translit.slugify.cache_clear()
+            reference = self.measure(pytils_slugify, corpus)
+            results = [f'pytils {reference * 1e6:.2f} мкс']
+            for label, func in (('таблица', uncached),
+                                ('с кэшем', translit.slugify)):
+                per_title = self.measure(func, corpus)
+                results.append(
+                    f'{label} {per_title * 1e6:.2f} мкс '
+                    f'(x{reference / per_title:.1f})'
+                )
+            self.stdout.write(f'{name:>8}: ' + ', '.join(results))
+        self.stdout.write(f'Совпадает с pytils: {len(titles)} заголовков.')
+
+    def measure(self, func, titles):
+        """Лучший из трёх прогонов, секунд на заголовок."""
+        best = float('inf')
+        for _ in range(3):
+            started = time.perf_counter()
+            for title in titles:
+                func(title)
+            best = min(best, time.perf_counter() - started)
+        return best / max(len(titles), 1)
@@ -0,0 +1,119 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from notes.benchmarks import summarize
+from notes.db import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE note (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'title TEXT, text TEXT)',
+    'CREATE INDEX note_author ON note (author_id, id)',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает конкурентные чтение и запись в SQLite с настройками '
+        'по умолчанию (новое соединение на операцию, журнал отката) и с '
+        'settings.SQLITE_PRAGMAS и постоянными соединениями.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--authors', type=int, default=50)
+
+    def handle(self, *args, **options):
+        modes = (
+            ('по умолчанию', {}, False),
+            ('WAL + прагмы', settings.SQLITE_PRAGMAS, True),
+        )
+        for name, pragmas, persistent in modes:
+            with tempfile.TemporaryDirectory() as directory:
+                path = Path(directory) / 'bench.sqlite3'
+                result = self.run(path, pragmas, persistent, options)
+            self.report(name, *result)
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(path, timeout=1, check_same_thread=False)
+        apply_pragmas(connection, pragmas)
+        return connection
+
+    def seed(self, path, pragmas, authors):
+        connection = self.connect(path, pragmas)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.executemany(
+            'INSERT INTO note (author_id, title, text) VALUES (?, ?, ?)',
+            ((index % authors, 'Заметка', 'x' * 500)
+             for index in range(5000)),
+        )
+        connection.commit()
+        connection.close()
+
+    def run(self, path, pragmas, persistent, options):
+        self.seed(path, pragmas, options['authors'])
+        writes, reads, errors = [], [], []
+        deadline = time.perf_counter() + options['seconds']
+
+        def worker(number, operation, samples):
+            # Без постоянных соединений каждая операция открывает своё.
+            own = self.connect(path, pragmas) if persistent else None
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                current = own or self.connect(path, pragmas)
+                try:
+                    operation(current, number)
+                    samples.append(time.perf_counter() - started)
+                except sqlite3.OperationalError as error:
+                    errors.append(str(error))
+                finally:
+                    if current is not own:
+                        current.close()
+            if own is not None:
+                own.close()
+
+        def write(current, number):
+            current.execute(
+                'INSERT INTO note (author_id, title, text) VALUES (?, ?, ?)',
+                (number, 'Новая', 'y' * 500),
+            )
+            current.commit()
+
+        def read(current, number):
+            current.execute(
+                'SELECT id, title FROM note WHERE author_id = ? '
+                'ORDER BY id LIMIT 50', (number % options['authors'],),
+            ).fetchall()
+
+        threads = [
+            threading.Thread(target=worker, args=(number, write, writes))
+            for number in range(options['writers'])
+        ] + [
+            threading.Thread(target=worker, args=(number, read, reads))
+            for number in range(options['readers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return writes, reads, errors, options['seconds']
+
+    def report(self, name, writes, reads, errors, seconds):
+        write_stats = summarize(writes)
+        read_stats = summarize(reads)
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        self.stdout.write(
+            f'  запись: {len(writes) / seconds:.0f} оп/с, '
+            f'p99 {write_stats["p99_ms"]:.2f} ms\n'
+            f'  чтение: {len(reads) / seconds:.0f} оп/с, '
+            f'p99 {read_stats["p99_ms"]:.2f} ms\n'
+            f'  ошибок "database is locked" и др.: {len(errors)}'
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from notes import writebehind
+
+
+class Command(BaseCommand):
+    help = (
+        'Применяет журнал отложенной записи к основной базе пачками. С '
+        '--interval работает постоянно, как фоновый поток процесса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help='Операций в одной транзакции.')
+        parser.add_argument('--interval', type=float,
+                            help='Разбирать журнал раз в столько секунд.')
+
+    def handle(self, *args, **options):
+        while True:
+            applied = writebehind.drain(options['batch_size'])
+            if applied or options['interval'] is None:
+                self.stdout.write(f'Применено операций: {applied}')
+            if options['interval'] is None:
+                return
+            close_old_connections()
+            time.sleep(options['interval'])
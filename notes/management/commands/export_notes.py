@@ -0,0 +1,45 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.models import Note
+from notes.transfer import EXPORT_CHUNK_SIZE, export_notes
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает заметки пользователя в формате JSON Lines. '
+        'Статистика выводится в stderr.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--output', help='Файл JSONL; по умолчанию '
+                                             'заметки пишутся в stdout.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден.')
+        lines = export_notes(
+            Note.objects.filter(author=author), options['chunk_size']
+        )
+        started = time.perf_counter()
+        exported = 0
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                for exported, line in enumerate(lines, start=1):
+                    output.write(line)
+        else:
+            for exported, line in enumerate(lines, start=1):
+                self.stdout.write(line, ending='')
+        elapsed = time.perf_counter() - started
+        self.stderr.write(
+            f'Выгружено заметок: {exported} за {elapsed:.2f} с '
+            f'({exported / elapsed if elapsed else 0:.0f} заметок/с)'
+        )
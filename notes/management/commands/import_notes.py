@@ -0,0 +1,42 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.transfer import IMPORT_BATCH_SIZE, import_notes
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заметки пользователя из файла JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('path', help='Файл JSONL.')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            author = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError('Пользователь не найден.')
+        started = time.perf_counter()
+        renamed = []
+        try:
+            with open(options['path'], 'rb') as lines:
+                imported = import_notes(
+                    lines, author, batch_size=options['batch_size'],
+                    renamed=renamed,
+                )
+        except (OSError, ValidationError) as error:
+            raise CommandError(error)
+        finally:
+            for notice in renamed:
+                self.stderr.write(self.style.WARNING(notice))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Импортировано заметок: {imported} за {elapsed:.2f} с '
+            f'({imported / elapsed if elapsed else 0:.0f} заметок/с)'
+        )
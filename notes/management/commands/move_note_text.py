@@ -0,0 +1,110 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from notes import routers
+from notes.functions import OctetLength
+from notes.models import Note, NoteBody
+from notes.pagination import iterate_keyset
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит тексты заметок от NOTES_TEXT_EXTERNAL_BYTES байт в '
+        'сжатую таблицу NoteBody (с --inline - обратно в строки заметок) '
+        'и показывает размер базы и время чтения списка всех заметок до '
+        'и после.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--inline', action='store_true',
+                            help='Вернуть все тексты в строки заметок.')
+        parser.add_argument('--vacuum', action='store_true',
+                            help='Сжать файл базы после переноса (SQLite).')
+
+    def handle(self, *args, **options):
+        using = routers.primary_database()
+        connection = connections[using]
+        limit = settings.NOTES_TEXT_EXTERNAL_BYTES
+        if limit is None and not options['inline']:
+            raise CommandError('NOTES_TEXT_EXTERNAL_BYTES не задан.')
+        before = self.measure(connection)
+        if options['inline']:
+            moved = self.move_inline(using, options['batch_size'])
+        else:
+            moved = self.move_out(using, limit, options['batch_size'])
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+        after = self.measure(connection)
+        self.stdout.write(f'Перенесено текстов: {moved}')
+        for name, unit, index in (('Размер базы', 'КиБ', 0),
+                                  ('Чтение списка', 'ms', 1)):
+            if before[index] is not None:
+                self.stdout.write(
+                    f'{name}: {before[index]:.1f} -> '
+                    f'{after[index]:.1f} {unit}'
+                )
+
+    def move_out(self, using, limit, batch_size):
+        """Выносит большие тексты пачками: тексты, заметки и тела."""
+        notes = Note.objects.using(using).filter(
+            text_external=False
+        ).annotate(size=OctetLength('text')).filter(
+            size__gte=limit
+        ).only('id', 'text')
+        moved = 0
+        for batch in iterate_keyset(notes, batch_size, ordering=('id',)):
+            with transaction.atomic(using=using):
+                for note in batch:
+                    note.text_external = True
+                NoteBody.objects.using(using).store_batch(batch)
+                Note.objects.using(using).filter(
+                    pk__in=[note.pk for note in batch]
+                ).update(text='', text_external=True)
+            moved += len(batch)
+        return moved
+
+    def move_inline(self, using, batch_size):
+        """Возвращает тексты в строки заметок и удаляет тела."""
+        bodies = NoteBody.objects.using(using)
+        moved = 0
+        while True:
+            batch = list(bodies.order_by('note_id')[:batch_size])
+            if not batch:
+                return moved
+            with transaction.atomic(using=using):
+                for body in batch:
+                    Note.objects.using(using).filter(pk=body.note_id).update(
+                        text=body.text, text_external=False
+                    )
+                bodies.filter(
+                    note_id__in=[body.note_id for body in batch]
+                ).delete()
+            moved += len(batch)
+
+    def measure(self, connection):
+        """(размер базы в КиБ, лучшее время чтения списка в ms).
+
+        Список читается так же, как на странице: id, slug и заголовок
+        всех заметок по порядку (author_id, id).
+        """
+        size = None
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA page_count')
+                pages = cursor.fetchone()[0]
+                cursor.execute('PRAGMA page_size')
+                size = pages * cursor.fetchone()[0] / 1024
+        notes = Note.objects.using(connection.alias).summaries().order_by(
+            'author_id', 'id'
+        )
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            list(notes.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        return size, min(timings)
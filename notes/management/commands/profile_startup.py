@@ -0,0 +1,73 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from notes import startup
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает модуль приложения в новом интерпретаторе с '
+        '-X importtime и показывает время импорта по пакетам и модулям и '
+        'время загрузки каждого приложения: импорт, models и ready().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='yanote.wsgi',
+                            help='Модуль WSGI/ASGI-приложения.')
+        parser.add_argument('--lean', action='store_true',
+                            help='С NOTES_LEAN=1.')
+        parser.add_argument('--production', action='store_true',
+                            help='С NOTES_PRODUCTION=1.')
+        parser.add_argument('--limit', type=int, default=15,
+                            help='Сколько самых дорогих модулей показать.')
+        parser.add_argument('--output', help='Сохранить замеры в JSON.')
+
+    def handle(self, *args, **options):
+        environment = dict(os.environ)
+        environment['NOTES_LEAN'] = '1' if options['lean'] else '0'
+        environment['NOTES_PRODUCTION'] = (
+            '1' if options['production'] else '0'
+        )
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', startup.__name__,
+             options['module']],
+            cwd=settings.BASE_DIR, env=environment,
+            capture_output=True, text=True,
+        )
+        if completed.returncode:
+            raise CommandError(completed.stderr[-2000:])
+        report = json.loads(completed.stdout.splitlines()[-1])
+        entries = startup.parse_importtime(completed.stderr)
+        report['packages'] = startup.group_by_package(entries)
+        report['modules'] = {module: own for module, own, _ in entries}
+        self.print_report(report, options['limit'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def print_report(self, report, limit):
+        self.stdout.write(
+            'Старт: {total:.1f} ms (настройки {settings:.1f}, '
+            'приложения {populate:.1f}, модуль приложения '
+            '{application:.1f})'.format(**{
+                key: report[key] * 1000
+                for key in ('total', 'settings', 'populate', 'application')
+            })
+        )
+        self.stdout.write('\nПриложение               импорт  models   ready')
+        for label, times in report['apps'].items():
+            self.stdout.write('{:<22} {:>8.1f} {:>7.1f} {:>7.1f}'.format(
+                label, *(times.get(phase, 0) * 1000
+                         for phase in ('import', 'models', 'ready'))
+            ))
+        for title, values in (('Пакет', report['packages']),
+                              ('Модуль', report['modules'])):
+            self.stdout.write(f'\n{title:<40} ms')
+            top = sorted(values.items(), key=lambda item: -item[1])[:limit]
+            for name, microseconds in top:
+                self.stdout.write(f'{name:<40} {microseconds / 1000:.1f}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import Note, NoteTerm
+from notes.pagination import iterate_keyset
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс всех заметок пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        indexed = 0
+        notes = Note.objects.select_related('body').only(
+            'id', 'author', 'title', 'text', 'text_external',
+            'body__codec', 'body__data',
+        )
+        for batch in iterate_keyset(
+                notes, options['batch_size'], ordering=('id',)
+        ):
+            with transaction.atomic():
+                NoteTerm.objects.index_notes(batch)
+            indexed += len(batch)
+        self.stdout.write(f'Проиндексировано заметок: {indexed}')
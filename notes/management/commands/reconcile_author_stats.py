@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes.models import AuthorStats
+from notes.pagination import iterate_keyset
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счётчики AuthorStats с заметками пачками авторов и '
+        'исправляет разошедшиеся.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        checked = fixed = 0
+        authors = get_user_model().objects.only('id')
+        for batch in iterate_keyset(
+                authors, options['batch_size'], ordering=('id',)
+        ):
+            with transaction.atomic():
+                fixed += AuthorStats.objects.rebuild(
+                    author.pk for author in batch
+                )
+            checked += len(batch)
+        self.stdout.write(
+            f'Проверено авторов: {checked}, исправлено: {fixed}'
+        )
@@ -0,0 +1,52 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from notes import cache as page_cache
+from notes import markup, routers
+from notes.models import Note, NoteHtml
+from notes.pagination import iterate_keyset
+
+
+class Command(BaseCommand):
+    help = (
+        'Отрисовывает тексты заметок в HTML (NoteHtml) пачками: заметки '
+        'без HTML и с HTML прошлой версии отрисовщика, а с --all - все. '
+        'Запускается после изменения notes.markup.VERSION.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--all', action='store_true',
+                            help='Отрисовать заново все заметки.')
+
+    def handle(self, *args, **options):
+        using = routers.primary_database()
+        notes = Note.objects.using(using).select_related('body').only(
+            'id', 'author_id', 'slug', 'text', 'text_external',
+            'body__codec', 'body__data',
+        )
+        if not options['all']:
+            notes = notes.exclude(rendered__renderer=markup.VERSION)
+        rendered = 0
+        started = time.perf_counter()
+        for batch in iterate_keyset(
+                notes, options['batch_size'], ordering=('id',)
+        ):
+            with transaction.atomic(using=using):
+                html = NoteHtml.objects.using(using)
+                html.filter(note_id__in=[note.pk for note in batch]).delete()
+                html.store_batch(batch)
+            # Закэшированные страницы показывают прежний HTML.
+            slugs = defaultdict(list)
+            for note in batch:
+                slugs[note.author_id].append(note.slug)
+            for author_id, author_slugs in slugs.items():
+                page_cache.invalidate_note(author_id, *author_slugs)
+            rendered += len(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'Отрисовано заметок: {rendered} за {elapsed:.2f} s'
+        )
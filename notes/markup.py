@@ -0,0 +1,168 @@
+"""Отрисовка текста заметки из Markdown в безопасный HTML.
+
+Поддерживается часть Markdown, которой хватает для заметок: абзацы,
+заголовки #, списки (- * + и 1.), цитаты >, блоки кода ```, линии
+---, а в строках - **полужирный**, *курсив*, `код` и [ссылки](адрес).
+Весь текст сначала экранируется, а теги ставит только сам
+отрисовщик, поэтому HTML из текста заметки в страницу не попадает;
+ссылки - только http(s), mailto и относительные.
+
+Отрисовка дороже показа страницы, поэтому HTML строится при
+сохранении заметки и хранится в NoteHtml вместе с хэшем текста и
+версией отрисовщика VERSION (см. Note.text_html()). Изменили
+отрисовку - увеличьте VERSION и запустите команду render_notes.
+"""
+import hashlib
+import re
+from itertools import groupby
+from operator import itemgetter
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+VERSION = 1
+FENCE = '```'
+MAX_QUOTE_DEPTH = 8
+SAFE_URL_PREFIXES = ('http://', 'https://', 'mailto:', '/', '#')
+
+# Виды строк по порядку проверки; остальные строки - абзацы.
+LINE_KINDS = (
+    ('blank', re.compile(r'\s*')),
+    # Закрывающие # снимает strip_closing(): в выражении с ленивым
+    # текстом разбор длинной серии пробелов был бы квадратичным.
+    ('heading', re.compile(r' {0,3}(?P<level>#{1,6})\s+(?P<text>.*)')),
+    ('hr', re.compile(r' {0,3}([-*_])(?:\s*\1){2,}\s*')),
+    ('ul', re.compile(r' {0,3}[-*+]\s+(?P<text>.*)')),
+    ('ol', re.compile(r' {0,3}\d{1,9}[.)]\s+(?P<text>.*)')),
+    ('quote', re.compile(r' {0,3}>\s?(?P<text>.*)')),
+)
+INLINE = re.compile(
+    r'`(?P<code>[^`]+)`|\[(?P<label>[^][]+)\]\((?P<url>[^()\s]+)\)'
+)
+# Выделение не пересекает свой разделитель, поэтому разбор строки
+# линейный и на тексте без закрывающих разделителей.
+EMPHASIS = (
+    (re.compile(r'\*\*(?=\S)((?:[^*]|\*(?!\*))+?)(?<=\S)\*\*'), 'strong'),
+    (re.compile(r'(?<!\w)__(?=\S)([^_]+?)(?<=\S)__(?!\w)'), 'strong'),
+    (re.compile(r'\*(?=\S)([^*]+?)(?<=\S)\*'), 'em'),
+    (re.compile(r'(?<!\w)_(?=\S)([^_]+?)(?<=\S)_(?!\w)'), 'em'),
+)
+
+
+def digest(text):
+    """Хэш текста, по которому проверяется сохранённый HTML."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def render(text):
+    return mark_safe(render_blocks(text.splitlines()))
+
+
+def classify(lines):
+    """(вид, текст) для каждой строки; строки блока кода - вид code."""
+    in_code = False
+    for line in lines:
+        if line.lstrip().startswith(FENCE):
+            in_code = not in_code
+            yield 'fence', ''
+        elif in_code:
+            yield 'code', line
+        else:
+            yield classify_line(line)
+
+
+def classify_line(line):
+    for kind, pattern in LINE_KINDS:
+        match = pattern.fullmatch(line)
+        if match:
+            if kind == 'heading':
+                return f'h{len(match["level"])}', strip_closing(match['text'])
+            return kind, match.groupdict().get('text', '')
+    return 'p', line
+
+
+def strip_closing(text):
+    """Текст заголовка без пробелов и закрывающих # в конце."""
+    text = text.rstrip()
+    stripped = text.rstrip('#')
+    if stripped != text and (not stripped or stripped[-1].isspace()):
+        return stripped.rstrip()
+    return text
+
+
+def render_blocks(lines, depth=0):
+    """HTML строк: подряд идущие строки одного вида - один блок."""
+    return ''.join(
+        BLOCKS[kind]([text for _, text in group], depth)
+        for kind, group in groupby(classify(lines), key=itemgetter(0))
+    )
+
+
+def render_inline(text):
+    """Строка с кодом, ссылками и выделением; остальное экранировано."""
+    parts = []
+    position = 0
+    for match in INLINE.finditer(text):
+        parts.append(render_emphasis(text[position:match.start()]))
+        if match['code'] is not None:
+            parts.append(f'<code>{escape(match["code"])}</code>')
+        elif match['url'].lower().startswith(SAFE_URL_PREFIXES):
+            parts.append(
+                f'<a href="{escape(match["url"])}" rel="nofollow noopener">'
+                f'{render_emphasis(match["label"])}</a>'
+            )
+        else:
+            parts.append(render_emphasis(match[0]))
+        position = match.end()
+    parts.append(render_emphasis(text[position:]))
+    return ''.join(parts)
+
+
+def render_emphasis(text):
+    text = escape(text)
+    for pattern, tag in EMPHASIS:
+        text = pattern.sub(rf'<{tag}>\1</{tag}>', text)
+    return text
+
+
+def render_paragraph(texts, depth):
+    lines = '<br>'.join(render_inline(text) for text in texts)
+    return f'<p>{lines}</p>'
+
+
+def render_heading(tag):
+    def render_headings(texts, depth):
+        return ''.join(
+            f'<{tag}>{render_inline(text)}</{tag}>' for text in texts
+        )
+    return render_headings
+
+
+def render_list(tag):
+    def render_items(texts, depth):
+        items = ''.join(f'<li>{render_inline(text)}</li>' for text in texts)
+        return f'<{tag}>{items}</{tag}>'
+    return render_items
+
+
+def render_quote(texts, depth):
+    if depth >= MAX_QUOTE_DEPTH:
+        return render_paragraph(texts, depth)
+    return f'<blockquote>{render_blocks(texts, depth + 1)}</blockquote>'
+
+
+def render_code(texts, depth):
+    return '<pre><code>' + escape('\n'.join(texts)) + '</code></pre>'
+
+
+BLOCKS = {
+    'blank': lambda texts, depth: '',
+    'fence': lambda texts, depth: '',
+    'code': render_code,
+    'p': render_paragraph,
+    'hr': lambda texts, depth: '<hr>' * len(texts),
+    'ul': render_list('ul'),
+    'ol': render_list('ol'),
+    'quote': render_quote,
+    **{f'h{level}': render_heading(f'h{level}') for level in range(1, 7)},
+}
@@ -0,0 +1,142 @@
+"""Число запросов к базе и время ответа по представлениям.
+
+notes.middleware.ViewMetricsMiddleware измеряет каждый запрос и
+складывает результат в счётчики по имени маршрута (notes:list,
+notes:detail, ...). Запросы к базе считает обёртка count_query, которую
+получает каждое соединение: замер текущего запроса она берёт из
+contextvar, поэтому подсчёт верен и для ORM в потоках sync_to_async под
+ASGI. Счётчики живут в памяти процесса: Prometheus опрашивает каждый
+процесс отдельно. После каждого запроса отправляется сигнал
+view_measured - на него подписана проверка бюджетов запросов в тестах.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.dispatch import Signal
+
+# Имя для запросов, не попавших ни в один маршрут.
+UNRESOLVED = '<unresolved>'
+
+# Аргумент - measurement (экземпляр Measurement).
+view_measured = Signal()
+
+
+class Measurement:
+    """Замеры одного запроса; времена - в секундах."""
+    __slots__ = ('view', 'queries', 'db_time', 'template_time', 'total_time')
+
+    def __init__(self, view=UNRESOLVED):
+        self.view = view
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.total_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Считает запрос к базе и его время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+
+
+# Замер текущего запроса; sync_to_async копирует контекст в поток ORM.
+_current = ContextVar('notes_measurement', default=None)
+
+
+@contextmanager
+def measuring(measurement):
+    token = _current.set(measurement)
+    try:
+        yield measurement
+    finally:
+        _current.reset(token)
+
+
+def count_query(execute, sql, params, many, context):
+    measurement = _current.get()
+    if measurement is None:
+        return execute(sql, params, many, context)
+    return measurement(execute, sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created."""
+    if count_query not in connection.execute_wrappers:
+        # В начало списка: execute_wrapper() снимает обёртки с конца.
+        connection.execute_wrappers.insert(0, count_query)
+
+
+class ViewStats:
+    """Накопленные счётчики одного представления."""
+    __slots__ = ('requests', 'queries', 'max_queries', 'db_time',
+                 'template_time', 'total_time')
+
+    def __init__(self):
+        self.requests = self.queries = self.max_queries = 0
+        self.db_time = self.template_time = self.total_time = 0.0
+
+    def add(self, measurement):
+        self.requests += 1
+        self.queries += measurement.queries
+        self.max_queries = max(self.max_queries, measurement.queries)
+        self.db_time += measurement.db_time
+        self.template_time += measurement.template_time
+        self.total_time += measurement.total_time
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def record(measurement):
+    with _lock:
+        _stats.setdefault(measurement.view, ViewStats()).add(measurement)
+
+
+def get_stats():
+    """Копия счётчиков: {имя маршрута: ViewStats}."""
+    with _lock:
+        stats = {}
+        for view, source in _stats.items():
+            copy = stats[view] = ViewStats()
+            for name in ViewStats.__slots__:
+                setattr(copy, name, getattr(source, name))
+        return stats
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def get_budget(view):
+    """Допустимое число запросов представления или None."""
+    return settings.NOTES_QUERY_BUDGETS.get(view)
+
+
+# (имя метрики, тип, атрибут ViewStats)
+METRICS = (
+    ('notes_view_requests_total', 'counter', 'requests'),
+    ('notes_view_queries_total', 'counter', 'queries'),
+    ('notes_view_queries_max', 'gauge', 'max_queries'),
+    ('notes_view_db_seconds_total', 'counter', 'db_time'),
+    ('notes_view_template_seconds_total', 'counter', 'template_time'),
+    ('notes_view_seconds_total', 'counter', 'total_time'),
+)
+
+
+def render_stats(stats):
+    """Строки текстового формата Prometheus."""
+    lines = []
+    for metric, kind, attribute in METRICS:
+        lines.append(f'# TYPE {metric} {kind}')
+        for view in sorted(stats):
+            value = getattr(stats[view], attribute)
+            lines.append(f'{metric}{{view="{view}"}} {value}')
+    return lines
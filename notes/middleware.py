@@ -0,0 +1,143 @@
+"""Middleware приложения notes.
+
+Все классы работают и под WSGI, и под ASGI: синхронное middleware в
+ASGI-стеке выполнялось бы в одном общем потоке и лишало асинхронные
+представления параллельности.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from . import metrics, ratelimit, routers
+from .api import ApiBase, error_response
+
+logger = logging.getLogger(__name__)
+
+# Cookie окна чтения из основной базы после записи.
+PIN_COOKIE = 'notes_primary'
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    """Окно чтения из основной базы после записи.
+
+    Запрос с живой cookie читает заметки из основной базы. Запрос,
+    который записал заметку, ставит cookie на
+    settings.NOTES_PRIMARY_PIN_SECONDS - дольше ожидаемого отставания
+    реплики.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routers.request_scope(PIN_COOKIE in request.COOKIES) as state:
+            response = self.get_response(request)
+        return self.set_pin(state, response)
+
+    async def __acall__(self, request):
+        with routers.request_scope(PIN_COOKIE in request.COOKIES) as state:
+            response = await self.get_response(request)
+        return self.set_pin(state, response)
+
+    def set_pin(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.NOTES_PRIMARY_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ViewMetricsMiddleware(MiddlewareMixin):
+    """Замеряет запросы к базе, рендеринг шаблона и время ответа.
+
+    Время шаблона считается для TemplateResponse: от
+    process_template_response до конца рендеринга. Потоковый ответ
+    замеряется до начала передачи тела.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.measure(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self.measure(request):
+            return await self.get_response(request)
+
+    @contextmanager
+    def measure(self, request):
+        measurement = metrics.Measurement()
+        request._notes_measurement = measurement
+        started = time.perf_counter()
+        with metrics.measuring(measurement):
+            yield
+        measurement.total_time = time.perf_counter() - started
+        if request.resolver_match is not None:
+            measurement.view = request.resolver_match.view_name
+        metrics.record(measurement)
+        budget = metrics.get_budget(measurement.view)
+        if budget is not None and measurement.queries > budget:
+            logger.warning(
+                '%s: %d запросов к базе при бюджете %d',
+                measurement.view, measurement.queries, budget,
+            )
+        metrics.view_measured.send(
+            sender=type(self), measurement=measurement
+        )
+
+    def process_template_response(self, request, response):
+        measurement = request._notes_measurement
+        started = time.perf_counter()
+
+        def rendered(response):
+            measurement.template_time += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class RateLimitMiddleware(MiddlewareMixin):
+    """Ограничивает частоту изменений заметок одним пользователем.
+
+    Лимиты маршрутов - в settings.NOTES_RATE_LIMITS (см.
+    notes.ratelimit). Ограничиваются только изменяющие запросы
+    вошедших пользователей; анонимных отправит на вход само
+    представление. Сверх лимита - ответ 429 с Retry-After, до
+    представления и базы данных запрос не доходит.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in self.safe_methods:
+            return None
+        view = request.resolver_match.view_name
+        limit = ratelimit.get_limit(view)
+        if limit is None or not request.user.is_authenticated:
+            return None
+        retry_after = ratelimit.take(
+            ratelimit.bucket_key(view, request.user.pk), *limit
+        )
+        if not retry_after:
+            return None
+        message = 'Слишком много изменений, повторите позже.'
+        view_class = getattr(view_func, 'view_class', None)
+        if view_class is not None and issubclass(view_class, ApiBase):
+            response = error_response(
+                message, HTTPStatus.TOO_MANY_REQUESTS,
+                retry_after=retry_after,
+            )
+        else:
+            response = HttpResponse(
+                message, status=HTTPStatus.TOO_MANY_REQUESTS,
+                content_type='text/plain; charset=utf-8',
+            )
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0002_note_author_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Создана'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменена'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:24
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0003_note_created_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='notes.note')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='noteterm',
+            index=models.Index(fields=['author', 'term'], name='notes_term_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='noteterm',
+            constraint=models.UniqueConstraint(fields=('note', 'term'), name='notes_unique_note_term'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+from notes.functions import OctetLength
+
+
+def fill_author_stats(apps, schema_editor):
+    Note = apps.get_model('notes', 'Note')
+    AuthorStats = apps.get_model('notes', 'AuthorStats')
+    using = schema_editor.connection.alias
+    totals = Note.objects.using(using).order_by().values('author_id').annotate(
+        count=Count('id'), size=Sum(OctetLength('text'))
+    )
+    AuthorStats.objects.using(using).bulk_create(
+        (
+            AuthorStats(
+                author_id=row['author_id'], notes=row['count'],
+                text_bytes=row['size'],
+            )
+            for row in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0004_note_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('notes', models.IntegerField(default=0, verbose_name='Заметок')),
+                ('text_bytes', models.BigIntegerField(default=0, verbose_name='Байт текста')),
+                ('updated', models.DateTimeField(auto_now=True, verbose_name='Изменены')),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
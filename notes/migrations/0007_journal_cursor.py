@@ -0,0 +1,20 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0006_note_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JournalCursor',
+            fields=[
+                ('journal', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Журнал')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Номер операции')),
+            ],
+        ),
+    ]
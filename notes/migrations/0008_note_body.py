@@ -0,0 +1,34 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+import notes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0007_journal_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteBody',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='body', serialize=False, to='notes.note')),
+                ('codec', models.CharField(max_length=8, verbose_name='Сжатие')),
+                ('data', models.BinaryField(verbose_name='Данные')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Байт текста')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='text_external',
+            field=models.BooleanField(default=False, verbose_name='Текст хранится отдельно'),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='text',
+            field=notes.storage.ExternalTextField(help_text='Добавьте подробностей', verbose_name='Текст'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0008_note_body'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='revision',
+            field=models.PositiveIntegerField(default=0, verbose_name='Ревизия'),
+        ),
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(verbose_name='Номер')),
+                ('title', models.CharField(max_length=100, verbose_name='Заголовок')),
+                ('snapshot', models.BooleanField(default=False, verbose_name='Текст целиком')),
+                ('codec', models.CharField(max_length=8, verbose_name='Сжатие')),
+                ('data', models.BinaryField(verbose_name='Данные')),
+                ('size', models.PositiveBigIntegerField(verbose_name='Байт текста')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='notes.note')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='noterevision',
+            constraint=models.UniqueConstraint(fields=('note', 'number'), name='notes_unique_note_revision'),
+        ),
+    ]
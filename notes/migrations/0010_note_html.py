@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0009_note_revision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteHtml',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rendered', serialize=False, to='notes.note')),
+                ('digest', models.CharField(max_length=64, verbose_name='Хэш текста')),
+                ('renderer', models.PositiveSmallIntegerField(verbose_name='Версия отрисовщика')),
+                ('html', models.TextField(verbose_name='HTML')),
+            ],
+        ),
+    ]
@@ -1,7 +1,136 @@
+from contextlib import contextmanager
+
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Count, F, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.query import ValuesListIterable
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import cache as page_cache
+from . import markup, revisions, storage
+from .functions import OctetLength
+from .search import note_terms, query_terms
+from .slugs import save_with_unique_slug
+
+
+# Поля, от которых зависит поисковый индекс заметки.
+INDEXED_FIELDS = frozenset(('title', 'text'))
+
 
-from pytils.translit import slugify
+class NoteConflict(Exception):
+    """Заметку уже изменили: версия в базе не совпала с ожидаемой."""
+
+    def __init__(self, current_version):
+        super().__init__(
+            f'Заметка изменена параллельно, текущая версия '
+            f'{current_version}.'
+        )
+        self.current_version = current_version
+
+
+def text_size(text):
+    """Размер текста в байтах, как его считает OctetLength."""
+    return len(text.encode())
+
+
+def stored_text_bytes():
+    """Размер текста заметки в байтах, в том числе вынесенного в NoteBody."""
+    return Coalesce(
+        'body__size', OctetLength('text'),
+        output_field=models.BigIntegerField(),
+    )
+
+
+class NoteSummary:
+    """Строка списка заметок: только id, slug и заголовок, без текста."""
+
+    __slots__ = ('id', 'slug', 'title')
+
+    def __init__(self, id, slug, title):
+        self.id = id
+        self.slug = slug
+        self.title = title
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        # Краткая строка равна полной заметке с тем же первичным ключом.
+        if isinstance(other, (NoteSummary, Note)):
+            return self.pk is not None and self.pk == other.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.title
+
+    def __repr__(self):
+        return f'<NoteSummary: {self.id} {self.slug}>'
+
+
+class NoteSummaryIterable(ValuesListIterable):
+    """Превращает кортежи values_list() в объекты NoteSummary."""
+
+    def __iter__(self):
+        for row in super().__iter__():
+            yield NoteSummary(*row)
+
+
+class TextValuesIterable(ValuesListIterable):
+    """values_list() с распакованным текстом вынесенных заметок."""
+
+    def __iter__(self):
+        position = self.queryset._fields.index('text')
+        for *row, codec, data in super().__iter__():
+            if data is not None:
+                row[position] = storage.decompress(codec, data)
+            yield tuple(row)
+
+
+class NoteQuerySet(models.QuerySet):
+
+    def summaries(self):
+        """Лёгкие строки для списков: поле text из базы не читается."""
+        clone = self.values_list(*NoteSummary.__slots__)
+        clone._iterable_class = NoteSummaryIterable
+        return clone
+
+    def text_values(self, *fields):
+        """values_list(*fields), где текст полный и у вынесенных заметок.
+
+        Сжатый текст приходит тем же запросом через LEFT JOIN с
+        NoteBody.
+        """
+        if 'text' not in fields:
+            return self.values_list(*fields)
+        clone = self.values_list(*fields, 'body__codec', 'body__data')
+        clone._iterable_class = TextValuesIterable
+        return clone
+
+    def author_totals(self):
+        """Кортежи (author_id, заметок, байт текста) по авторам выборки."""
+        return self.order_by().values('author_id').annotate(
+            count=Count('id'), size=Sum(stored_text_bytes())
+        ).values_list('author_id', 'count', 'size')
+
+    def delete(self):
+        """Удаляет заметки и вычитает их из счётчиков AuthorStats."""
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            totals = list(self.using(using).author_totals())
+            result = super().delete()
+            stats = AuthorStats.objects.using(using)
+            for author_id, count, size in totals:
+                stats.add(author_id, -count, -size)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Note(models.Model):
@@ -11,10 +140,14 @@ class Note(models.Model):
         default='Название заметки',
         help_text='Дайте короткое название заметке'
     )
-    text = models.TextField(
+    text = storage.ExternalTextField(
         'Текст',
         help_text='Добавьте подробностей'
     )
+    # Большой текст сжат и хранится в NoteBody, в text - пустая строка.
+    text_external = models.BooleanField(
+        'Текст хранится отдельно', default=False
+    )
     slug = models.SlugField(
         'Адрес для страницы с заметкой',
         max_length=100,
@@ -27,12 +160,641 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    updated = models.DateTimeField('Изменена', auto_now=True)
+    # Номер версии для оптимистичной блокировки: UPDATE проходит, только
+    # если в базе всё ещё та версия, с которой начиналось изменение.
+    version = models.PositiveIntegerField('Версия', default=1)
+    # Номер последней ревизии в NoteRevision; 0 - истории ещё нет.
+    revision = models.PositiveIntegerField('Ревизия', default=0)
+
+    objects = NoteQuerySet.as_manager()
+
+    class Meta:
+        # Все представления фильтруют заметки по автору: список идёт
+        # по (author, id). Страницам заметки хватает уникального
+        # индекса slug: по нему находится не больше одной строки.
+        indexes = (
+            models.Index(
+                fields=('author', 'id'), name='notes_author_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_external = instance.__dict__.get('text_external')
+        if instance.__dict__.get('text') == '' and instance.text_external:
+            # Вынесенный текст загрузится при первом обращении.
+            del instance.__dict__['text']
+        # Запоминаем slug из базы, чтобы при смене адреса
+        # сбросить кэш страницы и по старому slug.
+        instance._loaded_slug = instance.__dict__.get('slug')
+        # Автор и текст из базы - для разницы в счётчиках AuthorStats.
+        instance._loaded_stats = (
+            instance.__dict__.get('author_id'), instance.__dict__.get('text')
+        )
+        return instance
+
     def save(self, *args, **kwargs):
+        """Сохраняет заметку, если её версия в базе - self.version.
+
+        Версия увеличивается на единицу; если заметку уже изменили,
+        выбрасывается NoteConflict и ничего не записывается. С
+        update_fields пишутся только перечисленные поля, версия и время
+        изменения. Запись заголовка или текста добавляет ревизию в
+        историю заметки (NoteRevision).
+        """
+        adding = self._state.adding
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not adding:
+            update_fields = kwargs['update_fields'] = self.versioned_fields(
+                update_fields
+            )
+        reindex = adding or update_fields is None or bool(
+            INDEXED_FIELDS & update_fields
+        )
+        text_written = 'text' in self.__dict__ and (
+            update_fields is None or 'text' in update_fields
+        )
+        if text_written:
+            self.text_external = storage.is_large(self.text)
+        changes = previous = None
+
+        def write():
+            # Заметка, её поисковый индекс, ревизия и счётчики автора
+            # записываются в одной транзакции.
+            nonlocal changes, previous
+            if changes is None:
+                changes = self.stats_changes(adding, update_fields, using)
+                if reindex and not adding:
+                    previous = self.previous_text(using)
+            super(Note, self).save(*args, **kwargs)
+            if text_written:
+                NoteBody.objects.using(using).store(self, adding)
+                NoteHtml.objects.using(using).store(self, adding)
+            if reindex:
+                NoteTerm.objects.index_notes([self], replace=not adding)
+                NoteRevision.objects.using(using).record(
+                    self, self.text if text_written else previous, previous
+                )
+            stats = AuthorStats.objects.using(using)
+            for author_id, count, size in changes:
+                stats.add(author_id, count, size)
+
+        with self.next_version(adding, reindex):
+            if self.slug:
+                with transaction.atomic(using=using):
+                    write()
+            else:
+                # Пустой slug получает свободный адрес по заголовку.
+                save_with_unique_slug(self, write)
+        page_cache.invalidate_note(
+            self.author_id, self.slug, getattr(self, '_loaded_slug', None)
+        )
+        self._loaded_slug = self.slug
+        self._loaded_stats = (self.author_id, self.__dict__.get('text'))
+        self._loaded_external = self.text_external
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        if self.__dict__.get('text_external') and (
+                fields is None or 'text' in fields
+        ):
+            # Старый текст мог остаться в экземпляре: загрузить заново.
+            self.__dict__.pop('text', None)
+
+    def load_external_text(self):
+        """Распакованный текст из NoteBody.
+
+        Строка NoteBody, загруженная через select_related('body'), не
+        требует отдельного запроса.
+        """
+        if Note.body.is_cached(self):
+            return self.body.text
+        using = self._state.db or router.db_for_read(type(self))
+        return NoteBody.objects.using(using).get(note_id=self.pk).text
+
+    def text_html(self):
+        """Текст в HTML (см. notes.markup).
+
+        HTML из NoteHtml подходит, если он построен из этого же текста
+        текущей версией отрисовщика; иначе текст отрисовывается заново
+        без записи - представления чтения ходят в реплику.
+        """
+        try:
+            rendered = self.rendered
+        except NoteHtml.DoesNotExist:
+            rendered = None
+        if rendered is not None and rendered.matches(self.text):
+            return mark_safe(rendered.html)
+        return markup.render(self.text)
+
+    def previous_text(self, using):
+        """Текст заметки в базе до сохранения.
+
+        Берётся из загруженной строки, а если текст не загружался -
+        отдельным запросом.
+        """
+        text = getattr(self, '_loaded_stats', (None, None))[1]
+        if text is not None:
+            return text
+        external = getattr(self, '_loaded_external', False)
+        if external and Note.body.is_cached(self):
+            return self.body.text
+        return Note.objects.using(using).filter(pk=self.pk).text_values(
+            'text'
+        ).get()[0]
+
+    def versioned_fields(self, update_fields):
+        """update_fields с версией, временем изменения и выданным slug.
+
+        С заголовком или текстом пишется и номер ревизии.
+        """
+        fields = {*update_fields, 'version', 'updated'}
+        if 'text' in fields:
+            fields.add('text_external')
+        if INDEXED_FIELDS & fields:
+            fields.add('revision')
         if not self.slug:
-            max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+            fields.add('slug')
+        return fields
+
+    @contextmanager
+    def next_version(self, adding, new_revision=False):
+        """Увеличивает версию (и номер ревизии) на время сохранения.
+
+        Если сохранение не удалось, версия и ревизия возвращаются
+        прежними, чтобы повторная попытка сравнивала ту же версию.
+        """
+        expected = None if adding else self.version
+        revision = self.revision
+        self._expected_version = expected
+        if expected is not None:
+            self.version = expected + 1
+        if new_revision:
+            self.revision = revision + 1
+        try:
+            yield
+        except Exception:
+            if expected is not None:
+                self.version = expected
+            self.revision = revision
+            raise
+        finally:
+            self._expected_version = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        """UPDATE при условии, что версия в базе не изменилась."""
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        updated = super()._do_update(
+            base_qs.filter(version=expected), using, pk_val, values,
+            update_fields, forced_update,
+        )
+        if not updated:
+            current = base_qs.filter(pk=pk_val).values_list(
+                'version', flat=True
+            ).first()
+            if current is not None:
+                raise NoteConflict(current)
+        return updated
+
+    def delete(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using):
+            author_id, size = self.stored_stats(using)
+            result = super().delete(*args, **kwargs)
+            AuthorStats.objects.using(using).add(author_id, -1, -size)
+        page_cache.invalidate_note(self.author_id, self.slug)
+        return result
+
+    def stored_stats(self, using):
+        """Автор и размер текста заметки в базе.
+
+        Берутся из загруженной строки, а если текст не загружался -
+        отдельным запросом.
+        """
+        author_id, text = getattr(self, '_loaded_stats', (None, None))
+        if author_id is None or text is None:
+            return Note.objects.using(using).filter(pk=self.pk).annotate(
+                size=stored_text_bytes()
+            ).values_list('author_id', 'size').get()
+        return author_id, text_size(text)
+
+    def stats_changes(self, adding, update_fields, using):
+        """Изменения счётчиков: [(author_id, заметок, байт)]."""
+        if adding:
+            return [(self.author_id, 1, text_size(self.text))]
+
+        def written(field):
+            return field.attname in self.__dict__ and (
+                update_fields is None
+                or field.name in update_fields
+                or field.attname in update_fields
+            )
+
+        author_written = written(self._meta.get_field('author'))
+        text_written = written(self._meta.get_field('text'))
+        if not (author_written or text_written):
+            return []
+        old_author, old_size = self.stored_stats(using)
+        author_id = self.author_id if author_written else old_author
+        size = text_size(self.text) if text_written else old_size
+        if author_id == old_author:
+            return [(author_id, 0, size - old_size)]
+        return [(old_author, -1, -old_size), (author_id, 1, size)]
+
+
+class NoteBodyQuerySet(models.QuerySet):
+
+    def store(self, note, adding=False):
+        """Сохраняет или удаляет вынесенный текст заметки после записи."""
+        if not note.text_external:
+            if not adding and getattr(note, '_loaded_external', True):
+                self.filter(note_id=note.pk).delete()
+            return
+        codec, data = storage.compress(note.text)
+        size = text_size(note.text)
+        if adding or not self.filter(note_id=note.pk).update(
+                codec=codec, data=data, size=size
+        ):
+            self.create(note_id=note.pk, codec=codec, data=data, size=size)
+
+    def store_batch(self, notes):
+        """Тексты пачки заметок, вставленной через bulk_create."""
+        bodies = []
+        for note in notes:
+            if note.text_external:
+                codec, data = storage.compress(note.text)
+                bodies.append(NoteBody(
+                    note_id=note.pk, codec=codec, data=data,
+                    size=text_size(note.text),
+                ))
+        self.bulk_create(bodies)
+
+
+class NoteBody(models.Model):
+    """Сжатый текст большой заметки вне её строки (см. notes.storage)."""
+    note = models.OneToOneField(
+        Note,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='body',
+    )
+    codec = models.CharField('Сжатие', max_length=8)
+    data = models.BinaryField('Данные')
+    # Размер несжатого текста для счётчиков AuthorStats.
+    size = models.PositiveBigIntegerField('Байт текста')
+
+    objects = NoteBodyQuerySet.as_manager()
+
+    @property
+    def text(self):
+        return storage.decompress(self.codec, self.data)
+
+    def __str__(self):
+        return f'{self.note_id}: {self.codec}'
+
+
+class NoteHtmlQuerySet(models.QuerySet):
+
+    def store(self, note, adding=False):
+        """Отрисовывает текст заметки после записи, если он изменился."""
+        loaded = getattr(note, '_loaded_stats', (None, None))[1]
+        if not adding and note.text == loaded:
+            return
+        values = NoteHtml.render_values(note.text)
+        if adding or not self.filter(note_id=note.pk).update(**values):
+            self.create(note_id=note.pk, **values)
+
+    def store_batch(self, notes):
+        """HTML пачки заметок, вставленной через bulk_create."""
+        self.bulk_create(
+            NoteHtml(note_id=note.pk, **NoteHtml.render_values(note.text))
+            for note in notes
+        )
+
+
+class NoteHtml(models.Model):
+    """Текст заметки в HTML, отрисованный при сохранении.
+
+    Хэш текста и версия отрисовщика показывают, для какого текста и
+    какой версией notes.markup построен HTML.
+    """
+    note = models.OneToOneField(
+        Note,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rendered',
+    )
+    digest = models.CharField('Хэш текста', max_length=64)
+    renderer = models.PositiveSmallIntegerField('Версия отрисовщика')
+    html = models.TextField('HTML')
+
+    objects = NoteHtmlQuerySet.as_manager()
+
+    @staticmethod
+    def render_values(text):
+        return {
+            'digest': markup.digest(text),
+            'renderer': markup.VERSION,
+            'html': markup.render(text),
+        }
+
+    def matches(self, text):
+        return (
+            self.renderer == markup.VERSION
+            and self.digest == markup.digest(text)
+        )
+
+    def __str__(self):
+        return f'{self.note_id}: {self.renderer}'
+
+
+class NoteRevisionQuerySet(models.QuerySet):
+
+    def record(self, note, text, previous=None):
+        """Добавляет ревизию note.revision с заголовком и текстом заметки.
+
+        previous - текст предыдущей ревизии: без него и в каждой
+        NOTES_REVISION_SNAPSHOT_EVERY-й ревизии текст хранится целиком,
+        в остальных - разницей с previous (см. notes.revisions).
+        """
+        every = settings.NOTES_REVISION_SNAPSHOT_EVERY
+        snapshot = previous is None or (note.revision - 1) % every == 0
+        payload = text if snapshot else revisions.make_delta(previous, text)
+        codec, data = storage.compress(payload)
+        return self.create(
+            note_id=note.pk, number=note.revision, title=note.title,
+            snapshot=snapshot, codec=codec, data=data, size=text_size(text),
+        )
+
+    def record_batch(self, notes):
+        """Первые ревизии-снимки пачки, вставленной через bulk_create."""
+        rows = []
+        for note in notes:
+            codec, data = storage.compress(note.text)
+            rows.append(NoteRevision(
+                note_id=note.pk, number=note.revision, title=note.title,
+                snapshot=True, codec=codec, data=data,
+                size=text_size(note.text),
+            ))
+        self.bulk_create(rows)
+
+    def reconstruct(self, number):
+        """Ревизия number с собранным текстом в атрибуте text.
+
+        Ближайший снимок и разницы после него читаются одним запросом.
+        Выборка должна быть ревизиями одной заметки.
+        """
+        snapshot = self.filter(number__lte=number, snapshot=True).order_by(
+            '-number'
+        ).values('number')[:1]
+        rows = list(self.filter(
+            number__lte=number, number__gte=Subquery(snapshot)
+        ).order_by('number'))
+        if not rows or rows[-1].number != number:
+            raise self.model.DoesNotExist('Ревизия не найдена.')
+        revision = rows[-1]
+        revision.text = revisions.apply_deltas(
+            *(storage.decompress(row.codec, row.data) for row in rows)
+        )
+        return revision
+
+
+class NoteRevision(models.Model):
+    """Ревизия заметки: заголовок и текст - снимком или разницей."""
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='revisions',
+    )
+    number = models.PositiveIntegerField('Номер')
+    title = models.CharField('Заголовок', max_length=100)
+    snapshot = models.BooleanField('Текст целиком', default=False)
+    codec = models.CharField('Сжатие', max_length=8)
+    data = models.BinaryField('Данные')
+    # Размер собранного текста ревизии, чтобы показывать его в списке.
+    size = models.PositiveBigIntegerField('Байт текста')
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    objects = NoteRevisionQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'number'), name='notes_unique_note_revision'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.note_id}: {self.number}'
+
+
+class NoteTermQuerySet(models.QuerySet):
+
+    def index_notes(self, notes, replace=True):
+        """Перестраивает поисковый индекс для сохранённых заметок.
+
+        Для только что созданных заметок передайте replace=False:
+        старых записей индекса у них нет, удалять нечего.
+        """
+        notes = [note for note in notes if note.pk is not None]
+        if not notes:
+            return
+        if replace:
+            self.filter(note__in=notes).delete()
+        self.bulk_create(
+            (
+                NoteTerm(
+                    term=term, weight=weight,
+                    note_id=note.pk, author_id=note.author_id,
+                )
+                for note in notes
+                for term, weight in note_terms(note.title, note.text).items()
+            ),
+            batch_size=1000,
+        )
+
+    def search(self, author, query, after=None, per_page=20):
+        """Заметки автора, содержащие все слова запроса.
+
+        Строки отсортированы по убыванию суммарного веса слов; курсор
+        after - пара (score, note_id) последней показанной строки.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return self.none().values('note_id')
+        results = self.filter(author=author, term__in=terms).values(
+            'note_id', 'note__slug', 'note__title'
+        ).annotate(
+            score=Sum('weight'), matched=Count('term')
+        ).filter(matched=len(terms))
+        if after is not None:
+            score, note_id = after
+            results = results.filter(
+                Q(score__lt=score) | Q(score=score, note_id__gt=note_id)
+            )
+        return results.order_by('-score', 'note_id')[:per_page]
+
+
+class NoteTerm(models.Model):
+    """Слово заметки в поисковом индексе и его вес."""
+    term = models.CharField(max_length=64)
+    weight = models.PositiveIntegerField()
+    note = models.ForeignKey(
+        Note,
+        on_delete=models.CASCADE,
+        related_name='terms',
+    )
+    # Автор продублирован, чтобы поиск не соединял таблицы.
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    objects = NoteTermQuerySet.as_manager()
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('note', 'term'), name='notes_unique_note_term'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('author', 'term'), name='notes_term_author_idx'
+            ),
+        )
+
+    def __str__(self):
+        return self.term
+
+
+class AuthorStatsQuerySet(models.QuerySet):
+
+    def write_database(self):
+        return self._db or router.db_for_write(self.model)
+
+    def add(self, author_id, notes=0, text_bytes=0):
+        """Прибавляет к счётчикам автора.
+
+        Если строки автора ещё нет, она считается заново по заметкам -
+        уже с учётом только что сделанной записи.
+        """
+        if not notes and not text_bytes:
+            return
+        using = self.write_database()
+        updated = self.using(using).filter(author_id=author_id).update(
+            notes=F('notes') + notes,
+            text_bytes=F('text_bytes') + text_bytes,
+            updated=timezone.now(),
+        )
+        if not updated:
+            self.using(using).rebuild([author_id])
+
+    def rebuild(self, author_ids):
+        """Пересчитывает счётчики авторов по их заметкам.
+
+        Переписываются только разошедшиеся строки; возвращает их число.
+        """
+        using = self.write_database()
+        totals = dict.fromkeys(author_ids, (0, 0))
+        for author_id, count, size in Note.objects.using(using).filter(
+                author_id__in=list(totals)
+        ).author_totals():
+            totals[author_id] = (count, size)
+        stored = {
+            author_id: (notes, text_bytes)
+            for author_id, notes, text_bytes in self.using(using).filter(
+                author_id__in=list(totals)
+            ).values_list('author_id', 'notes', 'text_bytes')
+        }
+        changed = [
+            author_id for author_id, total in totals.items()
+            if stored.get(author_id) != total
+        ]
+        if changed:
+            with transaction.atomic(using=using, savepoint=False):
+                self.using(using).filter(
+                    author_id__in=[a for a in changed if a in stored]
+                ).delete()
+                self.using(using).bulk_create(
+                    AuthorStats(
+                        author_id=author_id, notes=totals[author_id][0],
+                        text_bytes=totals[author_id][1],
+                    )
+                    for author_id in changed
+                )
+        return len(changed)
+
+    def for_author(self, author_id):
+        """Счётчики автора; у автора без строки - нулевые."""
+        stats = self.filter(author_id=author_id).first()
+        if stats is None:
+            stats = AuthorStats(author_id=author_id)
+        return stats
+
+
+class AuthorStats(models.Model):
+    """Счётчики заметок автора.
+
+    Note.save(), Note.delete(), удаление выборки и импорт обновляют их
+    в одной транзакции с заметками, поэтому число заметок читается
+    одной строкой вместо COUNT(*). Изменения в обход ORM (bulk_create,
+    QuerySet.update() текста) исправляет команда
+    reconcile_author_stats.
+    """
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='note_stats',
+    )
+    # Без проверки на неотрицательность: разошедшиеся счётчики не
+    # должны мешать удалению заметок до сверки.
+    notes = models.IntegerField('Заметок', default=0)
+    text_bytes = models.BigIntegerField('Байт текста', default=0)
+    updated = models.DateTimeField('Изменены', auto_now=True)
+
+    objects = AuthorStatsQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.author_id}: {self.notes}'
+
+
+def create_author_stats(sender, instance, created, raw=False, using=None,
+                        **kwargs):
+    """Обработчик post_save модели пользователя: нулевые счётчики.
+
+    С готовой строкой первая заметка автора обходится одним UPDATE.
+    """
+    if created and not raw:
+        AuthorStats.objects.using(using).create(author_id=instance.pk)
+
+
+class JournalCursor(models.Model):
+    """Последняя операция журнала отложенной записи, уже применённая.
+
+    Обновляется в одной транзакции с применённой пачкой (см.
+    notes.writebehind).
+    """
+    journal = models.CharField('Журнал', max_length=255, primary_key=True)
+    position = models.BigIntegerField('Номер операции', default=0)
+
+    def __str__(self):
+        return f'{self.journal}: {self.position}'
@@ -0,0 +1,78 @@
+"""Курсорная (keyset) пагинация заметок без OFFSET."""
+
+# Порядок ключа, по которому строится курсор.
+KEYSET_ORDERING = ('author_id', 'id')
+CURSOR_PARAM = 'after'
+
+
+class KeysetPage:
+    """Страница заметок и курсор для перехода к следующей странице.
+
+    object_list - список уже прочитанных заметок, а не выборка.
+    """
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def parse_cursor(value):
+    """Возвращает id последней показанной заметки или None.
+
+    Некорректный курсор приводит к ValueError.
+    """
+    if value in (None, ''):
+        return None
+    cursor = int(value)
+    if cursor < 0:
+        raise ValueError('Курсор не может быть отрицательным.')
+    return cursor
+
+
+def paginate_keyset(queryset, after, per_page):
+    """Отдаёт страницу заметок автора с id больше курсора.
+
+    Выборка идёт по ключу (author_id, id), поэтому стоимость страницы
+    не зависит от её номера.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    page = queryset if after is None else queryset.filter(id__gt=after)
+    # Лишняя строка показывает, есть ли следующая страница.
+    rows = list(page[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = rows[-1].id
+    return KeysetPage(rows, next_cursor)
+
+
+def iterate_keyset(queryset, chunk_size, ordering=KEYSET_ORDERING):
+    """Перебирает выборку порциями по chunk_size строк.
+
+    Каждая порция - отдельный запрос по курсору, так что в памяти
+    одновременно находится не больше одной порции. Порядок по
+    умолчанию рассчитан на заметки одного автора; для выборки по всем
+    авторам передайте ordering=('id',).
+    """
+    queryset = queryset.order_by(*ordering)
+    last_id = None
+    while True:
+        chunk = queryset if last_id is None else queryset.filter(
+            id__gt=last_id
+        )
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1].id
@@ -2,10 +2,51 @@
 import pytest
 
 # Импортируем класс клиента.
+from django.core.cache import caches
 from django.test.client import Client
 
+from notes import metrics
 # Импортируем модель заметки, чтобы создать экземпляр.
 from notes.models import Note
+from notes.views import NotesList
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Закэшированные страницы не должны переходить из теста в тест.
+    for cache in caches.all():
+        cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def read_from_default_database(settings):
+    # Тест идёт внутри транзакции соединения default, и другое
+    # соединение не увидело бы созданных в тесте данных.
+    settings.NOTES_READ_DATABASE = 'default'
+
+
+@pytest.fixture(autouse=True)
+def query_budgets(settings):
+    # Запрос к представлению сверх бюджета из NOTES_QUERY_BUDGETS
+    # роняет тест. Тест может поменять бюджет в словаре фикстуры:
+    # замеры сверяются с ним после теста.
+    settings.NOTES_QUERY_BUDGETS = dict(settings.NOTES_QUERY_BUDGETS)
+    measured = []
+
+    def collect(sender, measurement, **kwargs):
+        measured.append(measurement)
+
+    metrics.view_measured.connect(collect)
+    yield settings.NOTES_QUERY_BUDGETS
+    metrics.view_measured.disconnect(collect)
+    exceeded = [
+        f'{measurement.view}: {measurement.queries} > {budget}'
+        for measurement in measured
+        for budget in [metrics.get_budget(measurement.view)]
+        if budget is not None and measurement.queries > budget
+    ]
+    if exceeded:
+        pytest.fail('Превышен бюджет запросов: ' + ', '.join(exceeded))
 
 
 @pytest.fixture
@@ -59,3 +100,17 @@ def form_data():
         'text': 'Новый текст',
         'slug': 'new-slug'
     }
+
+
+@pytest.fixture
+def many_notes(author):
+    # Заметок больше, чем помещается на одну страницу списка.
+    return Note.objects.bulk_create(
+        Note(
+            title=f'Заметка {index}',
+            text='Просто текст.',
+            slug=f'note-{index}',
+            author=author,
+        )
+        for index in range(NotesList.paginate_by + 5)
+    )
@@ -0,0 +1,98 @@
+# pytest_api.py
+import json
+from http import HTTPStatus
+
+import pytest
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from notes.api import ApiNotesList
+from notes.models import Note
+
+
+@pytest.mark.django_db
+def test_api_requires_login(client):
+    response = client.get(reverse('notes:api-list'))
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_api_list_fields_and_cursor(author_client, many_notes, monkeypatch,
+                                    django_assert_num_queries):
+    monkeypatch.setattr(ApiNotesList, 'paginate_by', 40)
+    url = reverse('notes:api-list')
+    # Пользователь (в первом запросе - из базы) и одна выборка заметок;
+    # сессия читается из кэша.
+    with django_assert_num_queries(2):
+        page = author_client.get(url, {'fields': 'title'}).json()
+    assert len(page['results']) == 40
+    assert set(page['results'][0]) == {'title'}
+    page = author_client.get(url, {'after': page['next']}).json()
+    assert len(page['results']) == len(many_notes) - 40
+    assert page['next'] is None
+    assert set(page['results'][0]) == {'id', 'slug', 'title'}
+
+
+def test_api_unknown_field(author_client):
+    response = author_client.get(reverse('notes:api-list'),
+                                 {'fields': 'title,password'})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'password' in response.json()['error']
+
+
+def test_api_detail_is_scoped(author_client, not_author_client, note):
+    url = reverse('notes:api-detail', args=(note.slug,))
+    data = author_client.get(url, {'fields': 'text,slug'}).json()
+    assert data == {'text': note.text, 'slug': note.slug}
+    response = not_author_client.get(url)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_api_create_update_delete(author_client, author, form_data):
+    response = author_client.post(
+        reverse('notes:api-list'), json.dumps(form_data),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['slug'] == form_data['slug']
+    url = reverse('notes:api-detail', args=(form_data['slug'],))
+    response = author_client.patch(
+        url, json.dumps({'title': 'Из API'}),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.OK
+    note = Note.objects.get(author=author)
+    assert (note.title, note.text) == ('Из API', form_data['text'])
+    response = author_client.delete(url)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert not Note.objects.exists()
+
+
+def test_api_writes_need_csrf_token(author, form_data):
+    client = Client(enforce_csrf_checks=True)
+    client.force_login(author)
+    url = reverse('notes:api-list')
+    body = json.dumps(form_data)
+    response = client.post(url, body, content_type='application/json')
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    # Токен приходит в cookie с любым GET-запросом к API.
+    assert client.get(url).status_code == HTTPStatus.OK
+    token = client.cookies[settings.CSRF_COOKIE_NAME].value
+    response = client.post(url, body, content_type='application/json',
+                           HTTP_X_CSRFTOKEN=token)
+    assert response.status_code == HTTPStatus.CREATED
+    detail_url = reverse('notes:api-detail', args=(form_data['slug'],))
+    response = client.delete(detail_url, HTTP_X_CSRFTOKEN=token)
+    assert response.status_code == HTTPStatus.NO_CONTENT
+    assert not Note.objects.exists()
+
+
+def test_api_validation_errors(author_client, note, form_data):
+    form_data['slug'] = note.slug
+    response = author_client.post(
+        reverse('notes:api-list'), json.dumps(form_data),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'slug' in response.json()['errors']
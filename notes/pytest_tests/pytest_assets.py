@@ -0,0 +1,94 @@
+# pytest_assets.py
+import gzip
+
+import pytest
+
+from django.core.management import call_command
+from django.template import engines
+from django.test import RequestFactory
+from django.urls import reverse
+
+from notes import assets, context_processors
+from notes.warmup import warm_templates
+
+CSS = '.navbar-notes { background-color: lightskyblue; }\n' * 20
+
+
+@pytest.fixture
+def collected(tmp_path, settings):
+    source = tmp_path / 'source'
+    (source / 'css').mkdir(parents=True)
+    (source / 'css' / 'notes.css').write_text(CSS)
+    settings.STATICFILES_DIRS = [source]
+    settings.STATICFILES_FINDERS = [
+        'django.contrib.staticfiles.finders.FileSystemFinder',
+    ]
+    settings.STATIC_ROOT = tmp_path / 'static'
+    settings.STATICFILES_STORAGE = (
+        'notes.assets.CompressedManifestStaticFilesStorage'
+    )
+    call_command('collectstatic', interactive=False, verbosity=0)
+    assets.immutable_names.cache_clear()
+    yield settings.STATIC_ROOT
+    assets.immutable_names.cache_clear()
+
+
+def test_header_urls_are_reversed_once(client, monkeypatch):
+    context_processors._header_urls.clear()
+    calls = []
+    reverse_once = context_processors.reverse
+
+    def counting_reverse(name):
+        calls.append(name)
+        return reverse_once(name)
+
+    monkeypatch.setattr(context_processors, 'reverse', counting_reverse)
+    client.get(reverse('notes:home'))
+    client.get(reverse('notes:home'))
+    assert len(calls) == len(context_processors.HEADER_URLS)
+    urls = context_processors.header_urls(None)['header_urls']
+    assert urls['signup'] == reverse('users:signup')
+
+
+def test_warm_templates_fills_loader_cache():
+    loader = engines['django'].engine.template_loaders[0]
+    loader.reset()
+    assert warm_templates() > 0
+    assert 'base.html' in loader.get_template_cache
+    assert 'includes/header.html' in loader.get_template_cache
+
+
+def test_collectstatic_writes_hashed_and_compressed(collected):
+    names = {
+        path.relative_to(collected).as_posix()
+        for path in collected.rglob('*')
+        if path.is_file()
+    }
+    hashed = assets.staticfiles_storage.hashed_files['css/notes.css']
+    assert hashed != 'css/notes.css'
+    assert {hashed, hashed + '.gz', 'css/notes.css.gz'} <= names
+    content = gzip.decompress((collected / (hashed + '.gz')).read_bytes())
+    assert content.decode() == CSS
+
+
+def test_serve_hashed_asset_immutable_gzip(collected):
+    hashed = assets.staticfiles_storage.hashed_files['css/notes.css']
+    request = RequestFactory().get(
+        '/static/' + hashed, HTTP_ACCEPT_ENCODING='gzip, br'
+    )
+    response = assets.serve(request, hashed)
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Type'].startswith('text/css')
+    assert 'immutable' in response['Cache-Control']
+    assert f'max-age={assets.FAR_FUTURE}' in response['Cache-Control']
+    assert 'Accept-Encoding' in response['Vary']
+
+
+def test_serve_unhashed_asset_short_cache(collected):
+    request = RequestFactory().get('/static/css/notes.css')
+    response = assets.serve(request, 'css/notes.css')
+    assert not response.has_header('Content-Encoding')
+    assert b''.join(response.streaming_content).decode() == CSS
+    assert response['Cache-Control'] == (
+        f'public, max-age={assets.SHORT_MAX_AGE}'
+    )
@@ -0,0 +1,63 @@
+# pytest_async.py
+from http import HTTPStatus
+
+import pytest
+
+from django.urls import reverse
+from pytest_django.asserts import assertRedirects
+
+from notes.models import Note
+
+
+@pytest.mark.parametrize(
+    'name, args',
+    (
+        ('notes:async-list', None),
+        ('notes:async-add', None),
+        ('notes:async-detail', pytest.lazy_fixture('slug_for_args')),
+        ('notes:async-edit', pytest.lazy_fixture('slug_for_args')),
+        ('notes:async-delete', pytest.lazy_fixture('slug_for_args')),
+    ),
+)
+def test_async_pages(client, author_client, not_author_client, name, args):
+    url = reverse(name, args=args)
+    assert author_client.get(url).status_code == HTTPStatus.OK
+    login_url = reverse('users:login')
+    assertRedirects(client.get(url), f'{login_url}?next={url}')
+    if args:
+        response = not_author_client.get(url)
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_async_list_contains_only_own_notes(author_client, note,
+                                            not_author):
+    Note.objects.create(title='Чужая', text='', author=not_author)
+    response = author_client.get(reverse('notes:async-list'))
+    assert list(response.context['object_list']) == [note]
+    assert 'Всего заметок: 1' in response.content.decode()
+
+
+def test_async_create_edit_delete(author_client, author, form_data):
+    response = author_client.post(reverse('notes:async-add'), form_data)
+    assertRedirects(response, reverse('notes:success'))
+    note = Note.objects.get()
+    assert note.author == author
+    form_data['title'] = 'Изменено асинхронно'
+    response = author_client.post(
+        reverse('notes:async-edit', args=(note.slug,)), form_data
+    )
+    assertRedirects(response, reverse('notes:success'))
+    note.refresh_from_db()
+    assert note.title == form_data['title']
+    response = author_client.post(
+        reverse('notes:async-delete', args=(note.slug,))
+    )
+    assertRedirects(response, reverse('notes:success'))
+    assert not Note.objects.exists()
+
+
+def test_async_create_shows_form_errors(author_client, note, form_data):
+    form_data['slug'] = note.slug
+    response = author_client.post(reverse('notes:async-add'), form_data)
+    assert response.status_code == HTTPStatus.OK
+    assert 'slug' in response.context['form'].errors
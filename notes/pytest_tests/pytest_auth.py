@@ -0,0 +1,43 @@
+# pytest_auth.py
+from http import HTTPStatus
+
+from django.urls import reverse
+
+
+def test_authenticated_detail_needs_one_query(author_client, note,
+                                              django_assert_num_queries):
+    # Первый запрос кладёт пользователя в кэш.
+    author_client.get(reverse('notes:home'))
+    # Сессия и пользователь из кэша, из базы - только заметка.
+    with django_assert_num_queries(1):
+        response = author_client.get(
+            reverse('notes:detail', args=(note.slug,))
+        )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_password_change_invalidates_cached_user(author_client, author, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    assert author_client.get(url).status_code == HTTPStatus.OK
+    author.set_password('new-Pa55word')
+    author.save()
+    # Хэш сессии больше не совпадает с паролем из базы.
+    response = author_client.get(url)
+    assert response.status_code == HTTPStatus.FOUND
+    assert response.url.startswith(reverse('users:login'))
+
+
+def test_deactivated_user_is_logged_out(author_client, author, note):
+    url = reverse('notes:list')
+    author_client.get(url)
+    author.is_active = False
+    author.save()
+    assert author_client.get(url).status_code == HTTPStatus.FOUND
+
+
+def test_model_backend_session_still_works(client, author, note):
+    client.force_login(
+        author, backend='django.contrib.auth.backends.ModelBackend'
+    )
+    url = reverse('notes:detail', args=(note.slug,))
+    assert client.get(url).status_code == HTTPStatus.OK
@@ -0,0 +1,224 @@
+# pytest_cache.py
+import time
+
+import pytest
+
+from http import HTTPStatus
+
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.views import generic
+from django.utils.http import http_date
+
+from notes.checks import check_shared_caches
+from notes.views import CachedPageMixin
+
+
+@pytest.fixture
+def settled(monkeypatch):
+    """Часы views на несколько секунд впереди: изменения уже старые."""
+    now = time.time
+
+    class Clock:
+        @staticmethod
+        def time():
+            return now() + 5
+
+    monkeypatch.setattr('notes.views.time', Clock)
+
+
+def test_detail_page_is_served_from_cache(
+        author_client, note, django_assert_num_queries
+):
+    url = reverse('notes:detail', args=(note.slug,))
+    first = author_client.get(url)
+    # Сессия, пользователь и страница берутся из кэша.
+    with django_assert_num_queries(0):
+        second = author_client.get(url)
+    assert second.content == first.content
+
+
+def test_edit_invalidates_detail_and_list(author_client, note, form_data):
+    detail_url = reverse('notes:detail', args=(note.slug,))
+    list_url = reverse('notes:list')
+    author_client.get(detail_url)
+    author_client.get(list_url)
+    form_data['slug'] = note.slug
+    author_client.post(reverse('notes:edit', args=(note.slug,)), form_data)
+    assert form_data['title'] in author_client.get(detail_url).content.decode()
+    assert form_data['title'] in author_client.get(list_url).content.decode()
+
+
+def test_slug_change_invalidates_old_detail_page(author_client, note,
+                                                 form_data):
+    old_url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(old_url)
+    author_client.post(reverse('notes:edit', args=(note.slug,)), form_data)
+    assert author_client.get(old_url).status_code == 404
+
+
+def test_delete_invalidates_list(author_client, note):
+    list_url = reverse('notes:list')
+    author_client.get(list_url)
+    author_client.post(reverse('notes:delete', args=(note.slug,)))
+    assert note.title not in author_client.get(list_url).content.decode()
+
+
+def test_cache_is_per_user(author_client, not_author_client, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    assert not_author_client.get(url).status_code == 404
+
+
+@pytest.mark.parametrize(
+    'backend, location',
+    (
+        ('django.core.cache.backends.locmem.LocMemCache', 'notes-test'),
+        ('django.core.cache.backends.filebased.FileBasedCache', None),
+    )
+)
+def test_cache_backends(settings, tmp_path, author_client, note,
+                        backend, location):
+    settings.CACHES = {
+        **settings.CACHES,
+        'shared': {
+            'BACKEND': backend,
+            'LOCATION': location or str(tmp_path),
+        },
+    }
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    author_client.get(url)
+    note.title = 'Изменённый заголовок'
+    note.save()
+    assert note.title in author_client.get(url).content.decode()
+    stats = author_client.get(reverse('notes:cache-stats')).content.decode()
+    assert 'page="detail",event="hit"} 1' in stats
+    assert 'page="detail",event="miss"} 2' in stats
+
+
+def test_database_cache_backend(settings, author_client, note,
+                                query_budgets):
+    # Кэш в базе добавляет свои запросы к каждой странице.
+    query_budgets.pop('notes:detail')
+    settings.CACHES = {
+        **settings.CACHES,
+        'shared': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'notes_test_cache',
+        },
+    }
+    call_command('createcachetable', verbosity=0)
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    note.title = 'Изменённый заголовок'
+    note.save()
+    assert note.title in author_client.get(url).content.decode()
+
+
+@pytest.mark.parametrize('name', ('notes:detail', 'notes:list'))
+def test_conditional_get_returns_not_modified(
+        author_client, note, name, django_assert_num_queries, settled
+):
+    args = (note.slug,) if name == 'notes:detail' else None
+    url = reverse(name, args=args)
+    response = author_client.get(url)
+    assert response.has_header('ETag')
+    assert response.has_header('Last-Modified')
+    # Для 304 заметка из базы не читается.
+    with django_assert_num_queries(0):
+        not_modified = author_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+    assert not_modified.content == b''
+    not_modified = author_client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+    )
+    assert not_modified.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_edit_changes_etag(author_client, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    etag = author_client.get(url)['ETag']
+    note.text = 'Новый текст'
+    note.save()
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_fresh_change_has_no_last_modified(author_client, note):
+    url = reverse('notes:detail', args=(note.slug,))
+    response = author_client.get(url)
+    assert response.has_header('ETag')
+    assert not response.has_header('Last-Modified')
+    # Правка в ту же секунду: дата не должна дать устаревший 304.
+    note.text = 'Правка в ту же секунду'
+    note.save()
+    response = author_client.get(
+        url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60)
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert 'Правка в ту же секунду' in response.content.decode()
+
+
+@pytest.mark.parametrize('headers', (
+    {'HTTP_IF_NONE_MATCH': '*'},
+    {'HTTP_IF_MODIFIED_SINCE': http_date(time.time() + 3600)},
+))
+def test_conditional_get_of_missing_note_is_not_found(
+        author_client, note, headers, settled
+):
+    url = reverse('notes:detail', args=(note.slug,))
+    author_client.get(url)
+    note.delete()
+    assert author_client.get(url, **headers).status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+    url = reverse('notes:detail', args=('no-such-note',))
+    assert author_client.get(url, **headers).status_code == (
+        HTTPStatus.NOT_FOUND
+    )
+
+
+def test_pages_are_not_cached_by_default():
+    renders = []
+
+    class Page(generic.View):
+        def get(self, request):
+            renders.append(request)
+            return HttpResponse('page')
+
+    class CachedPage(CachedPageMixin, Page):
+        pass
+
+    view = CachedPage.as_view()
+    for _ in range(2):
+        response = view(RequestFactory().get('/page/'))
+        assert response.content == b'page'
+        assert not response.has_header('ETag')
+    assert len(renders) == 2
+
+
+def test_note_timestamps(note):
+    created, updated = note.created, note.updated
+    note.save()
+    note.refresh_from_db()
+    assert note.created == created
+    assert note.updated > updated
+
+
+def test_shared_caches_in_production(settings):
+    assert check_shared_caches(None) == []
+    settings.NOTES_PRODUCTION = True
+    assert [error.id for error in check_shared_caches(None)] == [
+        'notes.W001'
+    ] * 3
+    settings.CACHES = {**settings.CACHES, 'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/tmp/notes-cache',
+    }}
+    assert check_shared_caches(None) == []
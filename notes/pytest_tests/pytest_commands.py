@@ -0,0 +1,141 @@
+# pytest_commands.py
+import json
+from io import StringIO
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+
+from notes.management.commands.bench_routes import url_names
+from notes.benchmarks import seed_notes
+from notes.models import AuthorStats, Note, NoteBody, NoteHtml, NoteTerm
+
+
+@pytest.mark.django_db
+def test_bench_queries_reports_plans_and_rolls_back():
+    out = StringIO()
+    call_command(
+        'bench_queries', users=2, notes=5, repeat=3, stdout=out
+    )
+    output = out.getvalue()
+    assert 'notes:list' in output
+    assert 'p99' in output
+    # Данные для замеров не остаются в базе.
+    assert Note.objects.count() == 0
+    assert get_user_model().objects.count() == 0
+
+
+def test_export_and_import_commands(author, note, tmp_path):
+    path = tmp_path / 'notes.jsonl'
+    err = StringIO()
+    call_command('export_notes', author.username, output=str(path),
+                 stderr=err)
+    assert 'заметок/с' in err.getvalue()
+    out = StringIO()
+    err = StringIO()
+    call_command('import_notes', author.username, str(path), batch_size=1,
+                 stdout=out, stderr=err)
+    assert 'Импортировано заметок: 1' in out.getvalue()
+    assert f'адрес «{note.slug}» уже занят' in err.getvalue()
+    assert Note.objects.filter(author=author).count() == 2
+
+
+def test_rebuild_search_index(author, note):
+    NoteTerm.objects.all().delete()
+    out = StringIO()
+    call_command('rebuild_search_index', batch_size=1, stdout=out)
+    assert 'Проиндексировано заметок: 1' in out.getvalue()
+    assert NoteTerm.objects.search(author, 'текст заметки').exists()
+
+
+@pytest.mark.django_db
+def test_seed_notes_maintains_derived_tables(settings):
+    settings.NOTES_TEXT_EXTERNAL_BYTES = 300
+    author, = seed_notes(1, 3, text_size={100: 1, 400: 1})
+    notes = Note.objects.filter(author=author)
+    assert NoteTerm.objects.filter(note__author=author).exists()
+    assert AuthorStats.objects.get(author=author).notes == 3
+    assert NoteBody.objects.count() == notes.filter(
+        text_external=True
+    ).count()
+    assert NoteHtml.objects.count() == 3
+    for note in notes:
+        assert note.revisions.reconstruct(1).text == note.text
+
+
+@pytest.mark.django_db
+def test_bench_search_compares_with_icontains():
+    out = StringIO()
+    call_command('bench_search', notes=[10], repeat=2, stdout=out)
+    assert 'icontains' in out.getvalue()
+    assert Note.objects.count() == 0
+    assert NoteTerm.objects.count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bench_asgi_runs_all_modes():
+    out = StringIO()
+    call_command('bench_asgi', clients=2, requests=2, threads=1,
+                 client_delay=0, notes=2, stdout=out)
+    output = out.getvalue()
+    assert output.count('ошибок 0') == 3
+    assert not Note.objects.exists()
+
+
+def test_bench_sqlite_compares_modes():
+    out = StringIO()
+    call_command('bench_sqlite', writers=1, readers=1, seconds=0.2,
+                 stdout=out)
+    assert 'WAL + прагмы' in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_bench_routes_covers_all_routes(tmp_path):
+    output = tmp_path / 'bench.json'
+    call_command('bench_routes', users=2, notes=3, sizes={100: 1, 5000: 1},
+                 repeat=2, memory_repeat=1, output=str(output),
+                 stdout=StringIO(), stderr=StringIO())
+    report = json.loads(output.read_text(encoding='utf-8'))
+    routes = report['routes']
+    assert {name.split()[1] for name in routes} >= url_names()
+    assert all(route['errors'] == 0 for route in routes.values())
+    assert set(routes['GET notes:detail']) >= {
+        'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'queries',
+        'memory_peak_kib',
+    }
+    assert not get_user_model().objects.exists()
+    assert not Note.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bench_routes_reports_regressions(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    baseline.write_text(json.dumps({'routes': {
+        'GET notes:home': {'p95_ms': 0, 'queries': 0},
+    }}))
+    with pytest.raises(CommandError, match='GET notes:home'):
+        call_command('bench_routes', users=1, notes=1, repeat=1,
+                     memory_repeat=1, output=str(tmp_path / 'bench.json'),
+                     baseline=str(baseline), stdout=StringIO())
+
+
+def test_profile_startup_lean_profile(tmp_path):
+    output = tmp_path / 'startup.json'
+    out = StringIO()
+    call_command('profile_startup', lean=True, output=str(output),
+                 stdout=out)
+    assert 'Приложение' in out.getvalue()
+    report = json.loads(output.read_text())
+    assert 'admin' not in report['apps']
+    assert set(report['apps']['notes']) == {'import', 'models', 'ready'}
+    assert report['total'] > 0
+    # Транслитерация загружается при первом slug, а не при старте.
+    assert not any(module.startswith('pytils') for module in report['modules'])
+    assert 'django.contrib.admin' not in report['modules']
+
+
+def test_bench_slugs_checks_pytils():
+    out = StringIO()
+    call_command('bench_slugs', titles=200, stdout=out)
+    assert 'Совпадает с pytils: 200 заголовков.' in out.getvalue()
@@ -1,9 +1,16 @@
 # test_content.py
 import pytest
 
+from http import HTTPStatus
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from notes.forms import NoteForm
+from notes.models import Note, NoteSummary, NoteTerm
+from notes.pagination import paginate_keyset
+from notes.views import NoteSearch, NotesList
 
 
 @pytest.mark.parametrize(
@@ -47,3 +54,111 @@ def test_pages_contains_form(author_client, name, args):
     assert 'form' in response.context
     # Проверяем, что объект формы относится к нужному классу.
     assert isinstance(response.context['form'], NoteForm)
+
+
+def test_notes_list_is_paginated_by_cursor(author_client, many_notes):
+    url = reverse('notes:list')
+    response = author_client.get(url)
+    first_page = list(response.context['object_list'])
+    page_obj = response.context['page_obj']
+    assert len(first_page) == NotesList.paginate_by
+    assert page_obj.has_next()
+    # Курсор - id последней заметки на странице.
+    assert page_obj.next_cursor == first_page[-1].id
+    response = author_client.get(url, {'after': page_obj.next_cursor})
+    second_page = list(response.context['object_list'])
+    assert len(second_page) == len(many_notes) - NotesList.paginate_by
+    assert not response.context['page_obj'].has_next()
+    assert first_page[-1].id < second_page[0].id
+
+
+def test_full_page_is_read_in_one_query(author, many_notes):
+    # Признак следующей страницы - лишняя строка того же запроса.
+    notes = Note.objects.filter(author=author).summaries()
+    with CaptureQueriesContext(connection) as queries:
+        page = paginate_keyset(notes, None, NotesList.paginate_by)
+        assert len(page) == NotesList.paginate_by
+        assert page.has_next()
+        assert list(page) == page.object_list
+    assert len(queries) == 1
+
+
+@pytest.mark.parametrize('name', ('notes:list', 'notes:async-list'))
+def test_notes_list_context_names(author_client, note, name):
+    response = author_client.get(reverse(name))
+    assert response.context['note_list'] == [note]
+    assert response.context['object_list'] == [note]
+
+
+def test_notes_list_invalid_cursor(author_client):
+    response = author_client.get(reverse('notes:list'), {'after': 'abc'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_notes_list_streaming(author_client, many_notes, monkeypatch):
+    # Маленькие порции, чтобы поток состоял из нескольких частей.
+    monkeypatch.setattr(NotesList, 'stream_chunk_size', 10)
+    response = author_client.get(reverse('notes:list'), {'stream': 1})
+    assert response.streaming
+    content = b''.join(response.streaming_content).decode()
+    for note in many_notes:
+        assert f'>{note.title}</a>' in content.replace('> ', '>')
+    assert '</html>' in content
+
+
+def test_notes_list_does_not_load_text(
+        author_client, note, django_assert_num_queries
+):
+    # Пользователь (в первом запросе - из базы), счётчики автора и сама
+    # страница заметок.
+    with django_assert_num_queries(3) as context:
+        response = author_client.get(reverse('notes:list'))
+    notes_query = context.captured_queries[-1]['sql']
+    assert '"text"' not in notes_query
+    summary, = response.context['object_list']
+    assert isinstance(summary, NoteSummary)
+    assert summary == note
+    assert not hasattr(summary, '__dict__')
+
+
+def test_search_ranks_own_notes(author_client, author, not_author):
+    title_match = Note.objects.create(
+        title='Рецепт пирога', text='Мука и яйца.', author=author
+    )
+    text_match = Note.objects.create(
+        title='Покупки', text='Купить муку для пирога.', author=author
+    )
+    Note.objects.create(title='Пирог', text='Чужой.', author=not_author)
+    Note.objects.create(title='Без совпадений', text='', author=author)
+    response = author_client.get(reverse('notes:search'), {'q': 'ПИРОГА'})
+    slugs = [row['note__slug'] for row in response.context['results']]
+    # Слово в заголовке весит больше, чем в тексте.
+    assert slugs == [title_match.slug, text_match.slug]
+
+
+def test_search_index_follows_edits(author_client, note):
+    url = reverse('notes:search')
+    note.text = 'Совершенно новое содержание'
+    note.save()
+    assert not author_client.get(url, {'q': 'текст'}).context['results']
+    assert author_client.get(url, {'q': 'содержание'}).context['results']
+    note.delete()
+    assert not author_client.get(url, {'q': 'содержание'}).context['results']
+
+
+def test_search_is_paginated(author_client, many_notes, monkeypatch):
+    monkeypatch.setattr(NoteSearch, 'paginate_by', 10)
+    url = reverse('notes:search')
+    # Заметки из many_notes созданы bulk_create и не проиндексированы.
+    NoteTerm.objects.index_notes(Note.objects.all())
+    seen = []
+    params = {'q': 'просто текст'}
+    while True:
+        response = author_client.get(url, params)
+        seen.extend(row['note_id'] for row in response.context['results'])
+        if not response.context['next_cursor']:
+            break
+        params['after'] = response.context['next_cursor']
+    assert sorted(seen) == list(
+        Note.objects.order_by('pk').values_list('pk', flat=True)
+    )
@@ -0,0 +1,40 @@
+# pytest_db.py
+import pytest
+
+from django.db import DatabaseError, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes.models import Note
+
+
+@pytest.mark.django_db
+def test_sqlite_pragmas_are_applied():
+    with connections['default'].cursor() as cursor:
+        cursor.execute('PRAGMA busy_timeout')
+        assert cursor.fetchone()[0] == 5000
+        cursor.execute('PRAGMA synchronous')
+        # 1 - NORMAL.
+        assert cursor.fetchone()[0] == 1
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'readonly'])
+def test_list_and_detail_read_from_read_database(settings, author_client,
+                                                 note):
+    settings.NOTES_READ_DATABASE = 'readonly'
+    with CaptureQueriesContext(connections['readonly']) as context:
+        author_client.get(reverse('notes:list'))
+        author_client.get(reverse('notes:detail', args=(note.slug,)))
+    # Счётчики автора в шапке списка, список и заметка.
+    assert len(context.captured_queries) == 3
+    assert all('notes_' in query['sql']
+               for query in context.captured_queries)
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'readonly'])
+def test_read_database_is_query_only(settings, note):
+    settings.NOTES_READ_DATABASE = 'readonly'
+    connections['readonly'].close()
+    with pytest.raises(DatabaseError):
+        Note.objects.using('readonly').filter(pk=note.pk).delete()
+    connections['readonly'].close()
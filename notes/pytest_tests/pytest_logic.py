@@ -1,14 +1,19 @@
 # test_logic.py
+import json
 import pytest
 
 from http import HTTPStatus
 from pytest_django.asserts import assertRedirects, assertFormError
 from pytils.translit import slugify
 
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 
-from notes.forms import WARNING
+from notes import slugs, transfer
+from notes.forms import WARNING, NoteForm
 from notes.models import Note
+from notes.views import NoteImport
 
 
 # Указываем фикстуру form_data в параметрах теста.
@@ -106,3 +111,157 @@ def test_other_user_cant_delete_note(not_author_client, form_data, slug_for_args
     response = not_author_client.post(url)
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert Note.objects.count() == 1
+
+
+def test_same_title_gets_suffixed_slug(author_client, form_data):
+    url = reverse('notes:add')
+    form_data.pop('slug')
+    for _ in range(3):
+        assertRedirects(author_client.post(url, data=form_data),
+                        reverse('notes:success'))
+    expected_slug = slugify(form_data['title'])
+    assert set(Note.objects.values_list('slug', flat=True)) == {
+        expected_slug, f'{expected_slug}-2', f'{expected_slug}-3'
+    }
+
+
+def test_create_with_empty_slug_queries(
+        author_client, form_data, django_assert_num_queries
+):
+    form_data.pop('slug')
+    # Пользователь, занятые slug, вставка заметки внутри точки
+    # сохранения (SAVEPOINT и RELEASE), поисковый индекс, первая
+    # ревизия, HTML текста и счётчики автора.
+    with django_assert_num_queries(9):
+        author_client.post(reverse('notes:add'), data=form_data)
+
+
+def test_slug_allocation_retries_on_integrity_error(author, note,
+                                                    monkeypatch):
+    allocate = slugs.allocate_slug
+    calls = []
+
+    def stale_allocate(*args):
+        # Первая попытка видит устаревшие данные и выдаёт занятый slug.
+        calls.append(args)
+        return note.slug if len(calls) == 1 else allocate(*args)
+
+    monkeypatch.setattr(slugs, 'allocate_slug', stale_allocate)
+    new_note = Note.objects.create(title=note.title, text='', author=author)
+    assert len(calls) == 2
+    assert new_note.slug != note.slug
+
+
+def test_import_notes_from_jsonl(author_client, author, note):
+    lines = [
+        {'title': 'Первая', 'text': 'Текст 1'},
+        {'title': 'Вторая', 'text': 'Текст 2', 'slug': note.slug},
+    ]
+    upload = SimpleUploadedFile('notes.jsonl', '\n'.join(
+        json.dumps(line, ensure_ascii=False) for line in lines
+    ).encode())
+    response = author_client.post(
+        reverse('notes:import'), {'file': upload}, follow=True
+    )
+    assertRedirects(response, reverse('notes:success'))
+    assert Note.objects.filter(author=author).count() == 3
+    # Занятый slug из файла получает суффикс, и автор узнаёт об этом.
+    assert Note.objects.filter(slug=f'{note.slug}-2').exists()
+    assert [str(message) for message in response.context['messages']] == [
+        f'Строка 2: адрес «{note.slug}» уже занят, заметка сохранена с '
+        f'адресом «{note.slug}-2».'
+    ]
+
+
+def test_import_caps_renamed_messages(author_client, note, monkeypatch):
+    monkeypatch.setattr(NoteImport, 'renamed_shown', 1)
+    upload = SimpleUploadedFile('notes.jsonl', '\n'.join(
+        json.dumps({'title': 'Копия', 'text': 'Текст', 'slug': note.slug})
+        for _ in range(3)
+    ).encode())
+    response = author_client.post(
+        reverse('notes:import'), {'file': upload}, follow=True
+    )
+    notices = [str(message) for message in response.context['messages']]
+    assert notices[0].startswith('Строка 1:')
+    assert notices[1:] == ['Ещё заметок с занятым адресом: 2.']
+
+
+def test_import_lists_renamed_slugs(author, note):
+    lines = [json.dumps({'title': 'Без адреса', 'text': 'Текст'}),
+             json.dumps({'title': 'Своя', 'text': 'Текст', 'slug': 'free'}),
+             json.dumps({'title': 'Копия', 'text': 'Текст',
+                         'slug': note.slug})]
+    renamed = []
+    assert transfer.import_notes(lines, author, renamed=renamed) == 3
+    assert renamed == [
+        f'Строка 3: адрес «{note.slug}» уже занят, заметка сохранена с '
+        f'адресом «{note.slug}-2».'
+    ]
+
+
+def test_import_reports_slug_conflict(author, note, monkeypatch):
+    # Все попытки выдают slug, который уже занят.
+    monkeypatch.setattr(transfer, 'allocate_slugs',
+                        lambda queryset, bases, max_length: bases)
+    lines = [json.dumps({'title': 'Первая', 'text': 'Текст'}),
+             json.dumps({'title': 'Вторая', 'text': 'Текст',
+                         'slug': note.slug})]
+    with pytest.raises(ValidationError, match='Импортировано заметок: 1'):
+        transfer.import_notes(lines, author, batch_size=1)
+    assert Note.objects.filter(author=author).count() == 2
+
+
+def test_import_reports_bad_line(author_client):
+    upload = SimpleUploadedFile('notes.jsonl', b'{"title": "A", "text": "B"}'
+                                               b'\nnot json')
+    response = author_client.post(reverse('notes:import'), {'file': upload})
+    assert response.status_code == HTTPStatus.OK
+    assert 'Строка 2' in response.context['form'].errors['file'][0]
+
+
+def test_export_streams_only_own_notes(author_client, note, not_author):
+    Note.objects.create(title='Чужая', text='', author=not_author)
+    response = author_client.get(reverse('notes:export'))
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert [json.loads(line)['slug'] for line in lines] == [note.slug]
+
+
+def test_slug_takes_number_after_highest(author, note,
+                                         django_assert_num_queries):
+    for slug in (f'{note.slug}-9', f'{note.slug}-10', f'{note.slug}-x'):
+        Note.objects.create(title='Другая', slug=slug, author=author)
+    with django_assert_num_queries(1):
+        assert slugs.allocate_slugs(
+            Note.objects.all(), [note.slug, note.slug, 'free'], 100
+        ) == [f'{note.slug}-11', f'{note.slug}-12', 'free']
+
+
+@pytest.mark.django_db
+def test_import_sized_batch_gets_slugs():
+    bases = [f'note-{index}' for index in range(transfer.IMPORT_BATCH_SIZE)]
+    assert slugs.allocate_slugs(Note.objects.all(), bases, 100) == bases
+
+
+@pytest.mark.parametrize('name, status', (
+    ('notes:add', HTTPStatus.OK),
+    ('notes:async-add', HTTPStatus.OK),
+    ('notes:api-list', HTTPStatus.BAD_REQUEST),
+))
+def test_slug_taken_after_validation_is_form_error(
+        author_client, note, form_data, monkeypatch, name, status
+):
+    # Параллельный запрос занял slug после проверки формы.
+    monkeypatch.setattr(NoteForm, 'clean_slug',
+                        lambda form: form.cleaned_data['slug'])
+    form_data['slug'] = note.slug
+    if name == 'notes:api-list':
+        response = author_client.post(reverse(name), json.dumps(form_data),
+                                      content_type='application/json')
+        errors = response.json()['errors']
+    else:
+        response = author_client.post(reverse(name), data=form_data)
+        errors = response.context['form'].errors
+    assert response.status_code == status
+    assert 'slug' in errors
+    assert Note.objects.count() == 1
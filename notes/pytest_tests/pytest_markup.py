@@ -0,0 +1,143 @@
+# pytest_markup.py
+import json
+import time
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from notes import markup
+from notes.models import Note, NoteHtml
+from notes.transfer import import_notes
+
+MARKDOWN = '# План\n\n- **важно**\n- `код`\n\nСм. [сайт](https://ya.ru).'
+
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    calls = []
+    render = markup.render
+
+    def counting_render(text):
+        calls.append(text)
+        return render(text)
+
+    monkeypatch.setattr(markup, 'render', counting_render)
+    return calls
+
+
+@pytest.mark.parametrize('text, html', (
+    ('Строка\nещё строка', '<p>Строка<br>ещё строка</p>'),
+    ('## Раздел', '<h2>Раздел</h2>'),
+    ('## Раздел ##  ', '<h2>Раздел</h2>'),
+    ('# C#', '<h1>C#</h1>'),
+    ('1. раз\n2. два', '<ol><li>раз</li><li>два</li></ol>'),
+    ('> *цитата*', '<blockquote><p><em>цитата</em></p></blockquote>'),
+    ('```\n<b>**нет**</b>\n```',
+     '<pre><code>&lt;b&gt;**нет**&lt;/b&gt;</code></pre>'),
+    ('snake_case_name', '<p>snake_case_name</p>'),
+    ('---', '<hr>'),
+))
+def test_render_markdown(text, html):
+    assert markup.render(text) == html
+
+
+@pytest.mark.parametrize('text', (
+    '<script>alert(1)</script>',
+    '<img src=x onerror=alert(1)>',
+    '[ссылка](javascript:alert(1))',
+    '[ссылка](JavaScript:alert(1))',
+    '[ссылка](/x"onmouseover="alert(1))',
+))
+def test_render_is_sanitized(text):
+    html = markup.render(text)
+    assert '<script' not in html and '<img' not in html
+    assert 'href="javascript' not in html.lower()
+    assert '"onmouseover' not in html
+
+
+@pytest.mark.parametrize('line', (
+    '# а' + ' ' * 50_000 + 'б',
+    '# а' + ' ' * 50_000 + '#б',
+    '## а' + ' ' * 50_000,
+))
+def test_long_whitespace_in_heading_renders_fast(line):
+    started = time.perf_counter()
+    html = markup.render(line)
+    assert time.perf_counter() - started < 0.5
+    assert html.startswith('<h')
+
+
+def test_save_stores_html(note, render_calls):
+    note.text = MARKDOWN
+    note.save(update_fields=['text'])
+    rendered = NoteHtml.objects.get(note=note)
+    assert rendered.digest == markup.digest(MARKDOWN)
+    assert '<li><strong>важно</strong></li>' in rendered.html
+    assert render_calls == [MARKDOWN]
+    # Заголовок и неизменный текст HTML не перестраивают.
+    note.title = 'Другой заголовок'
+    note.save()
+    assert render_calls == [MARKDOWN]
+
+
+def test_detail_shows_stored_html(author_client, note, render_calls):
+    note.text = MARKDOWN
+    note.save()
+    render_calls.clear()
+    response = author_client.get(reverse('notes:detail', args=(note.slug,)))
+    assert '<h1>План</h1>' in response.content.decode()
+    assert render_calls == []
+
+
+def test_stale_html_is_rendered_on_read(note, monkeypatch):
+    Note.objects.filter(pk=note.pk).update(text='*в обход save*')
+    note = Note.objects.select_related('rendered').get(pk=note.pk)
+    assert note.text_html() == '<p><em>в обход save</em></p>'
+    monkeypatch.setattr(markup, 'VERSION', markup.VERSION + 1)
+    assert note.text_html() == '<p><em>в обход save</em></p>'
+
+
+def test_render_notes_command(author, note, monkeypatch):
+    other = Note.objects.create(title='Другая', text='**Текст**',
+                                author=author)
+    NoteHtml.objects.filter(note=other).delete()
+    out = StringIO()
+    call_command('render_notes', stdout=out)
+    assert 'Отрисовано заметок: 1' in out.getvalue()
+    assert NoteHtml.objects.get(note=other).html == (
+        '<p><strong>Текст</strong></p>'
+    )
+    # Новая версия отрисовщика: устарел HTML всех заметок.
+    monkeypatch.setattr(markup, 'VERSION', markup.VERSION + 1)
+    call_command('render_notes', batch_size=1, stdout=out)
+    assert 'Отрисовано заметок: 2' in out.getvalue()
+    assert set(NoteHtml.objects.values_list('renderer', flat=True)) == {
+        markup.VERSION
+    }
+    call_command('render_notes', all=True, stdout=out)
+    assert out.getvalue().count('Отрисовано заметок: 2') == 2
+
+
+def test_import_stores_html(author):
+    import_notes([json.dumps({'title': 'Импорт', 'text': '_курсив_'})],
+                 author)
+    assert NoteHtml.objects.get().html == '<p><em>курсив</em></p>'
+
+
+def test_render_notes_refreshes_cached_pages(author_client, note,
+                                             monkeypatch):
+    url = reverse('notes:detail', args=(note.slug,))
+    cached = author_client.get(url)
+    assert cached['ETag']
+    monkeypatch.setattr(markup, 'VERSION', markup.VERSION + 1)
+    monkeypatch.setattr(markup, 'render',
+                        lambda text: mark_safe('<p>Новая отрисовка</p>'))
+    call_command('render_notes', stdout=StringIO())
+    response = author_client.get(url, HTTP_IF_NONE_MATCH=cached['ETag'])
+    assert response.status_code == HTTPStatus.OK
+    assert 'Новая отрисовка' in response.content.decode()
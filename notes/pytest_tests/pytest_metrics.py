@@ -0,0 +1,100 @@
+# pytest_metrics.py
+import json
+from http import HTTPStatus
+
+import pytest
+
+from django.core.cache import caches
+from django.urls import reverse
+
+from notes import metrics
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+
+def test_middleware_records_view_metrics(author_client, note):
+    author_client.get(reverse('notes:detail', args=(note.slug,)))
+    author_client.get(reverse('notes:detail', args=(note.slug,)))
+    stats = metrics.get_stats()['notes:detail']
+    assert stats.requests == 2
+    # Пользователь и заметка; второй раз всё из кэша.
+    assert stats.queries == 2
+    assert stats.max_queries == 2
+    assert stats.total_time >= stats.db_time > 0
+    assert stats.template_time > 0
+
+
+def test_unresolved_requests_are_grouped(client):
+    client.get('/no-such-page/')
+    assert metrics.get_stats()[metrics.UNRESOLVED].requests == 1
+
+
+def test_metrics_endpoint(author_client, client, note):
+    author_client.get(reverse('notes:list'))
+    response = client.get(reverse('notes:metrics'))
+    assert response['Content-Type'].startswith('text/plain')
+    content = response.content.decode()
+    assert 'notes_view_requests_total{view="notes:list"} 1' in content
+    assert 'notes_view_queries_max{view="notes:list"} 3' in content
+    assert '# TYPE notes_view_db_seconds_total counter' in content
+    assert 'notes_page_cache_events_total{page="list",event="miss"} 1' in (
+        content
+    )
+
+
+@pytest.mark.parametrize('name', ('notes:metrics', 'notes:cache-stats'))
+def test_metrics_are_closed_to_other_addresses(client, settings, name):
+    url = reverse(name)
+    response = client.get(url, REMOTE_ADDR='203.0.113.5')
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    settings.NOTES_METRICS_ALLOWED_IPS = ['203.0.113.5']
+    response = client.get(url, REMOTE_ADDR='203.0.113.5')
+    assert response.status_code == HTTPStatus.OK
+    assert client.get(url).status_code == HTTPStatus.FORBIDDEN
+
+
+def test_query_budget_overrun_is_logged(author_client, note, query_budgets,
+                                        caplog):
+    budget = query_budgets['notes:detail']
+    query_budgets['notes:detail'] = 1
+    author_client.get(reverse('notes:detail', args=(note.slug,)))
+    assert 'notes:detail: 2 запросов к базе при бюджете 1' in caplog.text
+    # Фикстура сверяет замеры с бюджетом после теста.
+    query_budgets['notes:detail'] = budget
+
+
+@pytest.mark.parametrize('name, method, args, payload', (
+    ('notes:add', 'post', (), 'form'),
+    ('notes:edit', 'post', ('slug',), 'form'),
+    ('notes:delete', 'post', ('slug',), None),
+    ('notes:async-add', 'post', (), 'form'),
+    ('notes:async-edit', 'post', ('slug',), 'form'),
+    ('notes:async-delete', 'post', ('slug',), None),
+    ('notes:api-list', 'post', (), 'json'),
+    ('notes:api-detail', 'put', ('slug',), 'json'),
+    ('notes:list', 'get', (), None),
+    ('notes:detail', 'get', ('slug',), None),
+    ('notes:async-list', 'get', (), None),
+    ('notes:async-detail', 'get', ('slug',), None),
+))
+def test_query_budgets_hold_with_cold_caches(author_client, note, form_data,
+                                             name, method, args, payload):
+    # Пустые кэши сессий, пользователей и страниц: так выглядит первый
+    # запрос после перезапуска. Бюджеты сверяет фикстура query_budgets.
+    for cache in caches.all():
+        cache.clear()
+    url = reverse(name, args=[note.slug for _ in args])
+    form_data['slug'] = ''
+    if payload == 'json':
+        response = getattr(author_client, method)(
+            url, json.dumps(form_data), content_type='application/json'
+        )
+    else:
+        response = getattr(author_client, method)(
+            url, form_data if payload else None
+        )
+    assert response.status_code < HTTPStatus.BAD_REQUEST
+    assert metrics.get_stats()[name].requests == 1
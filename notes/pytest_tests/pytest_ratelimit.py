@@ -0,0 +1,217 @@
+# pytest_ratelimit.py
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from notes import ratelimit
+from notes.benchmarks import percentile
+from notes.middleware import RateLimitMiddleware
+from notes.models import Note
+
+
+class CountingCache:
+    """Обёртка кэша, которая считает обращения к нему."""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.cache, name)
+
+        def call(*args, **kwargs):
+            self.calls.append(name)
+            return method(*args, **kwargs)
+        return call
+
+
+@pytest.mark.parametrize('rate, expected', (
+    ('30/m', (30, 60)), ('5/s', (5, 1)), ('100/d', (100, 86400)),
+))
+def test_parse_rate(rate, expected):
+    assert ratelimit.parse_rate(rate) == expected
+
+
+@pytest.mark.parametrize('rate', ('30', '0/m', 'x/m', '5/w'))
+def test_parse_rate_rejects_invalid(rate):
+    with pytest.raises(ValueError):
+        ratelimit.parse_rate(rate)
+
+
+def test_bucket_allows_burst_then_refills():
+    now = 1_000_000.0
+    # Три жетона, новый - каждые 2 секунды.
+    assert [ratelimit.take('bucket', 3, 6, now) for _ in range(3)] == [0] * 3
+    assert ratelimit.take('bucket', 3, 6, now) == 2
+    # За 5 секунд появились два жетона.
+    assert ratelimit.take('bucket', 3, 6, now + 5) == 0
+    assert ratelimit.take('bucket', 3, 6, now + 5) == 0
+    assert ratelimit.take('bucket', 3, 6, now + 5) > 0
+
+
+def test_rejected_requests_do_not_extend_lockout():
+    now = 1_000_000.0
+    for _ in range(3):
+        ratelimit.take('bucket', 3, 60, now)
+    retry_after = ratelimit.take('bucket', 3, 60, now)
+    assert retry_after == 20
+    for second in range(retry_after):
+        assert ratelimit.take('bucket', 3, 60, now + second) > 0
+    assert ratelimit.take('bucket', 3, 60, now + retry_after) == 0
+
+
+def test_idle_time_does_not_overfill_bucket():
+    now = 1_000_000.0
+    assert ratelimit.take('bucket', 3, 60, now) == 0
+    # За 50 секунд простоя корзина наполняется только до ёмкости.
+    assert [
+        ratelimit.take('bucket', 3, 60, now + 50) for _ in range(3)
+    ] == [0] * 3
+    assert ratelimit.take('bucket', 3, 60, now + 50) > 0
+
+
+def test_one_cache_round_trip_per_decision(monkeypatch):
+    cache = CountingCache(ratelimit.get_cache())
+    monkeypatch.setattr(ratelimit, 'get_cache', lambda: cache)
+    ratelimit.take('bucket', 20, 60)
+    cache.calls.clear()
+    for _ in range(10):
+        assert ratelimit.take('bucket', 20, 60) == 0
+    assert cache.calls == ['incr'] * 10
+
+
+def test_rejection_returns_token(monkeypatch):
+    cache = CountingCache(ratelimit.get_cache())
+    monkeypatch.setattr(ratelimit, 'get_cache', lambda: cache)
+    now = 1_000_000.0
+    ratelimit.take('bucket', 1, 60, now)
+    cache.calls.clear()
+    assert ratelimit.take('bucket', 1, 60, now) > 0
+    assert cache.calls == ['incr', 'decr']
+
+
+def test_first_request_takes_two_round_trips(monkeypatch):
+    cache = CountingCache(ratelimit.get_cache())
+    monkeypatch.setattr(ratelimit, 'get_cache', lambda: cache)
+    assert ratelimit.take('bucket', 5, 60) == 0
+    assert cache.calls == ['incr', 'add']
+
+
+def test_request_after_idle_takes_two_round_trips(monkeypatch):
+    cache = CountingCache(ratelimit.get_cache())
+    monkeypatch.setattr(ratelimit, 'get_cache', lambda: cache)
+    now = 1_000_000.0
+    ratelimit.take('bucket', 5, 60, now)
+    cache.calls.clear()
+    # Ключ ещё жив (timeout - период), но TAT отстал от времени.
+    assert ratelimit.take('bucket', 5, 60, now + 30) == 0
+    assert cache.calls == ['incr', 'set']
+    cache.calls.clear()
+    assert ratelimit.take('bucket', 5, 60, now + 30) == 0
+    assert cache.calls == ['incr']
+
+
+@pytest.mark.django_db
+def test_note_writes_are_limited_per_user(settings, author_client,
+                                          not_author_client):
+    settings.NOTES_RATE_LIMITS = {'notes:add': '2/m'}
+    url = reverse('notes:add')
+    statuses = [
+        author_client.post(url, data={'title': f'Заметка {index}',
+                                      'text': 'Текст'}).status_code
+        for index in range(3)
+    ]
+    assert statuses == [HTTPStatus.FOUND] * 2 + [
+        HTTPStatus.TOO_MANY_REQUESTS
+    ]
+    response = author_client.post(url, data={'title': 'Ещё', 'text': ''})
+    assert 1 <= int(response['Retry-After']) <= 60
+    assert Note.objects.count() == 2
+    # Чтение и другие пользователи лимит не расходуют.
+    assert author_client.get(url).status_code == HTTPStatus.OK
+    response = not_author_client.post(
+        url, data={'title': 'Чужая', 'text': 'Текст'}
+    )
+    assert response.status_code == HTTPStatus.FOUND
+
+
+@pytest.mark.django_db
+def test_api_gets_json_error(settings, author_client, note):
+    settings.NOTES_RATE_LIMITS = {'notes:api-detail': '1/h'}
+    url = reverse('notes:api-detail', args=(note.slug,))
+    payload = {'data': '{"title": "Правка"}',
+               'content_type': 'application/json'}
+    assert author_client.patch(url, **payload).status_code == HTTPStatus.OK
+    response = author_client.patch(url, **payload)
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json()['retry_after'] == int(response['Retry-After'])
+
+
+def writer_latencies(settings, limits, bursty_threads=6):
+    """p95 задержки спокойного пользователя рядом с пакетными писателями.
+
+    Представление записи держит общую блокировку, как SQLite держит
+    блокировку записи, поэтому запросы писателей выстраиваются в
+    очередь за ней. Замер начинается, когда писатели уже успели
+    израсходовать свою корзину.
+    """
+    settings.NOTES_RATE_LIMITS = limits
+    writer_lock = threading.Lock()
+
+    def write_view(request):
+        with writer_lock:
+            time.sleep(0.002)
+        return HttpResponse()
+
+    middleware = RateLimitMiddleware(lambda request: HttpResponse())
+    factory = RequestFactory()
+    match = resolve(reverse('notes:add'))
+
+    def post(user):
+        request = factory.post(match.route)
+        request.user = user
+        request.resolver_match = match
+        return middleware.process_view(
+            request, write_view, (), {}
+        ) or write_view(request)
+
+    bursty = User(pk=1, username='bursty')
+    quiet = User(pk=2, username='quiet')
+    stop = threading.Event()
+
+    def hammer():
+        while not stop.is_set():
+            post(bursty)
+            # Время на сеть между запросами скрипта.
+            time.sleep(0.0005)
+
+    threads = [threading.Thread(target=hammer) for _ in range(bursty_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    samples = []
+    try:
+        for _ in range(20):
+            started = time.perf_counter()
+            assert post(quiet).status_code == HTTPStatus.OK
+            samples.append(time.perf_counter() - started)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return percentile(samples, 95)
+
+
+def test_bursty_writers_do_not_stall_other_users(settings):
+    unlimited = writer_latencies(settings, {})
+    ratelimit.get_cache().clear()
+    # Лимита хватает на все 20 запросов спокойного пользователя.
+    limited = writer_latencies(settings, {'notes:add': '20/m'})
+    assert limited < unlimited / 2
@@ -0,0 +1,151 @@
+# pytest_revisions.py
+import json
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from notes import revisions
+from notes.api import ApiRevisionsList
+from notes.models import Note, NoteConflict, NoteRevision
+
+LONG_TEXT = ' '.join(f'слово{index}' for index in range(1000))
+
+
+@pytest.fixture
+def history(note, settings):
+    """Заметка с пятью ревизиями; снимок - в каждой второй."""
+    settings.NOTES_REVISION_SNAPSHOT_EVERY = 2
+    texts = [note.text]
+    for index in range(2, 6):
+        note.text = f'{texts[-1]} правка{index}'
+        note.save(update_fields=['text'])
+        texts.append(note.text)
+    return texts
+
+
+def test_saves_are_recorded(note, history):
+    assert note.revision == 5
+    rows = NoteRevision.objects.filter(note=note).order_by('number')
+    assert [row.snapshot for row in rows] == [
+        True, False, True, False, True
+    ]
+    for number, text in enumerate(history, start=1):
+        revision = note.revisions.reconstruct(number)
+        assert (revision.title, revision.text) == (note.title, text)
+
+
+def test_delta_stores_only_the_change(note):
+    note.text = LONG_TEXT
+    note.save()
+    note.text = LONG_TEXT.replace('слово500', 'другое')
+    note.save()
+    delta = NoteRevision.objects.get(note=note, number=3)
+    assert not delta.snapshot
+    assert len(delta.data) < 100
+    assert note.revisions.reconstruct(3).text == note.text
+
+
+def test_reconstruct_reads_one_query(note, history,
+                                     django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert note.revisions.reconstruct(4).text == history[3]
+    with pytest.raises(NoteRevision.DoesNotExist):
+        note.revisions.reconstruct(6)
+
+
+def test_delta_round_trip():
+    old = '  Первая строка.\nВторая  строка с  пробелами.\n'
+    new = 'Вторая строка с пробелами.\nНовая строка.\n\n'
+    assert revisions.apply_deltas(
+        old, revisions.make_delta(old, new)
+    ) == new
+
+
+def test_title_only_save_keeps_text(note):
+    stale = Note.objects.only('id', 'title', 'version', 'revision').get()
+    stale.title = 'Новое название'
+    stale.save(update_fields=['title'])
+    revision = note.revisions.reconstruct(2)
+    assert (revision.title, revision.text) == ('Новое название', note.text)
+
+
+def test_conflict_records_nothing(note):
+    stale = Note.objects.get(pk=note.pk)
+    note.text = 'Первая правка'
+    note.save()
+    stale.text = 'Вторая правка'
+    with pytest.raises(NoteConflict):
+        stale.save()
+    assert stale.revision == 1
+    assert NoteRevision.objects.filter(note=note).count() == 2
+
+
+def test_api_lists_revisions_newest_first(author_client, note, history,
+                                          monkeypatch):
+    monkeypatch.setattr(ApiRevisionsList, 'paginate_by', 3)
+    url = reverse('notes:api-revisions', args=(note.slug,))
+    page = author_client.get(url).json()
+    assert [row['number'] for row in page['results']] == [5, 4, 3]
+    assert page['results'][0]['size'] == len(history[-1].encode())
+    page = author_client.get(url, {'after': page['next']}).json()
+    assert [row['number'] for row in page['results']] == [2, 1]
+    assert page['next'] is None
+
+
+def test_api_reads_and_restores_revision(author_client, note, history):
+    url = reverse('notes:api-revision', args=(note.slug, 2))
+    assert author_client.get(url).json()['text'] == history[1]
+    response = author_client.post(
+        reverse('notes:api-revision-restore', args=(note.slug, 2)),
+        json.dumps({'version': note.version}),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['revision'] == 6
+    note.refresh_from_db()
+    assert note.text == history[1]
+    assert note.revisions.reconstruct(6).text == history[1]
+
+
+def test_api_restore_of_stale_version_conflicts(author_client, note,
+                                                history):
+    response = author_client.post(
+        reverse('notes:api-revision-restore', args=(note.slug, 1)),
+        json.dumps({'version': 1}),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json()['version'] == note.version
+
+
+@pytest.mark.parametrize('name, args', (
+    ('notes:api-revisions', ()),
+    ('notes:api-revision', (1,)),
+    ('notes:api-revision-restore', (1,)),
+))
+def test_other_user_cant_see_revisions(not_author_client, note, name,
+                                       args):
+    url = reverse(name, args=(note.slug, *args))
+    response = not_author_client.post(url) if name.endswith(
+        'restore'
+    ) else not_author_client.get(url)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_unknown_revision_is_not_found(author_client, note):
+    url = reverse('notes:api-revision', args=(note.slug, 7))
+    assert author_client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_bench_revisions_rolls_back():
+    out = StringIO()
+    call_command('bench_revisions', revisions=[5], snapshot_every=[1, 2],
+                 size=200, repeat=2, stdout=out)
+    assert out.getvalue().count('сборка p50') == 2
+    assert not Note.objects.exists()
+    assert not NoteRevision.objects.exists()
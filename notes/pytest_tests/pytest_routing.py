@@ -0,0 +1,118 @@
+# pytest_routing.py
+import sqlite3
+
+import pytest
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from notes import routers
+from notes.forms import NoteForm
+from notes.middleware import PIN_COOKIE
+from notes.models import Note
+
+FILE_ALIASES = ('primary', 'replica')
+
+
+@pytest.fixture
+def file_databases(tmp_path, settings, django_db_blocker):
+    # Основная база и реплика - два файла SQLite. Реплика получает
+    # данные только при вызове replicate(), как при отставании.
+    for alias in FILE_ALIASES:
+        connections.settings[alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(tmp_path / f'{alias}.sqlite3'),
+        }
+    with django_db_blocker.unblock():
+        call_command('migrate', database='primary', verbosity=0)
+        settings.NOTES_WRITE_DATABASE = 'primary'
+        settings.NOTES_READ_DATABASE = 'replica'
+
+        def replicate():
+            connections['replica'].close()
+            target = sqlite3.connect(connections.settings['replica']['NAME'])
+            connections['primary'].ensure_connection()
+            connections['primary'].connection.backup(target)
+            target.close()
+
+        replicate()
+        yield replicate
+        for alias in FILE_ALIASES:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+
+@pytest.fixture
+def primary_author(file_databases):
+    return get_user_model().objects.db_manager('primary').create(
+        username='Автор'
+    )
+
+
+def create_note(author, slug='note-slug'):
+    return Note.objects.create(
+        title='Заголовок', text='Текст', slug=slug, author=author
+    )
+
+
+@pytest.mark.django_db
+def test_reads_go_to_replica_until_replicated(file_databases,
+                                              primary_author):
+    note = create_note(primary_author)
+    assert note._state.db == 'primary'
+    assert not Note.objects.filter(pk=note.pk).exists()
+    file_databases()
+    assert Note.objects.filter(pk=note.pk).exists()
+
+
+@pytest.mark.django_db
+def test_request_reads_its_own_write(file_databases, primary_author):
+    with routers.request_scope() as state:
+        assert not routers.is_pinned()
+        note = create_note(primary_author)
+        assert state.wrote
+        assert Note.objects.filter(pk=note.pk).exists()
+    # Следующий запрос без окна читает из реплики.
+    with routers.request_scope():
+        assert not Note.objects.filter(pk=note.pk).exists()
+    with routers.request_scope(pinned=True):
+        assert Note.objects.filter(pk=note.pk).exists()
+
+
+@pytest.mark.django_db
+def test_clean_slug_checks_primary(file_databases, primary_author):
+    create_note(primary_author)
+    form = NoteForm(data={'title': 'Другая', 'text': 'Текст',
+                          'slug': 'note-slug'})
+    assert not form.is_valid()
+    assert 'slug' in form.errors
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'readonly'])
+def test_write_pins_following_reads_to_primary(settings, author_client,
+                                               form_data):
+    settings.NOTES_READ_DATABASE = 'readonly'
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    cookie = response.cookies[PIN_COOKIE]
+    assert cookie['max-age'] == settings.NOTES_PRIMARY_PIN_SECONDS
+    with CaptureQueriesContext(connections['readonly']) as context:
+        response = author_client.get(reverse('notes:list'))
+    assert form_data['title'] in response.content.decode()
+    assert not context.captured_queries
+    # Окно закончилось - чтение снова идёт из реплики.
+    author_client.cookies.pop(PIN_COOKIE)
+    with CaptureQueriesContext(connections['readonly']) as context:
+        author_client.get(
+            reverse('notes:detail', args=(form_data['slug'],))
+        )
+    assert len(context.captured_queries) == 1
+
+
+@pytest.mark.django_db
+def test_reads_do_not_pin(author_client, note):
+    response = author_client.get(reverse('notes:detail', args=(note.slug,)))
+    assert PIN_COOKIE not in response.cookies
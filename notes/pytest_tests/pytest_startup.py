@@ -0,0 +1,59 @@
+# pytest_startup.py
+import pytest
+
+from django.db import connections
+from django.urls import clear_url_caches, get_resolver
+
+from notes import startup, warmup
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   _io
+import time:       300 |        420 | django.utils
+import time:        80 |         80 |     django.utils.functional
+'''
+
+
+def test_parse_importtime():
+    entries = startup.parse_importtime(IMPORTTIME)
+    assert entries == [
+        ('_io', 120, 120),
+        ('django.utils', 300, 420),
+        ('django.utils.functional', 80, 80),
+    ]
+    assert startup.group_by_package(entries) == {'_io': 120, 'django': 380}
+
+
+def test_warm_urls_populates_resolvers():
+    clear_url_caches()
+    assert warmup.warm_urls() > 0
+    resolver = get_resolver()
+    assert resolver._populated
+    assert all(
+        sub_resolver._populated
+        for prefix, sub_resolver in resolver.namespace_dict.values()
+    )
+
+
+@pytest.mark.django_db(transaction=True, databases=['default', 'readonly'])
+def test_warm_databases_closes_connections_before_fork(monkeypatch):
+    closed = []
+    for alias in connections:
+        # Тестовая база SQLite в памяти не закрывается по close().
+        monkeypatch.setattr(connections[alias], 'close',
+                            lambda alias=alias: closed.append(alias))
+    warmup.warm_databases()
+    assert closed == list(connections)
+
+
+def test_warm_up_respects_setting(settings, monkeypatch):
+    calls = []
+    for name in ('warm_urls', 'warm_templates', 'warm_databases'):
+        monkeypatch.setattr(warmup, name,
+                            lambda name=name: calls.append(name))
+    settings.NOTES_WARM_UP = False
+    warmup.warm_up()
+    assert not calls
+    settings.NOTES_WARM_UP = True
+    warmup.warm_up()
+    assert calls == ['warm_urls', 'warm_templates', 'warm_databases']
@@ -0,0 +1,107 @@
+# pytest_stats.py
+from io import StringIO
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from notes.models import AuthorStats, Note, NoteTerm, text_size
+from notes.transfer import import_notes
+
+pytestmark = pytest.mark.django_db
+
+
+def stats_of(author):
+    stats = AuthorStats.objects.for_author(author.pk)
+    return stats.notes, stats.text_bytes
+
+
+def test_new_author_has_empty_stats(author):
+    assert AuthorStats.objects.filter(author=author).exists()
+    assert stats_of(author) == (0, 0)
+
+
+def test_save_and_delete_update_stats(author, note):
+    assert stats_of(author) == (1, text_size(note.text))
+    # Кириллица - по два байта на символ, пробел - один.
+    assert text_size(note.text) == len(note.text) * 2 - 1
+    note.text = 'Новый, более длинный текст'
+    note.save()
+    assert stats_of(author) == (1, text_size(note.text))
+    note.title = 'Только заголовок'
+    note.save(update_fields=('title',))
+    assert stats_of(author) == (1, text_size(note.text))
+    note.delete()
+    assert stats_of(author) == (0, 0)
+
+
+def test_deferred_text_is_read_for_difference(author, note):
+    loaded = Note.objects.defer('text').get(pk=note.pk)
+    loaded.text = 'Короче'
+    loaded.save()
+    assert stats_of(author) == (1, text_size('Короче'))
+    Note.objects.defer('text').get(pk=note.pk).delete()
+    assert stats_of(author) == (0, 0)
+
+
+def test_changing_author_moves_stats(author, not_author, note):
+    note.author = not_author
+    note.save()
+    assert stats_of(author) == (0, 0)
+    assert stats_of(not_author) == (1, text_size(note.text))
+
+
+def test_queryset_delete_updates_stats(author, not_author, note):
+    Note.objects.create(title='Чужая', text='Текст', author=not_author)
+    Note.objects.create(title='Вторая', text='abc', author=author)
+    Note.objects.filter(title__in=('Чужая', 'Вторая')).delete()
+    assert stats_of(author) == (1, text_size(note.text))
+    assert stats_of(not_author) == (0, 0)
+
+
+def test_import_updates_stats(author):
+    lines = [
+        '{"title": "Первая", "text": "Текст"}',
+        '{"title": "Вторая", "text": "abc"}',
+    ]
+    assert import_notes(lines, author, batch_size=1) == 2
+    assert stats_of(author) == (2, text_size('Текст') + 3)
+
+
+def test_missing_row_is_rebuilt_on_write(author, note):
+    AuthorStats.objects.filter(author=author).delete()
+    Note.objects.create(title='Вторая', text='abc', author=author)
+    assert stats_of(author) == (2, text_size(note.text) + 3)
+
+
+def test_failed_save_leaves_stats_unchanged(author, note, monkeypatch):
+    def broken_index(*args, **kwargs):
+        raise RuntimeError('Индекс недоступен')
+
+    monkeypatch.setattr(NoteTerm.objects, 'index_notes', broken_index)
+    with pytest.raises(RuntimeError):
+        Note.objects.create(title='Вторая', text='abc', author=author)
+    assert Note.objects.count() == 1
+    assert stats_of(author) == (1, text_size(note.text))
+
+
+def test_reconcile_command_fixes_drift(author, not_author, many_notes):
+    # bulk_create в фикстуре many_notes счётчики не обновляет.
+    expected = (len(many_notes), sum(
+        text_size(note.text) for note in many_notes
+    ))
+    assert stats_of(author) == (0, 0)
+    out = StringIO()
+    call_command('reconcile_author_stats', batch_size=1, stdout=out)
+    assert 'Проверено авторов: 2, исправлено: 1' in out.getvalue()
+    assert stats_of(author) == expected
+    out = StringIO()
+    call_command('reconcile_author_stats', stdout=out)
+    assert 'исправлено: 0' in out.getvalue()
+
+
+def test_list_shows_note_count(author_client, note):
+    response = author_client.get(reverse('notes:list'))
+    assert response.context['stats'].notes == 1
+    assert 'Всего заметок: 1' in response.content.decode()
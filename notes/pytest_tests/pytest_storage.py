@@ -0,0 +1,137 @@
+# pytest_storage.py
+import io
+import json
+
+import pytest
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from notes import storage
+from notes.models import AuthorStats, Note, NoteBody
+from notes.transfer import export_notes, import_notes
+
+LARGE_TEXT = 'Большая заметка о хранении текста. ' * 200
+
+
+@pytest.fixture
+def large_note(author):
+    return Note.objects.create(
+        title='Большая', text=LARGE_TEXT, slug='large', author=author
+    )
+
+
+def stored_text(note):
+    """Что лежит в столбце text самой строки заметки."""
+    return Note.objects.filter(pk=note.pk).values_list(
+        'text', flat=True
+    ).get()
+
+
+def test_large_text_is_stored_out_of_row(large_note, author,
+                                         django_assert_num_queries):
+    assert stored_text(large_note) == ''
+    body = NoteBody.objects.get(note=large_note)
+    assert body.codec == 'zlib'
+    assert len(body.data) < len(LARGE_TEXT.encode()) / 10
+    assert AuthorStats.objects.get(author=author).text_bytes == len(
+        LARGE_TEXT.encode()
+    )
+    note = Note.objects.get(pk=large_note.pk)
+    assert 'text' not in note.__dict__
+    # Текст распаковывается при первом обращении, одним запросом.
+    with django_assert_num_queries(1):
+        assert note.text == LARGE_TEXT
+        assert note.text == LARGE_TEXT
+
+
+def test_small_text_stays_inline(note):
+    assert stored_text(note) == note.text
+    assert not NoteBody.objects.exists()
+
+
+def test_edit_moves_text_between_row_and_body(large_note):
+    large_note.text = 'Теперь коротко.'
+    large_note.save(update_fields=['text'])
+    assert stored_text(large_note) == 'Теперь коротко.'
+    assert not NoteBody.objects.exists()
+    large_note.text = LARGE_TEXT + 'ещё'
+    large_note.save(update_fields=['text'])
+    large_note.refresh_from_db()
+    assert large_note.text == LARGE_TEXT + 'ещё'
+    assert NoteBody.objects.get().size == len(large_note.text.encode())
+
+
+def test_save_without_loading_text_keeps_body(large_note):
+    note = Note.objects.get(pk=large_note.pk)
+    note.title = 'Только заголовок'
+    note.save(update_fields=['title'])
+    assert stored_text(note) == ''
+    assert NoteBody.objects.get().text == LARGE_TEXT
+
+
+def test_pages_read_body_in_the_same_query(author_client, large_note):
+    # Бюджет запросов страницы заметки и формы правки не растёт.
+    response = author_client.get(reverse('notes:detail', args=('large',)))
+    assert LARGE_TEXT in response.content.decode()
+    response = author_client.get(reverse('notes:edit', args=('large',)))
+    assert response.context['form'].initial['text'] == LARGE_TEXT
+
+
+def test_api_and_export_return_full_text(author_client, large_note, note):
+    url = reverse('notes:api-detail', args=('large',))
+    assert author_client.get(url).json()['text'] == LARGE_TEXT
+    page = author_client.get(
+        reverse('notes:api-list'), {'fields': 'slug,text'}
+    ).json()
+    assert {row['slug']: row['text'] for row in page['results']} == {
+        'large': LARGE_TEXT, note.slug: note.text,
+    }
+    rows = [json.loads(line) for line in export_notes(Note.objects.all())]
+    assert rows[0]['text'] == LARGE_TEXT
+
+
+def test_import_stores_large_texts_out_of_row(author):
+    lines = [
+        json.dumps({'title': 'Большая', 'text': LARGE_TEXT}),
+        json.dumps({'title': 'Маленькая', 'text': 'Коротко'}),
+    ]
+    assert import_notes(lines, author) == 2
+    assert NoteBody.objects.count() == 1
+    assert Note.objects.get(title='Большая').text == LARGE_TEXT
+    assert AuthorStats.objects.rebuild([author.pk]) == 0
+
+
+def test_codecs_round_trip(settings):
+    settings.NOTES_TEXT_CODEC = 'lzma'
+    codec, data = storage.compress(LARGE_TEXT)
+    assert codec == 'lzma'
+    assert storage.decompress(codec, data) == LARGE_TEXT
+    # Текст, который сжатие только увеличивает, хранится как есть.
+    codec, data = storage.compress('Коротко')
+    assert (codec, storage.decompress(codec, data)) == (
+        storage.RAW, 'Коротко'
+    )
+
+
+def test_move_note_text_command(settings, author):
+    settings.NOTES_TEXT_EXTERNAL_BYTES = None
+    notes = [
+        Note.objects.create(
+            title=f'Заметка {index}', text=LARGE_TEXT, author=author
+        )
+        for index in range(3)
+    ]
+    settings.NOTES_TEXT_EXTERNAL_BYTES = 4096
+    output = io.StringIO()
+    call_command('move_note_text', batch_size=2, stdout=output)
+    assert 'Перенесено текстов: 3' in output.getvalue()
+    assert 'Размер базы' in output.getvalue()
+    assert [stored_text(note) for note in notes] == ['', '', '']
+    assert [note.text for note in Note.objects.order_by('id')] == [
+        LARGE_TEXT
+    ] * 3
+    assert AuthorStats.objects.rebuild([author.pk]) == 0
+    call_command('move_note_text', inline=True, stdout=io.StringIO())
+    assert not NoteBody.objects.exists()
+    assert [stored_text(note) for note in notes] == [LARGE_TEXT] * 3
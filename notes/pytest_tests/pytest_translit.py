@@ -0,0 +1,66 @@
+# pytest_translit.py
+import random
+
+import pytest
+
+from pytils.translit import ALPHABET
+from pytils.translit import slugify as pytils_slugify
+
+from notes import translit
+from notes.benchmarks import make_title
+
+# Символы, которые pytils обрабатывает по-особому: разделители,
+# амперсанд, типографские знаки, а также символы, у которых lower()
+# меняет длину или даёт ASCII.
+SPECIAL = " -_\t\n &;.,!?'\"‘’«»“”–—‒−…№#`()[]/\\:@İßKéç̇中🙂"
+
+
+@pytest.fixture(autouse=True)
+def clear_slug_cache():
+    translit.slugify.cache_clear()
+
+
+@pytest.mark.parametrize('title', (
+    '',
+    'Заголовок заметки',
+    'Ёжик в тумане — «Союзмультфильм» №1',
+    'Tom & Jerry &amp; friends',
+    '  --Много   пробелов--  ',
+    'Щука, Ъ и Ь!',
+    'İstanbul KELVIN',
+    '中文标题',
+))
+def test_matches_pytils(title):
+    assert translit.slugify(title) == pytils_slugify(title)
+
+
+def test_matches_pytils_on_random_corpus():
+    rng = random.Random(0)
+    alphabet = ''.join(
+        symbol for symbol in ALPHABET if len(symbol) == 1
+    ) + SPECIAL
+    titles = [make_title(rng) for _ in range(5000)] + [
+        ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        for _ in range(20000)
+    ]
+    mismatches = [
+        title for title in titles
+        if translit.slugify.__wrapped__(title) != pytils_slugify(title)
+    ]
+    assert not mismatches
+
+
+def test_ascii_titles_do_not_build_table(monkeypatch):
+    monkeypatch.setattr(translit, '_table', None)
+    assert translit.slugify('Plain ASCII title') == 'plain-ascii-title'
+    assert translit._table is None
+    assert translit.slugify('Заметка') == 'zametka'
+    assert translit._table is not None
+
+
+def test_repeated_titles_come_from_cache():
+    translit.slugify('Повторный заголовок')
+    translit.slugify('Повторный заголовок')
+    info = translit.slugify.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    assert info.maxsize == translit.SLUG_CACHE_SIZE
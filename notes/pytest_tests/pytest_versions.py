@@ -0,0 +1,159 @@
+# pytest_versions.py
+import json
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pytest_django.asserts import assertRedirects
+
+from notes.forms import CONFLICT_WARNING
+from notes.models import AuthorStats, Note, NoteConflict, NoteTerm
+
+
+def test_save_bumps_version(note):
+    assert note.version == 1
+    note.title = 'Другой заголовок'
+    note.save()
+    note.refresh_from_db()
+    assert note.version == 2
+
+
+def test_stale_instance_is_rejected(note):
+    stale = Note.objects.get(pk=note.pk)
+    note.text = 'Первая правка'
+    note.save()
+    stale.text = 'Вторая правка'
+    with pytest.raises(NoteConflict) as conflict:
+        stale.save()
+    assert conflict.value.current_version == 2
+    # Неудачная попытка ничего не записала и не сдвинула версию.
+    assert stale.version == 1
+    note.refresh_from_db()
+    assert (note.text, note.version) == ('Первая правка', 2)
+
+
+def test_update_writes_only_changed_fields(note):
+    note.title = 'Новое название'
+    with CaptureQueriesContext(connection) as queries:
+        note.save(update_fields=['title'])
+    update = next(
+        query['sql'] for query in queries
+        if query['sql'].startswith('UPDATE "notes_note"')
+    )
+    assert '"title"' in update and '"version"' in update
+    assert '"text"' not in update and '"slug"' not in update
+    assert NoteTerm.objects.filter(note=note, term='новое').exists()
+
+
+def test_slug_change_skips_reindex(note):
+    terms = list(NoteTerm.objects.filter(note=note).values_list('pk'))
+    note.slug = 'other-slug'
+    note.save(update_fields=['slug'])
+    assert list(NoteTerm.objects.filter(note=note).values_list('pk')) == terms
+
+
+def test_stale_form_gets_conflict(author_client, note, form_data):
+    url = reverse('notes:edit', args=(note.slug,))
+    form = author_client.get(url).context['form']
+    assert form['version'].value() == 1
+    Note.objects.get(pk=note.pk).save()
+    response = author_client.post(url, {**form_data, 'version': 1})
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert CONFLICT_WARNING in response.context['form'].non_field_errors()
+    note.refresh_from_db()
+    assert (note.title, note.version) == ('Заголовок', 2)
+    # В форме конфликта - текущая версия: повторная отправка сохраняет.
+    retry = response.context['form']['version'].value()
+    response = author_client.post(url, {**form_data, 'version': retry})
+    assertRedirects(response, reverse('notes:success'))
+    note.refresh_from_db()
+    assert (note.title, note.version) == (form_data['title'], 3)
+
+
+def test_stale_async_form_gets_conflict(author_client, note, form_data):
+    url = reverse('notes:async-edit', args=(note.slug,))
+    Note.objects.get(pk=note.pk).save()
+    response = author_client.post(url, {**form_data, 'version': 1})
+    assert response.status_code == HTTPStatus.CONFLICT
+    note.refresh_from_db()
+    assert note.title == 'Заголовок'
+
+
+def test_api_conflict(author_client, note):
+    url = reverse('notes:api-detail', args=(note.slug,))
+    assert author_client.get(url).json()['version'] == 1
+    Note.objects.get(pk=note.pk).save()
+    response = author_client.patch(
+        url, json.dumps({'title': 'Из API', 'version': 1}),
+        content_type='application/json',
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json()['version'] == 2
+    response = author_client.patch(
+        url, json.dumps({'title': 'Из API', 'version': 2}),
+        content_type='application/json',
+    )
+    assert response.json()['version'] == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_appends_are_not_lost(django_user_model):
+    """Потоки дописывают в одну заметку: ни одна запись не теряется.
+
+    Каждый поток читает заметку, дописывает свою метку и сохраняет,
+    а при конфликте перечитывает и пробует снова. Общая блокировка
+    держится только на время запроса к базе: тестовая база SQLite в
+    памяти не допускает параллельных запросов, а чтение и запись одной
+    правки чередуются с правками других потоков.
+    """
+    author = django_user_model.objects.create(username='Автор')
+    note = Note.objects.create(
+        title='Счётчик', text='', slug='counter', author=author
+    )
+    threads_count, appends = 8, 10
+    database = threading.Lock()
+    start = threading.Barrier(threads_count)
+    conflicts = []
+    errors = []
+
+    def append(number):
+        try:
+            start.wait()
+            for index in range(appends):
+                while True:
+                    with database:
+                        current = Note.objects.get(pk=note.pk)
+                    current.text += f'{number}:{index};'
+                    try:
+                        with database:
+                            current.save(update_fields=['text'])
+                        break
+                    except NoteConflict:
+                        conflicts.append(number)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=append, args=(number,))
+        for number in range(threads_count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    note.refresh_from_db()
+    marks = note.text.split(';')[:-1]
+    assert len(marks) == len(set(marks)) == threads_count * appends
+    assert note.version == 1 + threads_count * appends
+    # Отменённые конфликтом записи не попали и в счётчики автора.
+    stats = AuthorStats.objects.get(author=author)
+    assert stats.text_bytes == len(note.text.encode())
+    # Потоки действительно пересекались.
+    assert conflicts
@@ -0,0 +1,215 @@
+# pytest_writebehind.py
+import logging
+import time
+from http import HTTPStatus
+
+import pytest
+
+from django.db import OperationalError, connections
+from django.urls import reverse
+from pytest_django.asserts import assertRedirects
+
+from notes import writebehind
+from notes.models import AuthorStats, JournalCursor, Note
+
+
+@pytest.fixture
+def write_behind(settings, tmp_path, query_budgets):
+    settings.NOTES_WRITE_BEHIND = True
+    settings.NOTES_WRITE_BEHIND_JOURNAL = tmp_path / 'journal.sqlite3'
+    # Без фонового потока: журнал разбирает сам тест.
+    settings.NOTES_WRITE_BEHIND_INTERVAL = None
+    settings.NOTES_RATE_LIMITS = {}
+    # Страница, которая применяет журнал, делает и его запросы.
+    for view in ('notes:list', 'notes:edit', 'notes:detail'):
+        query_budgets[view] = None
+    yield writebehind.get_journal()
+    writebehind.stop_worker()
+
+
+def test_create_is_queued_and_read_back(write_behind, author_client,
+                                        form_data):
+    response = author_client.post(reverse('notes:add'), data=form_data)
+    assertRedirects(response, reverse('notes:success'))
+    assert not Note.objects.exists()
+    assert len(write_behind) == 1
+    # Свой список автор видит уже с новой заметкой.
+    response = author_client.get(reverse('notes:list'))
+    assert [note.slug for note in response.context['object_list']] == [
+        form_data['slug']
+    ]
+    assert len(write_behind) == 0
+
+
+def test_burst_of_creates(write_behind, author, author_client,
+                          query_budgets):
+    # В запросе остаётся только проверка slug по основной базе.
+    query_budgets['notes:add'] = 1
+    for index in range(50):
+        author_client.post(reverse('notes:add'), data={
+            'title': f'Заметка {index}', 'text': 'Текст', 'slug': '',
+        })
+    assert len(write_behind) == 50
+    assert writebehind.drain(batch_size=20) == 50
+    assert len(write_behind) == 0
+    assert Note.objects.filter(author=author).count() == 50
+    assert AuthorStats.objects.get(author=author).notes == 50
+    assert JournalCursor.objects.get().position == 50
+
+
+def test_edit_and_delete_are_applied_in_order(write_behind, author_client,
+                                              note, form_data):
+    edit_url = reverse('notes:edit', args=(note.slug,))
+    author_client.post(edit_url, data={**form_data, 'slug': note.slug})
+    note.refresh_from_db()
+    assert note.title == 'Заголовок'
+    # Форма правки читает заметку уже с изменением из журнала.
+    response = author_client.get(edit_url)
+    assert response.context['form'].instance.title == form_data['title']
+    author_client.post(reverse('notes:delete', args=(note.slug,)))
+    response = author_client.get(reverse('notes:detail', args=(note.slug,)))
+    assert response.status_code == 404
+    assert not Note.objects.exists()
+
+
+def test_stale_edit_is_skipped(write_behind, note, caplog):
+    stale = Note.objects.get(pk=note.pk)
+    stale.title = 'Из журнала'
+    writebehind.edit(stale, ['title'])
+    note.title = 'Сразу в базу'
+    note.save()
+    with caplog.at_level(logging.WARNING, logger='notes.writebehind'):
+        assert writebehind.drain() == 1
+    note.refresh_from_db()
+    assert note.title == 'Сразу в базу'
+    assert 'пропущена' in caplog.text
+
+
+def test_stale_edit_conflicts_before_queueing(write_behind, author_client,
+                                              note, form_data):
+    version = note.version
+    note.save()
+    response = author_client.post(
+        reverse('notes:edit', args=(note.slug,)),
+        data={**form_data, 'slug': note.slug, 'version': version},
+    )
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert len(write_behind) == 0
+
+
+def test_author_sees_skipped_operation(write_behind, author_client, note):
+    stale = Note.objects.get(pk=note.pk)
+    stale.title = 'Из журнала'
+    writebehind.edit(stale, ['title'])
+    note.save()
+    response = author_client.get(reverse('notes:list'))
+    assert [str(message) for message in response.context['messages']] == [
+        'Заметка «Из журнала» не изменена: её уже изменили в другом окне.'
+    ]
+    # Сообщение показывается один раз, а страница с ним не кэшируется.
+    response = author_client.get(reverse('notes:list'))
+    assert 'Из журнала' not in response.content.decode()
+
+
+def test_pending_slug_is_taken(write_behind, author_client, form_data):
+    author_client.post(reverse('notes:add'), data=form_data)
+    response = author_client.post(reverse('notes:add'), data={
+        **form_data, 'title': 'Другая',
+    })
+    assert 'slug' in response.context['form'].errors
+
+
+def test_batch_is_applied_once_after_crash(write_behind, author,
+                                           monkeypatch):
+    for index in range(3):
+        writebehind.add(
+            Note(title=f'Заметка {index}', text='Текст', slug=''), author
+        )
+
+    def crash(position):
+        raise RuntimeError('Процесс упал')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(write_behind, 'discard', crash)
+        with pytest.raises(RuntimeError):
+            writebehind.drain()
+    # Пачка зафиксирована, но осталась в журнале.
+    assert len(write_behind) == 3
+    assert writebehind.drain() == 0
+    assert len(write_behind) == 0
+    assert Note.objects.filter(author=author).count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_drains_journal(write_behind, settings, django_user_model):
+    settings.NOTES_WRITE_BEHIND_INTERVAL = 0.01
+    author = django_user_model.objects.create(username='Автор')
+    writebehind.add(Note(title='Фоном', text='Текст', slug=''), author)
+    deadline = time.monotonic() + 5
+    while len(write_behind) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(write_behind) == 0
+    writebehind.stop_worker()
+    assert Note.objects.get().title == 'Фоном'
+    connections.close_all()
+
+
+def test_failed_operations_are_skipped(write_behind, author, note, caplog):
+    writebehind.add(Note(title='Первая', text='Текст', slug=''), author)
+    # Добавление с чужим полем не вставится, но и пачку не уронит.
+    write_behind.append(author.pk, writebehind.ADD, {'title': 'Битая',
+                                                     'color': 'red'})
+    writebehind.delete(note)
+    writebehind.delete(note)
+    writebehind.add(Note(title='Вторая', text='Текст', slug=''), author)
+    with caplog.at_level(logging.WARNING, logger='notes.writebehind'):
+        assert writebehind.drain() == 5
+    assert caplog.text.count('пропущена') == 2
+    assert writebehind.flush(author.pk) == [
+        'Заметка «Битая» не добавлена: некорректные данные.',
+        'Заметка не удалена: её уже удалили.',
+    ]
+    assert set(Note.objects.values_list('title', flat=True)) == {
+        'Первая', 'Вторая'
+    }
+    assert JournalCursor.objects.get().position == 5
+    assert len(write_behind) == 0
+
+
+def test_flush_error_does_not_fail_page(write_behind, author_client, note,
+                                        monkeypatch, caplog):
+    writebehind.delete(note)
+
+    def broken_drain():
+        raise OperationalError('database is locked')
+
+    monkeypatch.setattr(writebehind, 'drain', broken_drain)
+    response = author_client.get(reverse('notes:list'))
+    assert response.status_code == 200
+    assert 'Ошибка при разборе журнала' in caplog.text
+
+
+@pytest.mark.parametrize('name', ('notes:async-add', 'notes:async-edit',
+                                  'notes:async-delete'))
+def test_async_writes_are_queued(write_behind, author_client, note,
+                                 form_data, name):
+    args = () if name == 'notes:async-add' else (note.slug,)
+    data = {**form_data, 'slug': note.slug} if name.endswith('edit') else (
+        form_data
+    )
+    response = author_client.post(reverse(name, args=args), data=data)
+    assertRedirects(response, reverse('notes:success'))
+    assert len(write_behind) == 1
+    assert Note.objects.get() == note
+
+
+def test_flush_stops_at_authors_last_operation(write_behind, author,
+                                               not_author):
+    writebehind.add(Note(title='Раньше', text='Текст', slug=''), not_author)
+    writebehind.add(Note(title='Своя', text='Текст', slug=''), author)
+    writebehind.add(Note(title='Позже', text='Текст', slug=''), not_author)
+    writebehind.flush(author.pk)
+    assert set(Note.objects.values_list('title', flat=True)) == {
+        'Раньше', 'Своя'
+    }
+    assert len(write_behind) == 1
@@ -0,0 +1,103 @@
+"""Ограничение частоты изменений заметок: корзина жетонов в кэше.
+
+Лимит маршрута задаётся в settings.NOTES_RATE_LIMITS строкой
+'запросов/период', например '30/m': в корзине 30 жетонов, и за минуту
+она равномерно наполняется заново. Корзина своя у каждой пары
+(маршрут, пользователь).
+
+Состояние корзины - одно целое число в кэше: теоретическое время
+прибытия следующего запроса (TAT алгоритма GCRA) в интервалах между
+жетонами. Каждый запрос увеличивает его через cache.incr(), и решение
+принимается по ответу. Запрос проходит, пока TAT не обогнал текущее
+время больше чем на ёмкость корзины; отклонённый запрос возвращает
+жетон через cache.decr(), так что повтор через Retry-After проходит,
+сколько бы раз клиент ни стучался до этого.
+
+Обращений к кэшу на запрос:
+
+* одно (incr) - пропущенный запрос, пока корзина не простаивала;
+* два (incr и decr) - отклонённый запрос;
+* два (incr и add) - первый запрос, когда ключа ещё нет или он истёк;
+* два (incr и set) - первый запрос после простоя, когда TAT отстал от
+  текущего времени: он сдвигается к нему (max(TAT, сейчас)), и простой
+  наполняет корзину не больше чем до ёмкости.
+
+Свести последние два случая к одному обращению нельзя: у API кэшей
+Django нет операции "увеличить или записать"; но такой запрос бывает
+не чаще раза за простой корзины. Ключ истекает через период после
+записи, и корзина начинается полной; поэтому на стыке двух ключей
+можно получить до одной лишней корзины запросов.
+
+Кэш NOTES_RATE_LIMIT_CACHE_ALIAS должен быть общим для всех процессов
+(проверка notes.W001): с LocMemCache у каждого воркера своя корзина, и
+лимит умножается на число воркеров. Атомарность incr() обеспечивают
+memcached и Redis (и locmem внутри процесса); у кэша в базе данных и
+файлового кэша incr() не атомарен, и под параллельными запросами лимит
+приблизительный.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+RATE_LIMIT_PREFIX = 'notes:rate'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 60 * 60 * 24}
+
+
+def get_cache():
+    return caches[settings.NOTES_RATE_LIMIT_CACHE_ALIAS]
+
+
+def parse_rate(rate):
+    """'30/m' -> (30, 60): ёмкость корзины и период в секундах."""
+    count, _, period = rate.partition('/')
+    try:
+        capacity, seconds = int(count), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ValueError(f'Некорректный лимит: {rate!r}')
+    if capacity <= 0:
+        raise ValueError(f'Некорректный лимит: {rate!r}')
+    return capacity, seconds
+
+
+def get_limit(view):
+    """(ёмкость, период) маршрута или None, если лимита нет."""
+    rate = settings.NOTES_RATE_LIMITS.get(view)
+    return None if rate is None else parse_rate(rate)
+
+
+def bucket_key(view, user_id):
+    return f'{RATE_LIMIT_PREFIX}:{view}:{user_id}'
+
+
+def take(key, capacity, period, now=None):
+    """Берёт жетон из корзины key.
+
+    Возвращает 0, если запрос можно выполнять, иначе - через сколько
+    секунд появится следующий жетон.
+    """
+    if now is None:
+        now = time.time()
+    interval = period / capacity
+    ticks = now / interval
+    cache = get_cache()
+    start = int(ticks) + 1
+    try:
+        arrival = cache.incr(key)
+    except ValueError:
+        # Первый запрос после простоя: полная корзина.
+        arrival = start
+        if not cache.add(key, arrival, timeout=period):
+            arrival = cache.incr(key)
+    else:
+        if arrival < start:
+            # TAT отстал: жетоны за простой сверх ёмкости не копятся.
+            arrival = start
+            cache.set(key, arrival, timeout=period)
+    excess = arrival - ticks - capacity
+    if excess <= 0:
+        return 0
+    # Отклонённый запрос жетон не расходует.
+    cache.decr(key)
+    return max(1, min(math.ceil(excess * interval), period))
@@ -0,0 +1,59 @@
+"""История изменений заметки: разницы между версиями текста.
+
+Каждое сохранение заголовка или текста через Note.save() добавляет
+NoteRevision. Ревизия хранит заголовок целиком, а текст - как разницу с
+предыдущей ревизией; каждая settings.NOTES_REVISION_SNAPSHOT_EVERY-я
+ревизия (и первая) хранит текст целиком. Текст любой ревизии собирается
+из ближайшего снимка и не больше NOTES_REVISION_SNAPSHOT_EVERY - 1
+разниц после него.
+
+Разница - список JSON: пара [начало, конец] копирует слова старого
+текста из этого диапазона, строка вставляется как есть. Слова
+считаются вместе с пробелами после них, так что правка одного слова в
+длинном абзаце без переводов строк тоже даёт короткую разницу.
+Ревизии сжимаются так же, как вынесенные тексты (notes.storage).
+
+Изменения в обход Note.save() (QuerySet.update(), bulk_create при
+импорте) ревизий не создают: история заметки начинается с первого
+сохранения, и первая ревизия после импорта - снимок.
+"""
+import json
+import re
+from difflib import SequenceMatcher
+
+TOKEN = re.compile(r'\s+|\S+\s*')
+
+
+def tokenize(text):
+    return TOKEN.findall(text)
+
+
+def make_delta(old, new):
+    """Разница, которая превращает текст old в new."""
+    old_tokens, new_tokens = tokenize(old), tokenize(new)
+    delta = []
+    matcher = SequenceMatcher(None, old_tokens, new_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j1 < j2:
+            delta.append(''.join(new_tokens[j1:j2]))
+    return json.dumps(delta, ensure_ascii=False, separators=(',', ':'))
+
+
+def apply_deltas(text, *deltas):
+    """Текст после применения разниц по порядку.
+
+    Разницы применяются к спискам слов: текст делится на слова один
+    раз, а вставки - только свои, как при построении разницы.
+    """
+    tokens = tokenize(text)
+    for delta in deltas:
+        result = []
+        for part in json.loads(delta):
+            if isinstance(part, str):
+                result.extend(tokenize(part))
+            else:
+                result.extend(tokens[part[0]:part[1]])
+        tokens = result
+    return ''.join(tokens)
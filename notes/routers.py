@@ -0,0 +1,89 @@
+"""Маршрутизация запросов к заметкам между основной базой и репликой.
+
+Запись идёт в settings.NOTES_WRITE_DATABASE, чтение - в
+settings.NOTES_READ_DATABASE. Реплика может отставать, поэтому запрос,
+который что-то записал, до конца обработки читает из основной базы, а
+PrimaryPinMiddleware продлевает это ещё на несколько секунд через
+cookie: страница после редиректа показывает только что сделанное
+изменение.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+APP_LABEL = 'notes'
+
+
+class PinState:
+    """Состояние текущего запроса: читать ли из основной базы."""
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Изменяемый объект, а не флаг: sync_to_async копирует контекст, и
+# отметка о записи из другого потока иначе бы потерялась.
+_state = ContextVar('notes_pin_state', default=None)
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """Границы одного запроса; pinned - окно после записи ещё открыто."""
+    token = _state.set(PinState(pinned))
+    try:
+        yield _state.get()
+    finally:
+        _state.reset(token)
+
+
+def pin_primary():
+    """Дальше в этом запросе читать из основной базы."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = state.wrote = True
+
+
+def is_pinned():
+    state = _state.get()
+    return state is not None and state.pinned
+
+
+def primary_database():
+    return settings.NOTES_WRITE_DATABASE
+
+
+def read_database():
+    """База для чтения заметок с учётом окна после записи."""
+    if is_pinned():
+        return settings.NOTES_WRITE_DATABASE
+    return settings.NOTES_READ_DATABASE
+
+
+class NotesRouter:
+    """Роутер моделей приложения notes; остальные модели не трогает."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаются из той же базы, что и объект.
+            return instance._state.db
+        return read_database()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != APP_LABEL:
+            return None
+        pin_primary()
+        return settings.NOTES_WRITE_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {
+            settings.NOTES_WRITE_DATABASE, settings.NOTES_READ_DATABASE
+        }
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,51 @@
+"""Разбор текста заметок для поискового индекса.
+
+Индекс - таблица NoteTerm: для каждого слова заметки хранится его вес
+(число вхождений, слова заголовка весят больше). Поиск читает только
+строки индекса с искомыми словами автора, поэтому его стоимость
+зависит от числа совпадений, а не от числа заметок.
+"""
+import re
+from collections import Counter
+
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+MIN_TERM_LENGTH = 2
+TITLE_WEIGHT = 3
+# Больше слов в запросе - медленнее выборка, а смысла мало.
+MAX_QUERY_TERMS = 8
+CURSOR_SEPARATOR = ':'
+
+
+def tokenize(text):
+    """Слова текста в нижнем регистре, без слишком коротких."""
+    return [
+        word[:MAX_TERM_LENGTH]
+        for word in WORD_RE.findall(text.lower())
+        if len(word) >= MIN_TERM_LENGTH
+    ]
+
+
+def note_terms(title, text):
+    """Словарь {слово: вес} для заметки."""
+    weights = Counter(tokenize(text))
+    for word in tokenize(title):
+        weights[word] += TITLE_WEIGHT
+    return weights
+
+
+def query_terms(query):
+    """Уникальные слова поискового запроса в исходном порядке."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+def parse_cursor(value):
+    """Курсор страницы результатов: пара (score, note_id) или None."""
+    if not value:
+        return None
+    score, note_id = value.split(CURSOR_SEPARATOR)
+    return int(score), int(note_id)
+
+
+def format_cursor(score, note_id):
+    return f'{score}{CURSOR_SEPARATOR}{note_id}'
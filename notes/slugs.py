@@ -0,0 +1,118 @@
+"""Выдача уникальных slug заметкам.
+
+Для каждой основы base запрос по диапазону индекса slug узнаёт,
+занят ли сам base, и наибольший номер среди адресов вида base-N; новый
+адрес получает следующий номер. Если между чтением и вставкой адрес
+успел занять параллельный запрос, сохранение повторяется с новым slug
+ограниченное число раз.
+"""
+import re
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
+
+from .translit import slugify
+
+# Сколько символов оставить под суффикс вида -99999.
+SUFFIX_RESERVE = 6
+SAVE_ATTEMPTS = 3
+# Основа для заголовков, из которых slugify ничего не оставляет.
+FALLBACK_BASE = 'note'
+# Условие запроса растёт с числом основ, а SQLite ограничивает
+# глубину выражения 1000 уровнями.
+BASES_PER_QUERY = 250
+
+
+def make_base(title, max_length):
+    return slugify(title)[:max_length] or FALLBACK_BASE
+
+
+def _stem(base, max_length):
+    """Основа, к которой ещё можно дописать суффикс."""
+    return base[:max_length - SUFFIX_RESERVE]
+
+
+def _read_taken(queryset, stems):
+    """{основа: (занята ли, наибольший номер)} одним запросом."""
+    condition = Q()
+    aggregates = {}
+    for index, (base, stem) in enumerate(stems):
+        numbered = Q(slug__gt=f'{stem}-', slug__lt=f'{stem}.')
+        condition |= Q(slug=base) | numbered
+        aggregates[f'taken{index}'] = Count('pk', filter=Q(slug=base))
+        aggregates[f'number{index}'] = Max(
+            Cast(Substr('slug', len(stem) + 2), IntegerField()),
+            filter=numbered & Q(
+                slug__regex=rf'^{re.escape(stem)}-[0-9]{{1,9}}$'
+            ),
+        )
+    found = queryset.filter(condition).aggregate(**aggregates)
+    return {
+        base: (found[f'taken{index}'] > 0, found[f'number{index}'] or 1)
+        for index, (base, _) in enumerate(stems)
+    }
+
+
+def allocate_slugs(queryset, bases, max_length):
+    """Уникальные slug для списка основ.
+
+    Запрос возвращает по каждой основе одну строку агрегатов, а не
+    все занятые адреса с тем же началом; на каждые BASES_PER_QUERY
+    разных основ - один запрос. Повторяющиеся основы внутри списка
+    тоже получают разные суффиксы.
+    """
+    if not bases:
+        return []
+    stems = {base: _stem(base, max_length) for base in bases}
+    items = list(stems.items())
+    taken = {}
+    for start in range(0, len(items), BASES_PER_QUERY):
+        taken.update(
+            _read_taken(queryset, items[start:start + BASES_PER_QUERY])
+        )
+    issued = set()
+    slugs = []
+    for base in bases:
+        slug = base
+        base_taken, number = taken[base]
+        if base_taken or slug in issued:
+            number += 1
+            while f'{stems[base]}-{number}' in issued:
+                number += 1
+            slug = f'{stems[base]}-{number}'
+        taken[base] = (True, number)
+        issued.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
+def allocate_slug(queryset, base, max_length):
+    return allocate_slugs(queryset, [base], max_length)[0]
+
+
+def save_with_unique_slug(instance, save, attempts=SAVE_ATTEMPTS):
+    """Выдаёт заметке slug по заголовку и сохраняет её вызовом save().
+
+    IntegrityError от параллельной вставки того же slug приводит к
+    повторной попытке; после attempts попыток ошибка пробрасывается.
+    """
+    max_length = instance._meta.get_field('slug').max_length
+    base = make_base(instance.title, max_length)
+    # Занятые адреса читаются из базы, в которую пойдёт запись.
+    model = type(instance)
+    queryset = model._default_manager.using(
+        router.db_for_write(model, instance=instance)
+    )
+    if instance.pk is not None:
+        queryset = queryset.exclude(pk=instance.pk)
+    for attempt in range(1, attempts + 1):
+        instance.slug = allocate_slug(queryset, base, max_length)
+        try:
+            with transaction.atomic(using=queryset.db):
+                save()
+            return
+        except IntegrityError:
+            instance.slug = ''
+            if attempt == attempts:
+                raise
@@ -0,0 +1,89 @@
+"""Замер холодного старта процесса.
+
+Модуль запускается отдельным интерпретатором с -X importtime (см.
+команду profile_startup): в уже запущенном процессе модули импортированы
+и замерять нечего. Приложения создаются и загружаются здесь же по
+фазам Apps.populate(), чтобы время импорта модуля приложения, его
+models и ready() было видно по отдельности; затем импортируется модуль
+приложения (yanote.wsgi), которому остаются middleware и прогрев.
+
+Результат печатается в stdout одной строкой JSON.
+"""
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+IMPORTTIME_PREFIX = 'import time:'
+
+
+def parse_importtime(output):
+    """[(модуль, собственное время, накопленное время)] в мкс.
+
+    Строки вида "import time: self [us] | cumulative | module" пишет
+    интерпретатор с -X importtime в stderr.
+    """
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        own, cumulative, module = line[len(IMPORTTIME_PREFIX):].split('|')
+        if not own.strip().isdigit():
+            continue  # Заголовок таблицы.
+        entries.append((module.strip(), int(own), int(cumulative)))
+    return entries
+
+
+def group_by_package(entries):
+    """Собственное время импорта по пакетам верхнего уровня, мкс."""
+    packages = defaultdict(int)
+    for module, own, _ in entries:
+        packages[module.split('.')[0]] += own
+    return dict(packages)
+
+
+def timed(times, key, func):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            times[key] = time.perf_counter() - started
+    return wrapper
+
+
+def profile(application_module):
+    """Времена старта в секундах по фазам и приложениям."""
+    started = time.perf_counter()
+    from django.apps import AppConfig, apps
+    from django.conf import settings
+    settings.INSTALLED_APPS  # Импорт модуля настроек.
+    settings_time = time.perf_counter() - started
+    app_times = {}
+    configs = []
+    for entry in settings.INSTALLED_APPS:
+        times = {}
+        config = timed(times, 'import', AppConfig.create)(entry)
+        config.import_models = timed(times, 'models', config.import_models)
+        config.ready = timed(times, 'ready', config.ready)
+        app_times[config.label] = times
+        configs.append(config)
+    populate_started = time.perf_counter()
+    apps.populate(configs)
+    populate_time = time.perf_counter() - populate_started
+    application_started = time.perf_counter()
+    __import__(application_module)
+    application_time = time.perf_counter() - application_started
+    return {
+        'settings': settings_time,
+        'populate': populate_time,
+        'application': application_time,
+        'total': time.perf_counter() - started,
+        'apps': app_times,
+    }
+
+
+if __name__ == '__main__':
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
+    print(json.dumps(profile(sys.argv[1])))
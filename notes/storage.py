@@ -0,0 +1,73 @@
+"""Хранение больших текстов заметок вне строки таблицы.
+
+SQLite хранит строку целиком: большой текст уходит в цепочку страниц
+переполнения, а slug, автор и даты лежат в строке после него. Поэтому
+список заметок, которому нужны только id, slug и заголовок, с большими
+текстами читает и их страницы. Тексты от
+settings.NOTES_TEXT_EXTERNAL_BYTES байт сжимаются (NOTES_TEXT_CODEC) и
+хранятся в отдельной таблице NoteBody, а в строке заметки остаются
+пустая строка и флаг text_external.
+
+Поле текста заметки - ExternalTextField: при сохранении оно пишет в
+столбец пустую строку, если текст вынесен, а при чтении заметки такой
+текст считается отложенным полем и распаковывается при первом
+обращении к note.text - на странице заметки и в форме правки.
+"""
+import lzma
+import zlib
+
+from django.conf import settings
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+RAW = 'raw'
+CODECS = {
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+    RAW: (bytes, bytes),
+}
+
+
+def is_large(text):
+    """Выносить ли текст из строки заметки."""
+    limit = settings.NOTES_TEXT_EXTERNAL_BYTES
+    return limit is not None and len(text.encode()) >= limit
+
+
+def compress(text):
+    """(кодек, данные) для текста; несжимаемый текст хранится как есть."""
+    raw = text.encode()
+    codec = settings.NOTES_TEXT_CODEC
+    data = CODECS[codec][0](raw)
+    if len(data) >= len(raw):
+        return RAW, raw
+    return codec, data
+
+
+def decompress(codec, data):
+    return CODECS[codec][1](bytes(data)).decode()
+
+
+class ExternalTextDescriptor(DeferredAttribute):
+    """Вынесенный текст загружается из NoteBody при первом обращении."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        data = instance.__dict__
+        if self.field.attname not in data and instance.text_external:
+            data[self.field.attname] = instance.load_external_text()
+        return super().__get__(instance, cls)
+
+
+class ExternalTextField(models.TextField):
+    """Текст заметки, который может храниться вне её строки.
+
+    Модели нужны поле text_external и метод load_external_text().
+    """
+    descriptor_class = ExternalTextDescriptor
+
+    def pre_save(self, model_instance, add):
+        if model_instance.text_external:
+            return ''
+        return super().pre_save(model_instance, add)
@@ -63,5 +63,5 @@ class TestNotesList(BaseTestNotesCase):
     def test_c_notes_count_for_author(self):
         """Проверка количества заметок на странице автора."""
         response = self.author_client.get(self.URL_NOTES_LIST)
-        notes_count = response.context['object_list'].count()
+        notes_count = len(response.context['object_list'])
         self.assertEqual(notes_count, self.AUTHOR_NOTES_COUNT)
@@ -1,12 +1,16 @@
-from django.test import Client, TestCase  # type: ignore
+from django.test import Client, TestCase, override_settings  # type: ignore
 from django.urls import reverse  # type: ignore
 from django.contrib.auth import get_user_model  # type: ignore
+from django.core.cache import caches  # type: ignore
 
 from notes.models import Note
 
 User = get_user_model()
 
 
+# Тест идёт внутри транзакции соединения default, и соединение
+# для чтения не увидело бы созданных в тесте данных.
+@override_settings(NOTES_READ_DATABASE='default')
 class BaseTestNotesCase(TestCase):
     """Подготовка для тестов."""
 
@@ -52,3 +56,8 @@ class BaseTestNotesCase(TestCase):
         cls.URL_NOTES_DETAIL = reverse(
             cls.PATH_DETAIL, args=(cls.note.slug,)
         )
+
+    def setUp(self):
+        """Каждый тест начинается с пустым кэшем страниц."""
+        for cache in caches.all():
+            cache.clear()
@@ -0,0 +1,162 @@
+"""Массовый импорт и экспорт заметок в формате JSON Lines.
+
+Каждая строка - объект с полями title, text и необязательным slug.
+Импорт читает строки потоком и сохраняет их пачками через
+bulk_create: на пачку приходится один запрос за занятыми slug и одна
+вставка, так что память и число запросов не растут с размером файла.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+
+from . import cache as page_cache
+from . import routers, storage
+from .models import (
+    AuthorStats, Note, NoteBody, NoteHtml, NoteRevision, NoteTerm, text_size
+)
+from .slugs import SAVE_ATTEMPTS, allocate_slugs, make_base
+
+EXPORT_FIELDS = ('title', 'text', 'slug')
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
+
+
+def export_notes(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки JSONL с заметками выборки, без загрузки её целиком."""
+    rows = queryset.order_by('id').text_values(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield json.dumps(
+            dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False
+        ) + '\n'
+
+
+def parse_note(line, number, author):
+    """Заметка из строки JSONL (str или bytes в UTF-8).
+
+    Ошибки сообщают номер строки.
+    """
+    try:
+        data = json.loads(line)
+    except ValueError:
+        raise ValidationError(f'Строка {number}: некорректный JSON.')
+    if not isinstance(data, dict):
+        raise ValidationError(f'Строка {number}: ожидается объект.')
+    note = Note(
+        title=data.get('title', ''),
+        text=data.get('text', ''),
+        slug=data.get('slug') or '',
+        author=author,
+    )
+    try:
+        note.full_clean(exclude=('author',), validate_unique=False)
+    except ValidationError as error:
+        raise ValidationError(f'Строка {number}: {error.messages[0]}')
+    return note
+
+
+def index_batch(notes):
+    """Добавляет вставленную пачку в поисковый индекс.
+
+    Не все бэкенды возвращают первичные ключи из bulk_create; тогда они
+    читаются одним запросом по уникальным slug.
+    """
+    if notes[0].pk is None:
+        ids = dict(Note.objects.using(routers.primary_database()).filter(
+            slug__in=[note.slug for note in notes]
+        ).values_list('slug', 'id'))
+        for note in notes:
+            note.pk = ids[note.slug]
+    NoteTerm.objects.index_notes(notes, replace=False)
+
+
+def add_stats(notes):
+    """Прибавляет вставленную пачку к счётчикам авторов."""
+    totals = {}
+    for note in notes:
+        count, size = totals.get(note.author_id, (0, 0))
+        totals[note.author_id] = (count + 1, size + text_size(note.text))
+    stats = AuthorStats.objects.using(routers.primary_database())
+    for author_id, (count, size) in totals.items():
+        stats.add(author_id, count, size)
+
+
+def save_batch(notes):
+    """Выдаёт пачке свободные slug одним запросом и вставляет её."""
+    max_length = Note._meta.get_field('slug').max_length
+    bases = [note.slug or make_base(note.title, max_length) for note in notes]
+    for attempt in range(1, SAVE_ATTEMPTS + 1):
+        slugs = allocate_slugs(
+            Note.objects.using(routers.primary_database()), bases, max_length
+        )
+        for note, slug in zip(notes, slugs):
+            note.slug = slug
+            note.text_external = storage.is_large(note.text)
+            # Как и Note.save(), новая заметка получает первую ревизию.
+            note.revision = 1
+        try:
+            with transaction.atomic(using=routers.primary_database()):
+                Note.objects.bulk_create(notes)
+                index_batch(notes)
+                NoteBody.objects.store_batch(notes)
+                NoteHtml.objects.store_batch(notes)
+                NoteRevision.objects.record_batch(notes)
+                add_stats(notes)
+            return
+        except IntegrityError:
+            if attempt == SAVE_ATTEMPTS:
+                raise
+
+
+def save_lines(batch, renamed):
+    """Сохраняет пачку пар (номер строки, заметка) и возвращает её размер.
+
+    Если slug из файла оказался занят, заметка получает его с суффиксом,
+    а в список renamed (если он передан) попадает сообщение об этом.
+    """
+    requested = [note.slug for _, note in batch]
+    save_batch([note for _, note in batch])
+    if renamed is not None:
+        for (number, note), slug in zip(batch, requested):
+            if slug and note.slug != slug:
+                renamed.append(
+                    f'Строка {number}: адрес «{slug}» уже занят, заметка '
+                    f'сохранена с адресом «{note.slug}».'
+                )
+    return len(batch)
+
+
+def import_notes(lines, author, batch_size=IMPORT_BATCH_SIZE,
+                 renamed=None):
+    """Импортирует заметки из строк JSONL и возвращает их количество.
+
+    Занятые slug получают суффикс, как и адреса по заголовку; о каждом
+    таком slug из файла сообщает строка в списке renamed. Каждая пачка
+    сохраняется в своей транзакции: при ошибке в строке заметки из
+    предыдущих пачек остаются сохранёнными. Если slug пачки
+    так и не удалось выдать за SAVE_ATTEMPTS попыток, ValidationError
+    сообщает, сколько заметок уже импортировано.
+    """
+    imported = 0
+    batch = []
+    try:
+        for number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            batch.append((number, parse_note(line, number, author)))
+            if len(batch) >= batch_size:
+                imported += save_lines(batch, renamed)
+                batch = []
+        if batch:
+            imported += save_lines(batch, renamed)
+    except IntegrityError:
+        raise ValidationError(
+            f'Не удалось выдать свободные адреса заметкам: параллельно '
+            f'создаются заметки с теми же slug. Импортировано заметок: '
+            f'{imported}, повторите импорт остальных.'
+        )
+    finally:
+        if imported:
+            # bulk_create не вызывает Note.save(), сбрасываем кэш сами.
+            page_cache.invalidate_note(author.pk)
+    return imported
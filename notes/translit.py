@@ -0,0 +1,68 @@
+"""Slug по заголовку заметки с тем же результатом, что у pytils.
+
+pytils.translit.slugify() проверяет каждый символ по списку алфавита и
+затем делает по вызову str.replace() на каждую из сотни пар таблицы
+транслитерации. Здесь фильтр алфавита, транслитерация и удаление
+знаков препинания сведены в одну таблицу для str.translate(), которая
+строится из pytils.translit.TRANSTABLE при первом заголовке не из
+ASCII. Заголовкам из ASCII pytils не нужен вовсе: их символы
+отфильтровывает одно регулярное выражение. Последние SLUG_CACHE_SIZE
+результатов хранятся в LRU-кэше: импорт и повторное сохранение часто
+дают одни и те же заголовки.
+"""
+import re
+from functools import lru_cache
+
+SLUG_CACHE_SIZE = 4096
+
+AMPERSAND = re.compile(r'&amp;|&')
+SEPARATORS = re.compile(r'[-\s]+')
+# Символы ASCII, которые переживают slugify() pytils.
+ASCII_REJECTED = re.compile(r'[^a-z0-9-]+')
+PUNCTUATION = re.compile(r'[^\w\s-]')
+
+# Символы, которые чаще всего встречаются в заголовках: ASCII,
+# кириллица и знаки пунктуации. Остальные не запоминаются в таблице,
+# чтобы она не росла от произвольных символов.
+COMMON_CODES = (range(0x80), range(0x400, 0x500), range(0x2000, 0x2070))
+
+
+class _TranslitTable(dict):
+    """Таблица для str.translate(): символ вне алфавита удаляется."""
+
+    def __missing__(self, key):
+        return None
+
+
+_table = None
+
+
+def get_table():
+    global _table
+    if _table is None:
+        from pytils import translit
+        table = _TranslitTable(
+            (code, None) for codes in COMMON_CODES for code in codes
+        )
+        for symbol in translit.ALPHABET:
+            if len(symbol) == 1:
+                # Как в pytils: транслитерация, затем удаление знаков.
+                table[ord(symbol)] = PUNCTUATION.sub(
+                    '', translit.translify(symbol)
+                ).lower() or None
+        _table = table
+    return _table
+
+
+def _separate(title):
+    """Первые шаги pytils: нижний регистр, '&' и разделители."""
+    return SEPARATORS.sub('-', AMPERSAND.sub(' and ', title.lower()))
+
+
+@lru_cache(maxsize=SLUG_CACHE_SIZE)
+def slugify(title):
+    """Slug по заголовку, такой же, как у pytils."""
+    text = _separate(title)
+    if text.isascii():
+        return ASCII_REJECTED.sub('', text)
+    return text.translate(get_table())
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from notes import views
+from notes import api, async_views, views
 
 app_name = 'notes'
 
@@ -11,5 +11,29 @@ urlpatterns = [
     path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
     path('notes/', views.NotesList.as_view(), name='list'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path('import/', views.NoteImport.as_view(), name='import'),
+    path('export/', views.NoteExport.as_view(), name='export'),
+    path('api/notes/', api.ApiNotesList.as_view(), name='api-list'),
+    path('api/notes/<slug:slug>/', api.ApiNoteDetail.as_view(),
+         name='api-detail'),
+    path('api/notes/<slug:slug>/revisions/', api.ApiRevisionsList.as_view(),
+         name='api-revisions'),
+    path('api/notes/<slug:slug>/revisions/<int:number>/',
+         api.ApiRevisionDetail.as_view(), name='api-revision'),
+    path('api/notes/<slug:slug>/revisions/<int:number>/restore/',
+         api.ApiRevisionRestore.as_view(), name='api-revision-restore'),
+    path('async/add/', async_views.AsyncNoteCreate.as_view(),
+         name='async-add'),
+    path('async/edit/<slug:slug>/', async_views.AsyncNoteUpdate.as_view(),
+         name='async-edit'),
+    path('async/note/<slug:slug>/', async_views.AsyncNoteDetail.as_view(),
+         name='async-detail'),
+    path('async/delete/<slug:slug>/', async_views.AsyncNoteDelete.as_view(),
+         name='async-delete'),
+    path('async/notes/', async_views.AsyncNotesList.as_view(),
+         name='async-list'),
     path('done/', views.NoteSuccess.as_view(), name='success'),
+    path('metrics/', views.view_metrics, name='metrics'),
+    path('metrics/cache/', views.cache_stats, name='cache-stats'),
 ]
@@ -1,9 +1,33 @@
+import functools
+import hashlib
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.http import (
+    Http404, HttpResponse, HttpResponseForbidden, HttpResponseRedirect,
+    StreamingHttpResponse
+)
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.views import generic
 
-from .forms import NoteForm
-from .models import Note
+from . import cache as page_cache
+from . import metrics, routers, search, writebehind
+from .forms import NoteForm, NoteImportForm
+from .models import AuthorStats, Note, NoteConflict, NoteTerm
+from .pagination import (
+    CURSOR_PARAM, iterate_keyset, paginate_keyset, parse_cursor
+)
+from .transfer import export_notes, import_notes
+
+# Метка в шаблоне списка, на месте которой выводятся порции заметок.
+STREAM_PLACEHOLDER = '<!-- notes:stream -->'
 
 
 class Home(generic.TemplateView):
@@ -20,40 +44,371 @@ class NoteBase(LoginRequiredMixin):
     """Базовый класс для остальных CBV."""
     model = Note
     success_url = reverse_lazy('notes:success')
+    # Представление только читает заметки и может брать их из реплики;
+    # остальные читают заметку из основной базы, куда потом пишут.
+    read_only = False
+    # Перед ответом применить отложенные изменения автора, чтобы он
+    # видел их сразу (см. notes.writebehind).
+    flush_pending = True
+    # Представлению нужен текст заметки: вынесенный из строки текст
+    # (см. notes.storage) читается тем же запросом.
+    with_text = False
+    # Представление показывает текст в HTML (Note.text_html()).
+    with_html = False
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.flush_pending and request.user.is_authenticated:
+            for notice in writebehind.flush(request.user.pk):
+                messages.warning(request, notice, fail_silently=True)
+        return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        """Пользователь может работать только со своими заметками."""
-        return self.model.objects.filter(author=self.request.user)
+        """Пользователь может работать только со своими заметками.
+
+        База выбирается сразу: потоковый ответ читает заметки уже
+        после выхода из PrimaryPinMiddleware.
+        """
+        queryset = self.model.objects.filter(author=self.request.user)
+        if self.with_text:
+            queryset = queryset.select_related('body')
+        if self.with_html:
+            queryset = queryset.select_related('rendered')
+        if self.read_only:
+            return queryset.using(routers.read_database())
+        return queryset.using(routers.primary_database())
+
+
+class CachedPageMixin:
+    """Кэширует готовую страницу и отвечает 304 на условные запросы.
+
+    ETag и Last-Modified строятся из версии в кэше, поэтому для
+    ответа 304 не нужны ни шаблон, ни строка заметки из базы. 304
+    отдаётся, только если страница этой версии уже есть в кэше: у
+    удалённой или несуществующей заметки её нет, и запрос дойдёт до
+    404. Last-Modified точен до секунды, поэтому он отправляется, только
+    когда с изменения прошла целая секунда; до этого - только ETag.
+    """
+    cache_page_name = None
+
+    def get_version_key(self):
+        """Ключ версии страницы; None - страницу не кэшировать.
+
+        По умолчанию страница не кэшируется: кэш включают подклассы,
+        переопределяя этот метод.
+        """
+        return None
+
+    def get_cache_variant(self):
+        """Часть ключа, отличающая страницы с одной версией."""
+        return ''
+
+    def get(self, request, *args, **kwargs):
+        version_key = self.get_version_key()
+        if version_key is None or messages.get_messages(request):
+            # Страница с сообщениями пользователю в кэш не попадает.
+            return super().get(request, *args, **kwargs)
+        version, changed = page_cache.get_version(version_key)
+        variant = self.get_cache_variant()
+        if routers.is_pinned():
+            # Страница из реплики могла попасть в кэш до репликации
+            # записи; после записи страница берётся из основной базы.
+            variant += '|primary'
+        key = page_cache.page_key(
+            self.cache_page_name, request.user.pk, version, variant
+        )
+        etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        last_modified = None
+        if time.time() - changed >= 1:
+            last_modified = int(changed)
+        content = page_cache.get_cache().get(key)
+        response = None
+        if content is not None:
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+        if response is None:
+            response = self.get_page(request, key, content, *args, **kwargs)
+        if response.status_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_page(self, request, key, content, *args, **kwargs):
+        """Страница из кэша (content) или отрисованная заново."""
+        if content is not None:
+            page_cache.count(self.cache_page_name, 'hit')
+            return HttpResponse(content)
+        page_cache.count(self.cache_page_name, 'miss')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == HTTPStatus.OK:
+            response.add_post_render_callback(
+                lambda response: page_cache.get_cache().set(
+                    key, response.content,
+                    settings.NOTES_PAGE_CACHE_TIMEOUT,
+                )
+            )
+        return response
 
 
 class NoteCreate(NoteBase, generic.CreateView):
     """Добавление заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
+    # Добавление ничего не читает: серия добавлений копится в журнале.
+    flush_pending = False
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
-        return super().form_valid(form)
+        if writebehind.enabled():
+            self.object = form.instance
+            writebehind.add(form.instance, self.request.user)
+            return HttpResponseRedirect(self.get_success_url())
+        # Заметка сохраняется один раз - в form.save() родительского класса.
+        form.instance.author = self.request.user
+        try:
+            return super().form_valid(form)
+        except ValidationError:
+            return self.form_invalid(form)
 
 
 class NoteUpdate(NoteBase, generic.UpdateView):
-    """Редактирование заметки."""
+    """Редактирование заметки.
+
+    Правка, начатая с устаревшей версии заметки, не перезаписывает
+    чужие изменения: форма возвращается с ответом 409.
+    """
     template_name = 'notes/form.html'
     form_class = NoteForm
+    with_text = True
+
+    def form_valid(self, form):
+        try:
+            if writebehind.enabled():
+                writebehind.edit(form.instance, form.get_update_fields())
+                return HttpResponseRedirect(self.get_success_url())
+            return super().form_valid(form)
+        except ValidationError:
+            return self.form_invalid(form)
+        except NoteConflict as conflict:
+            form.mark_conflict(conflict)
+            response = self.form_invalid(form)
+            response.status_code = HTTPStatus.CONFLICT
+            return response
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
     """Удаление заметки."""
     template_name = 'notes/delete.html'
+    # Страница подтверждения показывает текст заметки.
+    with_text = True
+
+    def delete(self, request, *args, **kwargs):
+        if not writebehind.enabled():
+            return super().delete(request, *args, **kwargs)
+        self.object = self.get_object()
+        writebehind.delete(self.object)
+        return HttpResponseRedirect(self.get_success_url())
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
+class NotesList(CachedPageMixin, NoteBase, generic.ListView):
+    """Список всех заметок пользователя.
+
+    Обычный режим - курсорная пагинация по (author_id, id);
+    с параметром ?stream=1 список целиком отдаётся потоком.
+    """
     template_name = 'notes/list.html'
+    # Страница - список, а не выборка: ListView не выведет имя из модели.
+    context_object_name = 'note_list'
+    items_template_name = 'includes/note_items.html'
+    paginate_by = 50
+    stream_param = 'stream'
+    stream_chunk_size = 500
+    cache_page_name = 'list'
+    read_only = True
+
+    def get_queryset(self):
+        """Для списка достаточно id, slug и заголовка."""
+        return super().get_queryset().summaries()
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get(self.stream_param):
+            return StreamingHttpResponse(self.stream_content())
+        return super().get(request, *args, **kwargs)
+
+    def get_version_key(self):
+        return page_cache.author_version_key(self.request.user.pk)
+
+    def get_cache_variant(self):
+        return self.request.GET.urlencode()
+
+    def get_stats(self):
+        """Счётчики автора для шапки списка: одна строка, без COUNT(*)."""
+        return AuthorStats.objects.using(
+            routers.read_database()
+        ).for_author(self.request.user.pk)
+
+    def get_context_data(self, **kwargs):
+        return super().get_context_data(stats=self.get_stats(), **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        """Пагинация по курсору вместо OFFSET."""
+        try:
+            after = parse_cursor(self.request.GET.get(CURSOR_PARAM))
+        except ValueError:
+            raise Http404('Некорректный курсор страницы.')
+        page = paginate_keyset(queryset, after, page_size)
+        return None, page, page.object_list, page.has_next()
 
+    def stream_content(self):
+        """Отдаёт страницу по частям: шапку, порции заметок и подвал."""
+        page = render_to_string(
+            self.template_name,
+            {'view': self, 'streaming': True, 'stats': self.get_stats()},
+            self.request,
+        )
+        head, tail = page.split(STREAM_PLACEHOLDER, 1)
+        yield head
+        for chunk in iterate_keyset(
+                self.get_queryset(), self.stream_chunk_size
+        ):
+            yield render_to_string(
+                self.items_template_name, {'notes': chunk}
+            )
+        yield tail
 
-class NoteDetail(NoteBase, generic.DetailView):
+
+class NoteDetail(CachedPageMixin, NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
+    cache_page_name = 'detail'
+    read_only = True
+    with_text = True
+    with_html = True
+
+    def get_version_key(self):
+        return page_cache.note_version_key(
+            self.request.user.pk, self.kwargs[self.slug_url_kwarg]
+        )
+
+    def get_cache_variant(self):
+        return self.kwargs[self.slug_url_kwarg]
+
+
+class NoteSearch(NoteBase, generic.TemplateView):
+    """Поиск по заголовкам и текстам заметок пользователя."""
+    template_name = 'notes/search.html'
+    query_param = 'q'
+    paginate_by = 20
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get(self.query_param, '')
+        try:
+            after = search.parse_cursor(self.request.GET.get(CURSOR_PARAM))
+        except ValueError:
+            raise Http404('Некорректный курсор страницы.')
+        # Лишняя строка показывает, есть ли следующая страница.
+        results = list(NoteTerm.objects.search(
+            self.request.user, query, after, self.paginate_by + 1
+        ))
+        next_cursor = None
+        if len(results) > self.paginate_by:
+            results = results[:self.paginate_by]
+            next_cursor = search.format_cursor(
+                results[-1]['score'], results[-1]['note_id']
+            )
+        context.update(
+            query=query, results=results, next_cursor=next_cursor
+        )
+        return context
+
+
+class NoteExport(NoteBase, generic.View):
+    """Выгрузка всех заметок пользователя потоком JSON Lines."""
+    read_only = True
+
+    def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            export_notes(self.get_queryset()),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="notes.jsonl"'
+        return response
+
+
+class NoteImport(NoteBase, generic.FormView):
+    """Загрузка заметок из файла JSON Lines."""
+    template_name = 'notes/import.html'
+    form_class = NoteImportForm
+    # Сколько переименованных заметок перечислять поимённо.
+    renamed_shown = 10
+
+    def form_valid(self, form):
+        renamed = []
+        try:
+            import_notes(
+                form.cleaned_data['file'], self.request.user, renamed=renamed
+            )
+        except ValidationError as error:
+            form.add_error('file', error)
+            return self.form_invalid(form)
+        finally:
+            self.report_renamed(renamed)
+        return super().form_valid(form)
+
+    def report_renamed(self, renamed):
+        """Сообщает автору, какие slug из файла оказались заняты."""
+        for notice in renamed[:self.renamed_shown]:
+            messages.warning(self.request, notice, fail_silently=True)
+        if len(renamed) > self.renamed_shown:
+            messages.warning(
+                self.request,
+                f'Ещё заметок с занятым адресом: '
+                f'{len(renamed) - self.renamed_shown}.',
+                fail_silently=True,
+            )
+
+
+def cache_stats_lines():
+    pages = (NotesList.cache_page_name, NoteDetail.cache_page_name)
+    lines = [
+        '# TYPE notes_page_cache_events_total counter',
+    ]
+    for (page, event), value in page_cache.get_stats(pages).items():
+        lines.append(
+            f'notes_page_cache_events_total{{page="{page}",'
+            f'event="{event}"}} {value}'
+        )
+    return lines
+
+
+def prometheus_response(lines):
+    return HttpResponse(
+        '\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4'
+    )
+
+
+def metrics_endpoint(view):
+    """Пускает к метрикам только адреса NOTES_METRICS_ALLOWED_IPS."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        address = request.META.get('REMOTE_ADDR')
+        if address not in settings.NOTES_METRICS_ALLOWED_IPS:
+            return HttpResponseForbidden()
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@metrics_endpoint
+def cache_stats(request):
+    """Счётчики кэша страниц в текстовом формате Prometheus."""
+    return prometheus_response(cache_stats_lines())
+
+
+@metrics_endpoint
+def view_metrics(request):
+    """Замеры представлений и счётчики кэша в формате Prometheus."""
+    return prometheus_response(
+        metrics.render_stats(metrics.get_stats()) + cache_stats_lines()
+    )
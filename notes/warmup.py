@@ -0,0 +1,65 @@
+"""Подготовка процесса к первым запросам.
+
+warm_up() вызывается из yanote.wsgi и yanote.asgi после создания
+приложения. Сервер с предзагрузкой приложения (gunicorn --preload)
+выполняет его один раз в мастер-процессе, и воркеры после форка
+получают готовые маршруты и скомпилированные шаблоны в общих
+страницах памяти. Без прогрева эту цену платит первый запрос к каждой
+странице в каждом воркере.
+
+Соединения с базой открываются для проверки настроек и загрузки
+бэкенда и сразу закрываются: открытое соединение нельзя делить между
+процессами, каждый воркер откроет своё.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+
+def template_names():
+    """Имена всех шаблонов .html из DIRS и каталогов приложений."""
+    engine = engines['django'].engine
+    names = set()
+    for directory in [*engine.dirs, *get_app_template_dirs('templates')]:
+        root = Path(directory)
+        names.update(
+            path.relative_to(root).as_posix() for path in root.rglob('*.html')
+        )
+    return sorted(names)
+
+
+def warm_templates():
+    """Компилирует шаблоны в кэш загрузчика; возвращает их число."""
+    engine = engines['django']
+    names = template_names()
+    for name in names:
+        engine.get_template(name)
+    return len(names)
+
+
+def warm_urls():
+    """Строит словари reverse() корня и пространств имён маршрутов."""
+    resolver = get_resolver()
+    count = len(resolver.reverse_dict)
+    for prefix, sub_resolver in resolver.namespace_dict.values():
+        count += len(sub_resolver.reverse_dict)
+    return count
+
+
+def warm_databases():
+    """Проверяет соединения со всеми базами и закрывает их до форка."""
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    connections.close_all()
+
+
+def warm_up():
+    if settings.NOTES_WARM_UP:
+        warm_urls()
+        warm_templates()
+        warm_databases()
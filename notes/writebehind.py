@@ -0,0 +1,428 @@
+"""Отложенная запись изменений заметок (NOTES_WRITE_BEHIND=1).
+
+NoteCreate, NoteUpdate и NoteDelete и их асинхронные версии не пишут
+в основную базу, а добавляют операцию в журнал - отдельный файл SQLite
+(settings.NOTES_WRITE_BEHIND_JOURNAL) с одной короткой вставкой на
+запрос. Поток в процессе раз в NOTES_WRITE_BEHIND_INTERVAL секунд
+применяет журнал пачками по NOTES_WRITE_BEHIND_BATCH_SIZE операций,
+каждая пачка - одна транзакция основной базы. Подряд идущие
+добавления вставляются как при импорте: одним bulk_create с общим
+запросом за slug, индексом и счётчиками. Без потока (интервал None)
+журнал разбирает команда drain_journal.
+
+Номер последней применённой операции записывается в JournalCursor в
+той же транзакции, что и сама пачка. Поэтому операция применяется
+ровно один раз, даже если процесс упал между фиксацией пачки и
+удалением её из журнала или журнал разбирают два процесса сразу:
+второй ждёт блокировки строки курсора (SELECT ... FOR UPDATE), а в
+SQLite получит ошибку блокировки при записи и повторит позже.
+Журнал открывается с теми же settings.SQLITE_PRAGMAS, что и основная
+база, и переживает падение процесса так же, как она.
+
+JSON API пишет сразу: в ответе клиенту нужны версия и slug уже
+записанной заметки.
+
+Пользователь видит свои изменения сразу: представления заметок перед
+чтением применяют журнал до последней операции этого автора (flush()).
+Порядок операций сохраняется, поэтому такой запрос платит и за
+операции других авторов, вставшие в журнал раньше; остальной журнал
+разберёт поток. Без этого обходится только добавление заметки, поэтому
+пакетом копятся именно серии добавлений.
+
+Правка с устаревшей версией получает ответ 409 сразу: версия
+сверяется с основной базой ещё при постановке в журнал. Каждая
+операция применяется в своей точке сохранения. Операция, которую всё
+же нельзя применить (заметку удалили или изменили раньше, адрес
+заняли), откатывается и пропускается с предупреждением в журнал
+логов, а курсор сдвигается, и остальные операции пачки применяются.
+Ответ автору к этому моменту уже отправлен, поэтому сообщение о
+пропущенной операции ждёт его в журнале и возвращается следующим
+flush() этого автора.
+"""
+import json
+import logging
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.db import (
+    DataError, IntegrityError, close_old_connections, transaction
+)
+
+from . import cache as page_cache
+from . import routers
+from .db import apply_pragmas
+from .models import JournalCursor, Note, NoteConflict
+from .transfer import save_batch
+
+logger = logging.getLogger(__name__)
+
+ADD, EDIT, DELETE = 'add', 'edit', 'delete'
+# Ошибки данных: такая операция пропускается, остальные применяются.
+# Ошибки базы (например, занятая блокировка) откатывают всю пачку, и
+# она применится при следующем разборе.
+SKIPPED_ERRORS = (
+    NoteConflict, IntegrityError, DataError, Note.DoesNotExist,
+    KeyError, TypeError, ValueError,
+)
+SKIPPED_ACTIONS = {ADD: 'не добавлена', EDIT: 'не изменена',
+                   DELETE: 'не удалена'}
+SCHEMA = (
+    # AUTOINCREMENT: номера удалённых операций не выдаются заново, и
+    # курсор в основной базе всегда указывает на одну и ту же операцию.
+    'CREATE TABLE IF NOT EXISTS pending (id INTEGER PRIMARY KEY '
+    'AUTOINCREMENT, author_id INTEGER NOT NULL, action TEXT NOT NULL, '
+    'slug TEXT, payload TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS pending_author ON pending (author_id)',
+    'CREATE INDEX IF NOT EXISTS pending_slug ON pending (slug)',
+    # Сообщения авторам о пропущенных операциях.
+    'CREATE TABLE IF NOT EXISTS skipped (id INTEGER PRIMARY KEY, '
+    'author_id INTEGER NOT NULL, notice TEXT NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS skipped_author ON skipped (author_id)',
+)
+
+
+def enabled():
+    return settings.NOTES_WRITE_BEHIND
+
+
+class Journal:
+    """Файл журнала; у каждого потока своё соединение."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            # isolation_level=None: каждая вставка фиксируется сразу.
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            apply_pragmas(connection, settings.SQLITE_PRAGMAS)
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self.local.connection = connection
+        return connection
+
+    def append(self, author_id, action, payload, slug=None):
+        self.connection.execute(
+            'INSERT INTO pending (author_id, action, slug, payload) '
+            'VALUES (?, ?, ?, ?)',
+            (author_id, action, slug, json.dumps(payload, ensure_ascii=False)),
+        )
+
+    def author_state(self, author_id):
+        """(номер последней операции автора или None, есть ли сообщения)."""
+        return self.connection.execute(
+            'SELECT (SELECT MAX(id) FROM pending WHERE author_id = ?), '
+            'EXISTS (SELECT 1 FROM skipped WHERE author_id = ?)',
+            (author_id, author_id),
+        ).fetchone()
+
+    def record_skipped(self, notices):
+        """Сохраняет сообщения [(author_id, текст)] о пропусках."""
+        self.connection.executemany(
+            'INSERT INTO skipped (author_id, notice) VALUES (?, ?)', notices
+        )
+
+    def pop_skipped(self, author_id):
+        """Забирает сообщения автора о пропущенных операциях."""
+        rows = self.connection.execute(
+            'DELETE FROM skipped WHERE author_id = ? RETURNING id, notice',
+            (author_id,),
+        ).fetchall()
+        return [notice for _, notice in sorted(rows)]
+
+    def has_slug(self, slug):
+        return self.connection.execute(
+            'SELECT 1 FROM pending WHERE slug = ? LIMIT 1', (slug,)
+        ).fetchone() is not None
+
+    def read(self, limit, until=None):
+        """[(id, author_id, action, payload)] в порядке добавления.
+
+        until - номер последней операции, которую нужно прочитать.
+        """
+        return [
+            (id, author_id, action, json.loads(payload))
+            for id, author_id, action, payload in self.connection.execute(
+                'SELECT id, author_id, action, payload FROM pending '
+                'WHERE ? IS NULL OR id <= ? ORDER BY id LIMIT ?',
+                (until, until, limit),
+            )
+        ]
+
+    def discard(self, position):
+        """Удаляет применённые операции до position включительно."""
+        self.connection.execute(
+            'DELETE FROM pending WHERE id <= ?', (position,)
+        )
+
+    def __len__(self):
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM pending'
+        ).fetchone()[0]
+
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def get_journal():
+    path = str(settings.NOTES_WRITE_BEHIND_JOURNAL)
+    with _journals_lock:
+        if path not in _journals:
+            _journals[path] = Journal(path)
+        return _journals[path]
+
+
+def enqueue(author_id, action, payload, slug=None):
+    get_journal().append(author_id, action, payload, slug)
+    # Страницы после редиректа читают из основной базы, куда скоро
+    # попадёт запись.
+    routers.pin_primary()
+    get_worker().notify()
+
+
+def add(note, author):
+    """Откладывает добавление заметки из формы."""
+    enqueue(author.pk, ADD, {
+        'title': note.title, 'text': note.text, 'slug': note.slug,
+    }, slug=note.slug or None)
+
+
+def edit(note, update_fields):
+    """Откладывает изменение полей update_fields заметки.
+
+    Версия - та, с которой начиналась правка. Она сверяется с
+    основной базой сразу, и устаревшая правка получает NoteConflict,
+    как без журнала; при применении операция сравнит её ещё раз.
+    """
+    current = Note.objects.using(routers.primary_database()).filter(
+        pk=note.pk
+    ).values_list('version', flat=True).first()
+    if current is not None and current != note.version:
+        raise NoteConflict(current)
+    enqueue(note.author_id, EDIT, {
+        'id': note.pk,
+        'version': note.version,
+        'fields': {name: getattr(note, name) for name in update_fields},
+    }, slug=note.slug if 'slug' in update_fields else None)
+
+
+def delete(note):
+    enqueue(note.author_id, DELETE, {'id': note.pk})
+
+
+def is_slug_pending(slug):
+    return enabled() and get_journal().has_slug(slug)
+
+
+def flush(author_id):
+    """Применяет журнал до последней операции автора.
+
+    Возвращает сообщения автору о его пропущенных операциях. Ошибка
+    разбора только пишется в лог: страница покажется без отложенных
+    изменений, а журнал разберут позже.
+    """
+    if not enabled():
+        return []
+    journal = get_journal()
+    last, has_skipped = journal.author_state(author_id)
+    if last is not None:
+        try:
+            drain(until=last)
+        except Exception:
+            logger.exception('Ошибка при разборе журнала')
+        has_skipped = journal.author_state(author_id)[1]
+    return journal.pop_skipped(author_id) if has_skipped else []
+
+
+def apply_add(using, author_id, action, payload):
+    save_batch([Note(author_id=author_id, **payload)])
+
+
+def apply_change(using, author_id, action, payload):
+    """Применяет отложенное изменение или удаление заметки."""
+    note = Note.objects.using(using).filter(
+        pk=payload['id'], author_id=author_id
+    ).first()
+    if note is None:
+        raise Note.DoesNotExist(f'Заметки {payload["id"]} уже нет.')
+    if action == DELETE:
+        note.delete(using=using)
+        return
+    for name, value in payload['fields'].items():
+        setattr(note, name, value)
+    note.version = payload['version']
+    note.save(using=using, update_fields=list(payload['fields']))
+
+
+def skipped_notice(action, payload, error):
+    """Сообщение автору о пропущенной операции."""
+    title = payload.get('title') or payload.get('fields', {}).get('title')
+    subject = f'Заметка «{title}»' if title else 'Заметка'
+    if isinstance(error, NoteConflict):
+        reason = 'её уже изменили в другом окне'
+    elif isinstance(error, IntegrityError):
+        reason = 'такой slug уже занят'
+    elif isinstance(error, Note.DoesNotExist):
+        reason = 'её уже удалили'
+    else:
+        reason = 'некорректные данные'
+    return f'{subject} {SKIPPED_ACTIONS[action]}: {reason}.'
+
+
+def apply_one(using, operation, apply, skipped):
+    """Применяет операцию в своей точке сохранения.
+
+    Операция с ошибкой данных откатывается и пропускается с
+    предупреждением, а сообщение автору добавляется в skipped.
+    """
+    id, author_id, action, payload = operation
+    try:
+        with transaction.atomic(using=using):
+            apply(using, author_id, action, payload)
+    except SKIPPED_ERRORS as error:
+        logger.warning(
+            'Отложенная операция %s (%s) пропущена: %s', id, action, error,
+        )
+        skipped.append(
+            (author_id, skipped_notice(action, payload, error))
+        )
+
+
+def add_notes(using, operations, skipped):
+    """Вставляет серию отложенных добавлений одной пачкой, как импорт.
+
+    Адрес, который заняли, пока операция ждала, получает суффикс. Если
+    пачка не вставилась, добавления применяются по одному, и
+    пропускаются только ошибочные.
+    """
+    if not operations:
+        return
+    try:
+        with transaction.atomic(using=using):
+            save_batch([
+                Note(author_id=author_id, **payload)
+                for _, author_id, _, payload in operations
+            ])
+    except SKIPPED_ERRORS:
+        for operation in operations:
+            apply_one(using, operation, apply_add, skipped)
+    for author_id in {operation[1] for operation in operations}:
+        # bulk_create не вызывает Note.save(), сбрасываем кэш сами.
+        page_cache.invalidate_note(author_id)
+    operations.clear()
+
+
+_drain_lock = threading.Lock()
+
+
+def drain(batch_size=None, until=None):
+    """Применяет журнал пачками; возвращает число операций.
+
+    until - номер последней операции, которую нужно применить; без
+    него применяется весь журнал.
+
+    Курсор читается с блокировкой строки (SELECT ... FOR UPDATE там,
+    где база её поддерживает): два процесса не применят одну пачку.
+    """
+    batch_size = batch_size or settings.NOTES_WRITE_BEHIND_BATCH_SIZE
+    journal = get_journal()
+    using = routers.primary_database()
+    applied = 0
+    with _drain_lock:
+        while True:
+            operations = journal.read(batch_size, until)
+            if not operations:
+                return applied
+            with transaction.atomic(using=using):
+                cursor, _ = JournalCursor.objects.using(
+                    using
+                ).select_for_update().get_or_create(journal=journal.path)
+                added = []
+                skipped = []
+                for operation in operations:
+                    if operation[0] <= cursor.position:
+                        continue  # Уже применена до сбоя.
+                    applied += 1
+                    if operation[2] == ADD:
+                        added.append(operation)
+                        continue
+                    # Изменение может касаться только что добавленной.
+                    add_notes(using, added, skipped)
+                    apply_one(using, operation, apply_change, skipped)
+                add_notes(using, added, skipped)
+                cursor.position = operations[-1][0]
+                cursor.save(using=using)
+            journal.record_skipped(skipped)
+            journal.discard(cursor.position)
+
+
+class Worker(threading.Thread):
+    """Поток, который применяет журнал в фоне."""
+
+    def __init__(self, interval):
+        super().__init__(name='notes-write-behind', daemon=True)
+        self.interval = interval
+        self.wake = threading.Event()
+        self.stopped = False
+        self.queued = 0
+
+    def notify(self):
+        """Пачка набралась раньше интервала - разобрать сейчас."""
+        self.queued += 1
+        if self.queued >= settings.NOTES_WRITE_BEHIND_BATCH_SIZE:
+            self.wake.set()
+
+    def stop(self):
+        """Останавливает поток после ещё одного разбора журнала."""
+        self.stopped = True
+        self.wake.set()
+        self.join()
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.queued = 0
+            try:
+                drain()
+            except Exception:
+                logger.exception('Ошибка при разборе журнала')
+            finally:
+                close_old_connections()
+
+
+class NoWorker:
+    """Заглушка, когда журнал разбирает команда drain_journal."""
+
+    def notify(self):
+        pass
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_worker():
+    """Поток процесса; запускается при первой отложенной операции."""
+    global _worker
+    interval = settings.NOTES_WRITE_BEHIND_INTERVAL
+    if interval is None:
+        return NoWorker()
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = Worker(interval)
+            _worker.start()
+        return _worker
+
+
+def stop_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is not None:
+            _worker.stop()
+            _worker = None
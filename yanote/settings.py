@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -8,10 +9,30 @@ SECRET_KEY = 'django-insecure-yipnj$#j!ajarq%k55z4kuf3x79)91h0h42o9!1ho(z=!%mt=#
 
 DEBUG = False
 
+# Производственный режим (NOTES_PRODUCTION=1): статика со сжатием и
+# хэшами в именах и прогрев шаблонов при старте процесса.
+NOTES_PRODUCTION = os.environ.get('NOTES_PRODUCTION') == '1'
+# Облегчённый набор приложений (NOTES_LEAN=1) для воркеров: без
+# админки и сообщений, которые страницам заметок не нужны.
+NOTES_LEAN = os.environ.get('NOTES_LEAN') == '1'
+LEAN_EXCLUDED = (
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.contrib.messages.context_processors.messages',
+)
+
+
+def lean(names):
+    if not NOTES_LEAN:
+        return names
+    return [name for name in names if name not in LEAN_EXCLUDED]
+
+
 ALLOWED_HOSTS = ['*']
 
 
-INSTALLED_APPS = [
+INSTALLED_APPS = lean([
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -19,31 +40,44 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'notes.apps.NotesConfig'
-]
+])
 
-MIDDLEWARE = [
+MIDDLEWARE = lean([
+    'notes.middleware.ViewMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'notes.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
+    'notes.middleware.RateLimitMiddleware',
+])
 
 ROOT_URLCONF = 'yanote.urls'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
-            'context_processors': [
+            'context_processors': lean([
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'notes.context_processors.header_urls',
+            ]),
+            # Без DEBUG скомпилированные шаблоны хранятся в памяти
+            # процесса; notes.warmup компилирует их при старте.
+            'loaders': TEMPLATE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
             ],
         },
     },
@@ -56,9 +90,166 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение живёт между запросами, а не открывается заново.
+        'CONN_MAX_AGE': 60,
+    },
+    # Отдельное соединение к тому же файлу для страниц, которые только
+    # читают заметки (notes.db включает для него query_only).
+    'readonly': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Прагмы для каждого нового соединения SQLite (см. notes.db).
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    # Отрицательное значение - размер в КиБ.
+    'cache_size': -20000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Заметки пишутся в NOTES_WRITE_DATABASE, а NotesList, NoteDetail и
+# остальное чтение идёт из NOTES_READ_DATABASE (реплики), см. notes.routers.
+DATABASE_ROUTERS = ['notes.routers.NotesRouter']
+NOTES_WRITE_DATABASE = 'default'
+NOTES_READ_DATABASE = 'readonly'
+# Бюджет запросов к базе на один запрос к представлению (notes.metrics):
+# превышение пишется в лог, а в тестах роняет тест.
+# Бюджеты учитывают промах кэша сессий и пользователей: тогда сессия
+# и пользователь - два запроса у любой страницы после входа.
+# Вне транзакции SQLite каждая атомарная запись добавляет запрос BEGIN.
+# Запись заметки обновляет и счётчики автора (AuthorStats), добавляет
+# ревизию (NoteRevision) и пишет HTML текста (NoteHtml); удаление
+# заметки удаляет и их.
+NOTES_QUERY_BUDGETS = {
+    'notes:list': 4,
+    'notes:detail': 3,
+    'notes:search': 3,
+    'notes:success': 2,
+    'notes:add': 10,
+    'notes:edit': 12,
+    'notes:delete': 11,
+    'notes:api-list': 10,
+    'notes:api-detail': 12,
+    'notes:api-revisions': 4,
+    'notes:api-revision': 4,
+    'notes:api-revision-restore': 12,
+    'notes:async-list': 4,
+    'notes:async-detail': 3,
+    'notes:async-add': 10,
+    'notes:async-edit': 12,
+    'notes:async-delete': 11,
+    'notes:metrics': 0,
+    'notes:cache-stats': 0,
+}
+
+# Адреса, которым открыты /metrics/ и /metrics/cache/ (формат
+# Prometheus); остальные получают 403. Адрес берётся из REMOTE_ADDR,
+# поэтому за обратным прокси сюда попадает адрес прокси - тогда
+# закройте эти пути и в нём. Список через запятую в окружении.
+NOTES_METRICS_ALLOWED_IPS = os.environ.get(
+    'NOTES_METRICS_ALLOWED_IPS', '127.0.0.1,::1'
+).split(',')
+
+# Лимиты изменений заметок на пользователя (notes.ratelimit): маршрут ->
+# 'запросов/период', период - s, m, h или d. Запросы сверх лимита
+# получают 429 и не доходят до записи в SQLite.
+NOTES_RATE_LIMITS = {
+    'notes:add': '30/m',
+    'notes:edit': '60/m',
+    'notes:delete': '60/m',
+    'notes:import': '5/m',
+    'notes:api-list': '30/m',
+    'notes:api-detail': '60/m',
+    'notes:api-revision-restore': '60/m',
+    'notes:async-add': '30/m',
+    'notes:async-edit': '60/m',
+    'notes:async-delete': '60/m',
+}
+# Корзины общие для всех воркеров, иначе лимит умножается на их число.
+NOTES_RATE_LIMIT_CACHE_ALIAS = 'shared'
+
+# Отложенная запись (NOTES_WRITE_BEHIND=1, см. notes.writebehind):
+# добавление, изменение и удаление заметок попадают в журнал SQLite, а
+# в основную базу - пачками из фонового потока раз в
+# NOTES_WRITE_BEHIND_INTERVAL секунд. С интервалом None потока нет и
+# журнал разбирает команда drain_journal.
+NOTES_WRITE_BEHIND = os.environ.get('NOTES_WRITE_BEHIND') == '1'
+NOTES_WRITE_BEHIND_JOURNAL = BASE_DIR / 'journal.sqlite3'
+NOTES_WRITE_BEHIND_BATCH_SIZE = 500
+NOTES_WRITE_BEHIND_INTERVAL = 0.2
+
+# Тексты заметок от NOTES_TEXT_EXTERNAL_BYTES байт сжимаются кодеком
+# NOTES_TEXT_CODEC (zlib или lzma) и хранятся вне строки заметки, см.
+# notes.storage; None - все тексты в строке. Уже сохранённые заметки
+# переносит команда move_note_text.
+NOTES_TEXT_EXTERNAL_BYTES = 4096
+NOTES_TEXT_CODEC = 'zlib'
+
+# История заметок (notes.revisions): ревизии хранят разницу с
+# предыдущей, каждая NOTES_REVISION_SNAPSHOT_EVERY-я - текст целиком,
+# так что сборка любой ревизии читает не больше стольких строк.
+NOTES_REVISION_SNAPSHOT_EVERY = 20
+
+# Сколько секунд после записи пользователь читает из основной базы.
+NOTES_PRIMARY_PIN_SECONDS = 10
+
+# LocMemCache виден только своему процессу. То, что должно быть общим
+# для всех воркеров (страницы заметок и их версии, notes.cache), лежит
+# в кэше 'shared': memcached по адресу NOTES_MEMCACHED (host:port, нужен
+# pymemcache), а без него в производственном режиме - файловый кэш в
+# BASE_DIR / 'cache' (воркеры одной машины). Проверка notes.W001
+# предупреждает, если в производственном режиме такой кэш - LocMemCache.
+NOTES_MEMCACHED = os.environ.get('NOTES_MEMCACHED')
+if NOTES_MEMCACHED:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': NOTES_MEMCACHED,
+    }
+elif NOTES_PRODUCTION:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    }
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
     }
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': SHARED_CACHE,
 }
 
+# Сессия читается из кэша, а база нужна только при промахе. Без
+# серверного хранения подойдёт и
+# 'django.contrib.sessions.backends.signed_cookies'. Кэш общий: выход
+# и смена пароля в одном воркере должны быть видны всем остальным.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'shared'
+
+# Пользователь сессии тоже берётся из кэша сессий (notes.auth).
+# ModelBackend остаётся в списке: сессии, в которых записан он, не
+# должны разлогиниваться.
+AUTHENTICATION_BACKENDS = [
+    'notes.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+NOTES_USER_CACHE_TIMEOUT = 60 * 5
+
+# Кэш готовых страниц заметок (notes.cache). Правка в одном воркере
+# должна сбрасывать страницы всех воркеров, поэтому кэш общий.
+NOTES_PAGE_CACHE_ALIAS = 'shared'
+NOTES_PAGE_CACHE_TIMEOUT = 60 * 10
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -82,6 +273,18 @@ USE_TZ = True
 
 
 STATIC_URL = '/static/'
+STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+if NOTES_PRODUCTION:
+    # Имена с хэшем содержимого и копии .gz (notes.assets); нужен
+    # manage.py collectstatic перед запуском.
+    STATICFILES_STORAGE = 'notes.assets.CompressedManifestStaticFilesStorage'
+# Прогрев при старте WSGI/ASGI-приложения (notes.warmup): маршруты,
+# шаблоны и соединения с базой до форка воркеров.
+NOTES_WARM_UP = NOTES_PRODUCTION
+# Отдавать собранную статику самим приложением (notes.assets.serve),
+# когда перед ним нет веб-сервера для статики.
+NOTES_SERVE_STATIC = NOTES_PRODUCTION
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
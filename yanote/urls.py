@@ -1,14 +1,21 @@
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import include, path
+from django.urls import include, path, re_path
 from django.views.generic import CreateView
 
+from notes import assets
+
 urlpatterns = [
     path('', include('notes.urls')),
-    path('admin/', admin.site.urls),
 ]
 
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns += [path('admin/', admin.site.urls)]
+
 auth_urls = ([
     path(
         'login/',
@@ -34,3 +41,11 @@ auth_urls = ([
 ], 'users')
 
 urlpatterns += [path('auth/', include(auth_urls))]
+
+if settings.NOTES_SERVE_STATIC:
+    urlpatterns += [
+        re_path(
+            r'^{}(?P<path>.*)$'.format(settings.STATIC_URL.lstrip('/')),
+            assets.serve,
+        ),
+    ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanote.settings')
 
 application = get_wsgi_application()
+
+# После настройки Django: прогрев шаблонов (notes.warmup).
+from notes.warmup import warm_up  # noqa: E402
+
+warm_up()